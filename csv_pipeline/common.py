@@ -9,5 +9,11 @@ BASE_URL = "http://dedalus.epu.ntua.gr:8080/"  # Change this if the app runs els
 # Endpoint for querying the database
 QUERY_ENDPOINT = f"{BASE_URL}/query"
 
+# Endpoint returning per-second, phase-aggregated power data in a wide layout
+MEASUREMENTS_ENDPOINT = f"{BASE_URL}/measurements"
+
+# Result format requested from /query: "arrow" (Arrow IPC stream) or "json"
+QUERY_FORMAT = "arrow"
+
 # Maximum number of concurrent processes
 MAX_PROCESSES = 5  
\ No newline at end of file
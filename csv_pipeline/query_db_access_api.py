@@ -1,5 +1,6 @@
 import requests
 import pandas as pd
+import pyarrow as pa
 from loguru import logger
 from common import *
 from tenacity import (
@@ -25,35 +26,75 @@ def loguru_before_sleep(retry_state: RetryCallState) -> None:
         f"Reason: {exception}"
     )
 
+ARROW_STREAM_MIMETYPE = "application/vnd.apache.arrow.stream"
+
 class QueryError(Exception):
     """Custom exception for query failures."""
     def __init__(self, message="The query failed to execute.", *args):
         super().__init__(message, *args)
 
 
-@retry(
-    retry=retry_if_exception_type((requests.exceptions.RequestException, QueryError)),
-    wait=wait_chain(wait_fixed(60), wait_fixed(180), wait_fixed(300)),
-    stop=stop_after_attempt(4),
-    before_sleep=loguru_before_sleep
-)
-def query_db_access_api(query_payload: str) -> pd.DataFrame:
-    response = requests.post(QUERY_ENDPOINT, json=query_payload)
+def post_for_dataframe(url: str, payload: dict, result_format: str = QUERY_FORMAT) -> pd.DataFrame:
+    """
+    POST payload to a db-access endpoint that answers with a result set and
+    return it as a DataFrame, accepting either Arrow IPC or JSON responses.
+    """
+    headers = {"Accept": ARROW_STREAM_MIMETYPE} if result_format == "arrow" else {}
+    response = requests.post(url, json=payload, headers=headers)
 
     if response.status_code != 200:
-        logger.error(f"Query {query_payload} failed with status code {response.status_code}")
+        logger.error(f"Query {payload} failed with status code {response.status_code}")
         logger.debug(response.text)
         raise QueryError(f"The query failed to execute: {response.text}")
 
+    if response.headers.get("Content-Type", "").startswith(ARROW_STREAM_MIMETYPE):
+        df = decode_arrow_stream(response.content)
+        logger.debug(f"Query {payload} completed successfully.")
+        return df
+
     json_data = response.json()
     if not json_data.get("success", False):
-        logger.error(f"Query {query_payload} failed.")
+        logger.error(f"Query {payload} failed.")
         logger.debug(response.text)
         raise QueryError(f"The query failed to execute: {json_data.get('error', 'Unknown error')}")
 
-    logger.debug(f"Query {query_payload} completed successfully.")
+    logger.debug(f"Query {payload} completed successfully.")
     return pd.DataFrame(json_data["data"])
 
+@retry(
+    retry=retry_if_exception_type((requests.exceptions.RequestException, QueryError)),
+    wait=wait_chain(wait_fixed(60), wait_fixed(180), wait_fixed(300)),
+    stop=stop_after_attempt(4),
+    before_sleep=loguru_before_sleep
+)
+def query_db_access_api(query_payload: str, result_format: str = QUERY_FORMAT) -> pd.DataFrame:
+    return post_for_dataframe(QUERY_ENDPOINT, query_payload, result_format)
+
+@retry(
+    retry=retry_if_exception_type((requests.exceptions.RequestException, QueryError)),
+    wait=wait_chain(wait_fixed(60), wait_fixed(180), wait_fixed(300)),
+    stop=stop_after_attempt(4),
+    before_sleep=loguru_before_sleep
+)
+def query_measurements_api(measurements_payload: dict, result_format: str = QUERY_FORMAT) -> pd.DataFrame:
+    """
+    Fetch power data already floored to the second, aggregated across phases
+    and (for a list layout) pivoted to one column per device by /measurements.
+    """
+    return post_for_dataframe(MEASUREMENTS_ENDPOINT, measurements_payload, result_format)
+
+def decode_arrow_stream(content: bytes) -> pd.DataFrame:
+    """
+    Decode an Arrow IPC stream body into a typed DataFrame, wrapping the
+    response bytes without copying and letting Arrow release its buffers
+    as columns are converted.
+    """
+    try:
+        table = pa.ipc.open_stream(pa.py_buffer(content)).read_all()
+    except pa.ArrowInvalid as e:
+        raise QueryError(f"Could not decode Arrow response: {e}")
+    return table.to_pandas(split_blocks=True, self_destruct=True)
+
 if __name__ == '__main__':
     query = f"""
         SELECT *
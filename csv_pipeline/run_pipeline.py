@@ -5,7 +5,7 @@ import multiprocessing as mp
 from loguru import logger
 from datetime import datetime, timedelta
 from dateutil.relativedelta import relativedelta
-from query_db_access_api import query_db_access_api
+from query_db_access_api import query_db_access_api, query_measurements_api
 from transformations import *
 from common import *
 from buildings_json_handler import yield_home_map_and_last_updated, update_building_last_updated
@@ -42,6 +42,25 @@ def get_data_for_device_in_period(devices: str, start_date: datetime, end_date:
 
     return query_db_access_api({"query": query})
 
+def get_power_data_for_devices_in_period(device_map: dict, start_date: datetime, end_date: datetime) -> pd.DataFrame:
+    """
+    Returns the building frame (timestamp, power_data_main, power_data_meter_N ...)
+    for the period, with second flooring, phase aggregation and the wide pivot
+    done by the database instead of remove_milliseconds / aggregate_power /
+    reshape_power_data.
+    """
+    layout = power_data_layout(device_map)
+    df = query_measurements_api({
+        "start": start_date.isoformat(),
+        "end": end_date.isoformat(),
+        "layout": layout,
+    })
+    if df.empty:
+        return df
+
+    df["timestamp"] = pd.to_datetime(df["timestamp"], utc=True)
+    return df[["timestamp"] + [column_name for _, column_name in layout]]
+
 def need_update_building(home_id: str, start_date: str, devices_str: str, tzinfo)->bool:
     end_date=datetime.now(tzinfo)
     df = get_data_for_device_in_period(devices_str, start_date, end_date,True)
@@ -69,7 +88,7 @@ def process_building(file_count: int, home_id: str, last_updated: str, device_ma
         end_date = start_date + relative_time_delta
         local_logger.info(f"Querying data from {start_date} to {end_date} for home: {home_id}")
 
-        df = get_data_for_device_in_period(devices_str, start_date, end_date)
+        df = get_power_data_for_devices_in_period(device_map, start_date, end_date)
         if df.empty:
             local_logger.warning(f"No data found for {home_id} between {start_date} and {end_date}.")
             start_date = end_date
@@ -77,14 +96,6 @@ def process_building(file_count: int, home_id: str, last_updated: str, device_ma
         
         local_logger.info(f"Retrieved {len(df)} rows for home: {home_id}")
 
-        df = apply_transformations(
-            df,
-            remove_milliseconds,
-            (map_device_id, device_map),
-            aggregate_power,
-            (reshape_power_data, len(device_map.keys()))
-        )
-
         file_path = fr'{DATA_DIR}\combined_main_and_meters_{file_count}.csv'
         df.to_csv(
             file_path, 
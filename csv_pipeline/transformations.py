@@ -80,6 +80,35 @@ def reshape_power_data(df: pd.DataFrame, num_devices: int) -> pd.DataFrame:
 
     return df_pivot
 
+def power_data_layout(device_map: dict) -> list:
+    """
+    Builds the wide column layout produced by reshape_power_data as a list of
+    [device_id, column_name] pairs for the db-access /measurements endpoint.
+
+    Columns are numbered 0 to len(device_map)-1 exactly like reshape_power_data:
+    0 → power_data_main, N → power_data_meter_N. Indexes without a device map to
+    None (an all-NaN column).
+
+    Parameters:
+    device_map (dict): A dictionary mapping each device_id to its column index.
+
+    Returns:
+    list: [device_id or None, column_name] pairs in column order.
+
+    Raises:
+    ValueError: If several devices map to the same column index.
+    """
+    index_to_device = {}
+    for device_id, index in device_map.items():
+        if index in index_to_device:
+            raise ValueError(f"Devices {index_to_device[index]} and {device_id} map to the same column index {index}.")
+        index_to_device[index] = device_id
+    layout = []
+    for i in range(len(device_map)):
+        column_name = 'power_data_main' if i == 0 else f'power_data_meter_{i}'
+        layout.append([index_to_device.get(i), column_name])
+    return layout
+
 def apply_transformations(df: pd.DataFrame, *transforms) -> pd.DataFrame:
     """
     Applies multiple transformation functions sequentially to a DataFrame.
@@ -0,0 +1,107 @@
+import io
+from decimal import Decimal
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+ARROW_STREAM_MIMETYPE = "application/vnd.apache.arrow.stream"
+PARQUET_MIMETYPE = "application/vnd.apache.parquet"
+
+# PostgreSQL type OIDs -> Arrow types. Anything not listed is sent as a string.
+PG_OID_TO_ARROW = {
+    16:   pa.bool_(),                    # bool
+    20:   pa.int64(),                    # int8
+    21:   pa.int16(),                    # int2
+    23:   pa.int32(),                    # int4
+    700:  pa.float32(),                  # float4
+    701:  pa.float64(),                  # float8
+    1700: pa.float64(),                  # numeric
+    1082: pa.date32(),                   # date
+    1114: pa.timestamp("us"),            # timestamp
+    1184: pa.timestamp("us", tz="UTC"),  # timestamptz
+}
+
+
+def arrow_schema_from_description(description) -> pa.Schema:
+    """
+    Build an Arrow schema from a psycopg2 cursor description, so every
+    batch of a result is encoded with the same column types.
+    """
+    return pa.schema([
+        pa.field(col.name, PG_OID_TO_ARROW.get(col.type_code, pa.string()))
+        for col in description
+    ])
+
+
+def _to_column(values, arrow_type):
+    if pa.types.is_floating(arrow_type):
+        values = [float(v) if isinstance(v, Decimal) else v for v in values]
+    elif pa.types.is_string(arrow_type):
+        values = [v if v is None or isinstance(v, str) else str(v) for v in values]
+    return pa.array(values, type=arrow_type)
+
+
+def rows_to_record_batch(rows, schema: pa.Schema) -> pa.RecordBatch:
+    """
+    Transpose a list of row tuples into a typed Arrow record batch.
+    """
+    columns = list(zip(*rows)) if rows else [()] * len(schema)
+    return pa.RecordBatch.from_arrays(
+        [_to_column(col, field.type) for col, field in zip(columns, schema)],
+        schema=schema,
+    )
+
+
+class _DrainableSink(io.RawIOBase):
+    """
+    Write-only file object that accumulates bytes until drained, so an
+    Arrow or Parquet writer can be streamed out chunk by chunk.
+    """
+    def __init__(self):
+        super().__init__()
+        self._chunks = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def iter_arrow_stream(schema: pa.Schema, row_batches):
+    """
+    Encode an iterable of row batches as an Arrow IPC stream, yielding
+    bytes after every record batch.
+    """
+    sink = _DrainableSink()
+    with pa.ipc.new_stream(sink, schema) as writer:
+        yield sink.drain()
+        for rows in row_batches:
+            writer.write_batch(rows_to_record_batch(rows, schema))
+            yield sink.drain()
+    yield sink.drain()
+
+
+def iter_parquet(schema: pa.Schema, row_batches):
+    """
+    Encode an iterable of row batches as a Parquet file with one row group
+    per batch, yielding bytes as row groups are completed.
+    """
+    sink = _DrainableSink()
+    with pq.ParquetWriter(sink, schema) as writer:
+        for rows in row_batches:
+            writer.write_batch(rows_to_record_batch(rows, schema))
+            yield sink.drain()
+    yield sink.drain()
@@ -0,0 +1,136 @@
+"""
+Benchmark csv_loader loaders against a scratch copy of device_measurements_30.
+
+Usage:
+    python bench_csv_loader.py --rows 1000000 --devices 50 --repeat 3
+    python bench_csv_loader.py --rows 10000000 --loaders csv/single_pass binary
+
+Loaders:
+    csv/single_pass  text CSV, single-statement dedup + upsert (what /upload_csv uses)
+    csv/three_table  text CSV, original temp table -> dedup table -> upsert path
+    binary           PostgreSQL binary COPY (what /upload_binary uses)
+
+Database settings are read from the same environment variables as db_access.py.
+The benchmark creates (and afterwards drops) a table shaped like
+device_measurements_30, so production data is never touched.
+"""
+import argparse
+import io
+import os
+import struct
+import time
+from datetime import datetime, timedelta, timezone
+
+from csv_loader import SINGLE_PASS, THREE_TABLE, load_binary_stream, load_csv_stream
+from db_pool import ConnectionPool
+
+SOURCE_TABLE = "device_measurements_30"
+
+DB_PARAMS = {
+    "host":     os.getenv('DB_HOST', 'localhost'),
+    "port":     int(os.getenv('DB_PORT', '5432')),
+    "database": os.getenv('DB_NAME', 'test_db'),
+    "user":     os.getenv('DB_USER', 'user'),
+    "password": os.getenv('DB_PASSWORD', 'password'),
+}
+
+PG_EPOCH = datetime(2000, 1, 1, tzinfo=timezone.utc)
+
+LOADERS = {
+    "csv/single_pass": lambda stream, table, pool: load_csv_stream(stream, table, pool, mode=SINGLE_PASS),
+    "csv/three_table": lambda stream, table, pool: load_csv_stream(stream, table, pool, mode=THREE_TABLE),
+    "binary":          load_binary_stream,
+}
+
+
+def iter_rows(rows: int, devices: int, duplicate_every: int = 10):
+    """
+    Yield synthetic 3-phase readings (device_id, timestamp, power_data, phase)
+    like dedalus_update uploads. Every duplicate_every-th row repeats the
+    previous key so deduplication has work to do.
+    """
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    per_device = max(1, rows // devices)
+    written = 0
+    for d in range(devices):
+        device_id = f"bench-{d:04d}"
+        for i in range(per_device):
+            if written >= rows:
+                return
+            step = i - 1 if duplicate_every and i % duplicate_every == 0 and i else i
+            yield device_id, start + timedelta(seconds=step // 3), (i * 7) % 3000 / 10, step % 3 + 1
+            written += 1
+
+
+def encode_csv(rows) -> bytes:
+    buf = io.StringIO()
+    buf.write("device_id,timestamp,power_data,phase\n")
+    for device_id, ts, value, phase in rows:
+        buf.write(f"{device_id},{ts.isoformat()},{value},{phase}\n")
+    return buf.getvalue().encode("utf-8")
+
+
+def encode_copy_binary(rows) -> bytes:
+    buf = io.BytesIO()
+    buf.write(b"PGCOPY\n\xff\r\n\x00" + struct.pack("!ii", 0, 0))
+    for device_id, ts, value, phase in rows:
+        device_id = device_id.encode("utf-8")
+        micros = (ts - PG_EPOCH) // timedelta(microseconds=1)
+        buf.write(struct.pack(f"!hi{len(device_id)}siqidii",
+                              4, len(device_id), device_id, 8, micros, 8, value, 4, phase))
+    buf.write(struct.pack("!h", -1))
+    return buf.getvalue()
+
+
+def run(pool, table, payload, loader, repeat):
+    timings = {"insert": [], "upsert": []}
+    for _ in range(repeat):
+        with pool.connection() as conn:
+            with conn, conn.cursor() as cur:
+                cur.execute(f"TRUNCATE {table};")
+        # First load inserts every key, the second one hits ON CONFLICT for every key
+        for phase in ("insert", "upsert"):
+            t0 = time.perf_counter()
+            rows = LOADERS[loader](io.BytesIO(payload), table, pool)
+            timings[phase].append((rows, time.perf_counter() - t0))
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--devices", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--loaders", nargs="+", default=list(LOADERS), choices=list(LOADERS))
+    args = parser.parse_args()
+
+    table = f"{SOURCE_TABLE}_bench"
+    pool = ConnectionPool(DB_PARAMS, min_size=1, max_size=1)
+    with pool.connection() as conn:
+        with conn, conn.cursor() as cur:
+            cur.execute(f"CREATE TABLE IF NOT EXISTS {table} (LIKE {SOURCE_TABLE} INCLUDING ALL);")
+
+    try:
+        for loader in args.loaders:
+            encode = encode_copy_binary if loader == "binary" else encode_csv
+            t0 = time.perf_counter()
+            payload = encode(iter_rows(args.rows, args.devices))
+            encode_seconds = time.perf_counter() - t0
+            print(f"{loader:>16} payload: {args.rows} rows, {len(payload) / 1e6:.1f} MB, "
+                  f"encoded at {args.rows / encode_seconds:,.0f} rows/s")
+
+            timings = run(pool, table, payload, loader, args.repeat)
+            for phase, samples in timings.items():
+                best_rows, best_seconds = min(samples, key=lambda s: s[1])
+                print(f"{loader:>16} {phase:>6}: {best_rows / best_seconds:>12,.0f} rows/s "
+                      f"(best of {len(samples)}, {best_seconds:.2f}s)")
+            del payload
+    finally:
+        with pool.connection() as conn:
+            with conn, conn.cursor() as cur:
+                cur.execute(f"DROP TABLE IF EXISTS {table};")
+        pool.closeall()
+
+
+if __name__ == "__main__":
+    main()
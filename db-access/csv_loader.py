@@ -1,80 +1,302 @@
-import psycopg2
-import io
+import hashlib
 
-def load_csv_stream(stream, table_name, db_params):
+# Bytes handed to COPY FROM STDIN per read from the source stream
+COPY_BUFFER_SIZE = 64 * 1024
+
+# Loading modes
+SINGLE_PASS = "single_pass"  # COPY into a reusable staging table, dedup + upsert in one statement
+THREE_TABLE = "three_table"  # COPY into temp table, dedup into a second temp table, then upsert
+LOAD_MODES = (SINGLE_PASS, THREE_TABLE)
+
+# Rows sharing these columns are averaged together and upserted on conflict
+CONFLICT_COLS = ['timestamp', 'device_id', 'phase']
+
+# Field order and PostgreSQL types of a binary COPY upload. Binary COPY does no
+# type coercion, so producers must encode exactly these types in this order.
+BINARY_COLUMNS = [
+    ('device_id',  'text'),
+    ('timestamp',  'timestamptz'),
+    ('power_data', 'double precision'),
+    ('phase',      'integer'),
+]
+
+
+def read_csv_header(stream):
+    """
+    Consume the header line of a text or binary CSV stream and return its column names.
+    """
+    header_line = stream.readline()
+    if isinstance(header_line, bytes):
+        header_line = header_line.decode('utf-8')
+    if not header_line.strip():
+        raise ValueError("CSV stream is empty or missing header")
+    return [col.strip() for col in header_line.strip().split(',')]
+
+
+def staging_table_name(table_name, columns):
+    # One staging table per header shape: a pooled session may load CSVs with different columns
+    shape = hashlib.md5(','.join(columns).encode('utf-8')).hexdigest()[:8]
+    return f"{table_name}_staging_{shape}"
+
+
+def create_staging_table(cur, table_name, columns):
+    """
+    Create (once per session and header) a temp staging table with only the
+    uploaded columns of table_name. CREATE TABLE AS copies their types but
+    not their NOT NULL constraints or defaults, so, as in the three-table
+    path, a column missing from the CSV is left to the target table's
+    default at upsert time. Rows are deleted on commit, so pooled
+    connections reuse the same table across uploads instead of creating
+    and dropping catalog entries each time.
+    """
+    staging_table = staging_table_name(table_name, columns)
+    cur.execute(f"""
+        CREATE TEMP TABLE IF NOT EXISTS {staging_table}
+        ON COMMIT DELETE ROWS AS
+        SELECT {', '.join(columns)}
+        FROM {table_name}
+        WITH NO DATA;
+    """)
+    return staging_table
+
+
+def create_binary_staging_table(cur, table_name):
+    """
+    Create (once per session) a temp staging table with the fixed BINARY_COLUMNS
+    types. Values are cast to the target table's column types by the upsert.
+    """
+    staging_table = f"{table_name}_binary_staging"
+    column_defs = ', '.join(f"{name} {pg_type}" for name, pg_type in BINARY_COLUMNS)
+    cur.execute(f"""
+        CREATE TEMP TABLE IF NOT EXISTS {staging_table}
+        ({column_defs})
+        ON COMMIT DELETE ROWS;
+    """)
+    return staging_table
+
+
+def copy_csv_into(cur, table, stream, columns):
+    """
+    Stream the remainder of a CSV stream into table with COPY FROM STDIN,
+    reading COPY_BUFFER_SIZE bytes at a time. Returns the number of rows copied.
+    """
+    column_list = ', '.join(columns)
+    cur.copy_expert(
+        f"COPY {table} ({column_list}) FROM STDIN WITH (FORMAT csv)",
+        stream,
+        size=COPY_BUFFER_SIZE
+    )
+    return cur.rowcount
+
+
+def copy_binary_into(cur, table, stream, columns):
+    """
+    Stream a PostgreSQL binary COPY stream (signature, header, tuples, trailer)
+    into table, reading COPY_BUFFER_SIZE bytes at a time. Returns the number
+    of rows copied.
+    """
+    column_list = ', '.join(columns)
+    cur.copy_expert(
+        f"COPY {table} ({column_list}) FROM STDIN WITH (FORMAT binary)",
+        stream,
+        size=COPY_BUFFER_SIZE
+    )
+    return cur.rowcount
+
+
+def upsert_from_staging(cur, staging_table, table_name, columns):
+    """
+    Deduplicate staged rows (averaging every non-key column per
+    timestamp/device_id/phase) and upsert them into table_name in one statement.
+    Rows are inserted in conflict-key order, which matches the unique index and
+    keeps B-tree insertions mostly sequential.
+    """
+    value_cols = [col for col in columns if col not in CONFLICT_COLS]
+    insert_cols = CONFLICT_COLS + value_cols
+    conflict_clause = ', '.join(CONFLICT_COLS)
+    select_clause = ', '.join(CONFLICT_COLS + [f"AVG({col}) AS {col}" for col in value_cols])
+    update_clause = ', '.join(f"{col}=EXCLUDED.{col}" for col in value_cols)
+    on_conflict = f"DO UPDATE SET {update_clause}" if value_cols else "DO NOTHING"
+
+    cur.execute(f"""
+        INSERT INTO {table_name} ({', '.join(insert_cols)})
+        SELECT {select_clause}
+        FROM {staging_table}
+        GROUP BY {conflict_clause}
+        ORDER BY {conflict_clause}
+        ON CONFLICT ({conflict_clause}) {on_conflict};
+    """)
+
+
+def load_csv_stream(stream, table_name, pool, mode=SINGLE_PASS):
     """
     Bulk-load CSV data into PostgreSQL with UPSERT.
-    - Creates a temporary table
-    - Uses COPY for fast loading
-    - Inserts into real table with ON CONFLICT DO UPDATE SET ...
+    - Uses COPY for fast loading, reading the stream in COPY_BUFFER_SIZE chunks
+      so the CSV is never held in memory as a whole
+    - SINGLE_PASS (default): COPY into a per-session staging table, then
+      deduplicate and INSERT ... ON CONFLICT DO UPDATE in a single statement
+    - THREE_TABLE: the original path (temp table, deduplicated temp table,
+      then upsert), kept for comparison
+
+    stream may be a text or binary file-like object (e.g. the raw request body).
+    Returns the number of CSV rows loaded.
     """
+    if mode not in LOAD_MODES:
+        raise ValueError(f"Unknown load mode: {mode}")
 
-    # 1. Wrap binary stream if needed
-    if isinstance(stream, (io.BufferedReader, io.BytesIO)):
-        text_stream = io.TextIOWrapper(stream, encoding='utf-8')
-    else:
-        text_stream = stream
+    # 1. Read and parse header (the rest of the stream goes straight to COPY)
+    columns = read_csv_header(stream)
+
+    # 2. Borrow a pooled connection and execute
+    with pool.connection() as conn:
+        with conn, conn.cursor() as cur:
+            if mode == THREE_TABLE:
+                return _load_three_table(cur, stream, table_name, columns)
+
+            staging_table = create_staging_table(cur, table_name, columns)
+            row_count = copy_csv_into(cur, staging_table, stream, columns)
+            upsert_from_staging(cur, staging_table, table_name, columns)
+
+    return row_count
 
-    # 2. Read and parse header
-    header_line = text_stream.readline()
-    if not header_line:
-        raise ValueError("CSV stream is empty or missing header")
 
-    columns = [col.strip() for col in header_line.strip().split(',')]
+def _load_three_table(cur, stream, table_name, columns):
     column_list = ', '.join(columns)
     temp_table = f"{table_name}_temp"
     dedup_table = f"{temp_table}_dedup"
 
-    # 3. Define conflict columns (adjust if needed)
-    conflict_cols = ['timestamp', 'device_id', 'phase']
-    conflict_clause = ', '.join(conflict_cols)
-
-    # 4. Build the update clause
-    update_cols = [col for col in columns if col not in conflict_cols]
+    conflict_clause = ', '.join(CONFLICT_COLS)
+    update_cols = [col for col in columns if col not in CONFLICT_COLS]
     update_clause = ', '.join(f"{col}=EXCLUDED.{col}" for col in update_cols)
 
-    # 5. Connect and execute
-    conn = psycopg2.connect(**db_params)
-    try:
+    # Create temp table
+    cur.execute(f"DROP TABLE IF EXISTS {temp_table};")
+    cur.execute(f"""
+        CREATE TEMP TABLE {temp_table} ON COMMIT DROP AS
+        SELECT {column_list}
+        FROM {table_name}
+        LIMIT 0;
+    """)
+
+    # Stream data into temp table
+    row_count = copy_csv_into(cur, temp_table, stream, columns)
+
+    # Deduplicate rows from source by averaging power
+    cur.execute(f"DROP TABLE IF EXISTS {dedup_table};")
+    cur.execute(f"""
+        CREATE TEMP TABLE {dedup_table} ON COMMIT DROP AS
+        SELECT
+            timestamp,
+            device_id,
+            phase,
+            AVG(power_data) AS power_data
+        FROM {temp_table}
+        GROUP BY timestamp, device_id, phase;
+    """)
+
+    # Upsert from temp into real table
+    cur.execute(f"""
+        INSERT INTO {table_name} ({column_list})
+        SELECT {column_list}
+        FROM {dedup_table}
+        ON CONFLICT ({conflict_clause}) DO UPDATE SET
+        {update_clause};
+    """)
+    return row_count
+
+
+def load_binary_stream(stream, table_name, pool):
+    """
+    Bulk-load a PostgreSQL binary COPY stream with UPSERT.
+    - Tuples must hold BINARY_COLUMNS in order (text, timestamptz, float8, int4),
+      so timestamps and floats are never formatted or parsed as text
+    - COPY into a per-session staging table, then the same single-statement
+      deduplicate + upsert as load_csv_stream
+
+    Returns the number of rows loaded.
+    """
+    columns = [name for name, _ in BINARY_COLUMNS]
+
+    with pool.connection() as conn:
+        with conn, conn.cursor() as cur:
+            staging_table = create_binary_staging_table(cur, table_name)
+            row_count = copy_binary_into(cur, staging_table, stream, columns)
+            upsert_from_staging(cur, staging_table, table_name, columns)
+
+    return row_count
+
+
+# Formats accepted for the parts of a batch upload
+CSV_FORMAT = "csv"
+BINARY_FORMAT = "binary"
+
+
+def load_batch(parts, table_name, pool):
+    """
+    Bulk-load many CSV / binary COPY streams (e.g. one per device) in a single
+    transaction with UPSERT.
+    - Every part is COPYed into the session's staging tables inside its own
+      savepoint; a part that fails to parse is rolled back and reported
+      without affecting the others
+    - All staged rows are then deduplicated and upserted together (one
+      statement per format, in its own savepoint); if that fails, every
+      part staged in that format is reported as failed
+    - CSV parts must share the same header
+
+    parts is an iterable of (key, stream, fmt) with fmt CSV_FORMAT or BINARY_FORMAT.
+    Returns {key: {"success": True, "rows": N}} or {key: {"success": False, "error": "..."}}.
+    """
+    results = {}
+    csv_columns = None
+    # Keys of the parts staged in each format
+    staged = {CSV_FORMAT: [], BINARY_FORMAT: []}
+    binary_columns = [name for name, _ in BINARY_COLUMNS]
+
+    with pool.connection() as conn:
         with conn, conn.cursor() as cur:
-            # Create temp table
-            cur.execute(f"DROP TABLE IF EXISTS {temp_table};")
-            cur.execute(f"""
-                CREATE TEMP TABLE {temp_table} AS
-                SELECT {column_list}
-                FROM {table_name}
-                LIMIT 0;
-            """)
-
-
-            # Load data into temp table
-            cur.copy_from(
-                file=text_stream,
-                table=temp_table,
-                sep=",",
-                columns=tuple(columns)
-            )
-
-            # Deduplicate rows from source by averaging power
-            cur.execute(f"DROP TABLE IF EXISTS {dedup_table};")
-            cur.execute(f"""
-                CREATE TEMP TABLE {dedup_table} AS
-                SELECT 
-                    timestamp,
-                    device_id,
-                    phase,
-                    AVG(power_data) AS power_data
-                FROM {temp_table}
-                GROUP BY timestamp, device_id, phase;
-            """)
-
-            # Upsert from temp into real table
-            cur.execute(f"""
-                INSERT INTO {table_name} ({column_list})
-                SELECT {column_list}
-                FROM {dedup_table}
-                ON CONFLICT ({conflict_clause}) DO UPDATE SET
-                {update_clause};
-            """)
-    finally:
-        conn.close()
+            csv_staging = None
+            binary_staging = create_binary_staging_table(cur, table_name)
+
+            for key, stream, fmt in parts:
+                cur.execute("SAVEPOINT batch_part;")
+                try:
+                    if fmt == BINARY_FORMAT:
+                        rows = copy_binary_into(cur, binary_staging, stream, binary_columns)
+                    elif fmt == CSV_FORMAT:
+                        columns = read_csv_header(stream)
+                        if csv_columns is not None and columns != csv_columns:
+                            raise ValueError(f"CSV header {columns} differs from the batch header {csv_columns}")
+                        if csv_staging is None:
+                            csv_staging = create_staging_table(cur, table_name, columns)
+                        rows = copy_csv_into(cur, csv_staging, stream, columns)
+                        csv_columns = columns
+                    else:
+                        raise ValueError(f"Unknown part format: {fmt}")
+                except Exception as e:
+                    cur.execute("ROLLBACK TO SAVEPOINT batch_part;")
+                    if csv_columns is None:
+                        # The rollback also undid the CSV staging table if this part created it
+                        csv_staging = None
+                    results[key] = {"success": False, "error": str(e)}
+                    continue
+
+                cur.execute("RELEASE SAVEPOINT batch_part;")
+                staged[fmt].append(key)
+                results[key] = {"success": True, "rows": rows}
+
+            for fmt, staging_table, columns in ((CSV_FORMAT, csv_staging, csv_columns),
+                                                (BINARY_FORMAT, binary_staging, binary_columns)):
+                if not staged[fmt]:
+                    continue
+                cur.execute("SAVEPOINT batch_upsert;")
+                try:
+                    upsert_from_staging(cur, staging_table, table_name, columns)
+                except Exception as e:
+                    # Rows of all parts are upserted together: none of them were loaded
+                    cur.execute("ROLLBACK TO SAVEPOINT batch_upsert;")
+                    for key in staged[fmt]:
+                        results[key] = {"success": False, "error": f"Upsert failed: {e}"}
+                    continue
+                cur.execute("RELEASE SAVEPOINT batch_upsert;")
+
+    return results
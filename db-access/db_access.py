@@ -1,8 +1,18 @@
-from flask import Flask, request, jsonify
-import psycopg2
+from flask import Flask, Response, request, jsonify
 import os
-import io
-from csv_loader import load_csv_stream
+import threading
+import uuid
+from csv_loader import BINARY_FORMAT, CSV_FORMAT, load_batch, load_binary_stream, load_csv_stream
+from arrow_format import (
+    ARROW_STREAM_MIMETYPE,
+    PARQUET_MIMETYPE,
+    arrow_schema_from_description,
+    iter_arrow_stream,
+    iter_parquet,
+)
+from db_pool import ConnectionPool, PoolTimeoutError
+from upload_encoding import UnsupportedEncodingError, decompressing_stream
+from measurements import MeasurementRequestError, build_measurement_query, parse_measurement_request
 
 app = Flask(__name__)
 
@@ -21,48 +31,308 @@ DB_PARAMS = {
     "password": DB_PASSWORD,
 }
 
+# Connection pool config from env
+DB_POOL_MIN_SIZE              = int(os.getenv('DB_POOL_MIN_SIZE', '1'))
+DB_POOL_MAX_SIZE              = int(os.getenv('DB_POOL_MAX_SIZE', '10'))
+DB_POOL_MAX_LIFETIME          = float(os.getenv('DB_POOL_MAX_LIFETIME', '1800'))
+DB_POOL_TIMEOUT               = float(os.getenv('DB_POOL_TIMEOUT', '30'))
+DB_POOL_HEALTH_CHECK_INTERVAL = float(os.getenv('DB_POOL_HEALTH_CHECK_INTERVAL', '30'))
+
+# Rows fetched per round trip by streaming /query requests
+QUERY_STREAM_BATCH_SIZE = int(os.getenv('QUERY_STREAM_BATCH_SIZE', '5000'))
+
+# Result formats /query can answer with, negotiated through the Accept header
+JSON_MIMETYPE = "application/json"
+RESULT_MIMETYPES = [JSON_MIMETYPE, ARROW_STREAM_MIMETYPE, PARQUET_MIMETYPE]
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+def get_pool() -> ConnectionPool:
+    """
+    Return the process-wide connection pool, creating it on first use.
+    The pool is re-created after a fork so gunicorn workers never share sockets.
+    """
+    global _pool, _pool_pid
+    with _pool_lock:
+        if _pool is None or _pool_pid != os.getpid():
+            _pool = ConnectionPool(
+                DB_PARAMS,
+                min_size=DB_POOL_MIN_SIZE,
+                max_size=DB_POOL_MAX_SIZE,
+                max_lifetime=DB_POOL_MAX_LIFETIME,
+                acquire_timeout=DB_POOL_TIMEOUT,
+                health_check_interval=DB_POOL_HEALTH_CHECK_INTERVAL,
+            )
+            _pool_pid = os.getpid()
+        return _pool
+
+def open_server_side_cursor(query, batch_size, params=None):
+    """
+    Borrow a pooled connection and run query through a named (server-side)
+    cursor. Returns (conn, cur, first_batch); the first batch is fetched
+    eagerly so SQL errors surface before any response is sent. The caller
+    owns the connection and must hand it back with close_server_side_cursor.
+    """
+    pool = get_pool()
+    conn = pool.getconn()
+    try:
+        cur = conn.cursor(name=f"query_stream_{uuid.uuid4().hex}")
+        cur.itersize = batch_size
+        cur.execute(query, params)
+        first_batch = cur.fetchmany(batch_size)
+    except Exception:
+        close_server_side_cursor(conn, None)
+        raise
+    return conn, cur, first_batch
+
+def close_server_side_cursor(conn, cur):
+    """
+    Close the cursor, end its read transaction and return the connection to the pool.
+    """
+    try:
+        if cur is not None:
+            cur.close()
+        conn.rollback()
+    except Exception:
+        get_pool().putconn(conn, discard=True)
+    else:
+        get_pool().putconn(conn)
+
+def iter_batches(cur, first_batch, batch_size):
+    rows = first_batch
+    while rows:
+        yield rows
+        rows = cur.fetchmany(batch_size)
+
+def stream_query_ndjson(query, batch_size, params=None):
+    """
+    Stream query results as newline-delimited JSON:
+    - first line:  {"columns": [...]}
+    - then one JSON array per row, in column order
+    - last line:   {"success": true, "rows": N} or {"success": false, "error": "..."}
+    Rows are fetched batch_size at a time and each batch is sent as one chunk.
+    """
+    conn, cur, batch = open_server_side_cursor(query, batch_size, params)
+    cols = [c[0] for c in cur.description]
+
+    def generate():
+        rows_sent = 0
+        try:
+            yield app.json.dumps({"columns": cols}) + "\n"
+            for rows in iter_batches(cur, batch, batch_size):
+                yield "".join(app.json.dumps(list(r)) + "\n" for r in rows)
+                rows_sent += len(rows)
+            yield app.json.dumps({"success": True, "rows": rows_sent}) + "\n"
+        except Exception as e:
+            app.logger.exception("streaming query failed after %d rows", rows_sent)
+            yield app.json.dumps({"success": False, "error": str(e)}) + "\n"
+        finally:
+            close_server_side_cursor(conn, cur)
+
+    return Response(generate(), mimetype="application/x-ndjson")
+
+def stream_query_columnar(query, batch_size, mimetype, params=None):
+    """
+    Stream query results as an Arrow IPC stream or a Parquet file (one
+    record batch / row group per fetched batch). Column types come from
+    the cursor description. A failure after streaming has started aborts
+    the chunked response, so clients see a truncated body rather than a
+    silently short result.
+    """
+    conn, cur, batch = open_server_side_cursor(query, batch_size, params)
+    schema = arrow_schema_from_description(cur.description)
+    encode = iter_arrow_stream if mimetype == ARROW_STREAM_MIMETYPE else iter_parquet
+
+    def generate():
+        try:
+            for chunk in encode(schema, iter_batches(cur, batch, batch_size)):
+                if chunk:
+                    yield chunk
+        except Exception:
+            app.logger.exception("columnar query stream failed")
+            raise
+        finally:
+            close_server_side_cursor(conn, cur)
+
+    return Response(generate(), mimetype=mimetype)
+
 @app.route('/')
 def index():
-    return "Welcome! POST to /query."
+    return "Welcome! POST to /query or /measurements."
 
-@app.route('/query', methods=['POST'])
-def run_query():
-    query = request.json.get('query')
+@app.route('/pool_stats', methods=['GET'])
+def pool_stats():
+    return jsonify(success=True, stats=get_pool().stats())
+
+def respond_with_query(query, params=None, stream=False, batch_size=QUERY_STREAM_BATCH_SIZE):
+    """
+    Run query and answer in the format negotiated through the Accept header
+    (JSON, streamed NDJSON, Arrow IPC stream or Parquet).
+    """
+    result_format = request.accept_mimetypes.best_match(RESULT_MIMETYPES, default=JSON_MIMETYPE)
     try:
-        conn = psycopg2.connect(host=DB_HOST, port=DB_PORT,
-                                database=DB_NAME,
-                                user=DB_USER, password=DB_PASSWORD)
-        with conn, conn.cursor() as cur:
-            cur.execute(query)
-            cols = [c[0] for c in cur.description]
-            rows = cur.fetchall()
+        if result_format in (ARROW_STREAM_MIMETYPE, PARQUET_MIMETYPE):
+            return stream_query_columnar(query, batch_size, result_format, params)
+        if stream:
+            return stream_query_ndjson(query, batch_size, params)
+
+        with get_pool().connection() as conn:
+            with conn, conn.cursor() as cur:
+                cur.execute(query, params)
+                cols = [c[0] for c in cur.description]
+                rows = cur.fetchall()
         return jsonify({'success': True,
                         'data': [dict(zip(cols, r)) for r in rows]})
+    except PoolTimeoutError as e:
+        return jsonify({'success': False, 'error': str(e)}), 503
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 400
 
+def parse_batch_size(body):
+    """
+    The batch_size of a /query or /measurements request body (default
+    QUERY_STREAM_BATCH_SIZE). Raises ValueError unless it is a positive integer.
+    """
+    value = body.get('batch_size', QUERY_STREAM_BATCH_SIZE)
+    try:
+        batch_size = int(value)
+    except (TypeError, ValueError):
+        batch_size = 0
+    if batch_size < 1:
+        raise ValueError(f"'batch_size' must be a positive integer, got {value!r}")
+    return batch_size
+
+@app.route('/query', methods=['POST'])
+def run_query():
+    query = request.json.get('query')
+    stream = bool(request.json.get('stream', False))
+    try:
+        batch_size = parse_batch_size(request.json)
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    return respond_with_query(query, stream=stream, batch_size=batch_size)
+
+@app.route('/measurements', methods=['POST'])
+def get_measurements():
+    try:
+        device_ids, start, end, layout = parse_measurement_request(request.json)
+    except MeasurementRequestError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+
+    try:
+        batch_size = parse_batch_size(request.json)
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+
+    query, params = build_measurement_query(device_ids, start, end, layout)
+    stream = bool(request.json.get('stream', False))
+    return respond_with_query(query, params, stream=stream, batch_size=batch_size)
+
+def open_upload_stream():
+    """
+    Return a file-like object over the uploaded data without reading it into memory.
+
+    - multipart/form-data: the "file" part (spooled to disk by Werkzeug when large)
+    - any other content type: the raw request body, read straight from the socket
+    gzip / zstd Content-Encoding (of the request, or of the multipart part) is
+    decoded incrementally while the stream is read.
+    Returns None if a multipart request has no file part.
+    """
+    if request.mimetype == 'multipart/form-data':
+        f = request.files.get('file')
+        if not f:
+            return None
+        return decompressing_stream(f.stream, f.headers.get('Content-Encoding'))
+    return decompressing_stream(request.stream, request.headers.get('Content-Encoding'))
+
 @app.route('/upload_csv', methods=['POST'])
 def upload_csv():
-    f = request.files.get('file')
-    if not f:
+    try:
+        stream = open_upload_stream()
+    except UnsupportedEncodingError as e:
+        return jsonify(success=False, error=str(e)), 415
+    if stream is None:
         return jsonify(success=False, error="No file part"), 400
 
     try:
-        # Read and decode entire content
-        content = f.read().decode('utf-8')
+        # Let load_csv_stream handle the header and stream the rows into COPY
+        rows = load_csv_stream(
+            stream=stream,
+            table_name="device_measurements_30",
+            pool=get_pool()
+        )
 
-        # Pass full content (with header) as a StringIO stream
-        text_stream = io.StringIO(content)
+        return jsonify(success=True, rows=rows), 200
 
-        # Let load_csv_stream handle the header and data
-        load_csv_stream(
-            stream=text_stream,
+    except PoolTimeoutError as e:
+        app.logger.warning("upload_csv: %s", e)
+        return jsonify(success=False, error=str(e)), 503
+    except Exception as e:
+        app.logger.exception("upload_csv failed")
+        return jsonify(success=False, error=str(e)), 500
+
+@app.route('/upload_binary', methods=['POST'])
+def upload_binary():
+    try:
+        stream = open_upload_stream()
+    except UnsupportedEncodingError as e:
+        return jsonify(success=False, error=str(e)), 415
+    if stream is None:
+        return jsonify(success=False, error="No file part"), 400
+
+    try:
+        rows = load_binary_stream(
+            stream=stream,
             table_name="device_measurements_30",
-            db_params=DB_PARAMS
+            pool=get_pool()
         )
 
-        return jsonify(success=True), 200
+        return jsonify(success=True, rows=rows), 200
 
+    except PoolTimeoutError as e:
+        app.logger.warning("upload_binary: %s", e)
+        return jsonify(success=False, error=str(e)), 503
     except Exception as e:
-        app.logger.exception("upload_csv failed")
+        app.logger.exception("upload_binary failed")
+        return jsonify(success=False, error=str(e)), 500
+
+@app.route('/upload_batch', methods=['POST'])
+def upload_batch():
+    """
+    Load many device payloads in one request and one transaction.
+    Each multipart file part is one payload, keyed by its form field name:
+    text/csv parts are loaded as CSV, any other content type as a binary
+    COPY stream. Parts may carry their own gzip / zstd Content-Encoding.
+    """
+    if request.mimetype != 'multipart/form-data' or not request.files:
+        return jsonify(success=False, error="Expected multipart/form-data with one file part per payload"), 400
+
+    try:
+        parts = [
+            (key,
+             decompressing_stream(f.stream, f.headers.get('Content-Encoding')),
+             CSV_FORMAT if f.mimetype == 'text/csv' else BINARY_FORMAT)
+            for key, f in request.files.items(multi=True)
+        ]
+    except UnsupportedEncodingError as e:
+        return jsonify(success=False, error=str(e)), 415
+
+    try:
+        results = load_batch(parts, table_name="device_measurements_30", pool=get_pool())
+    except PoolTimeoutError as e:
+        app.logger.warning("upload_batch: %s", e)
+        return jsonify(success=False, error=str(e)), 503
+    except Exception as e:
+        app.logger.exception("upload_batch failed")
         return jsonify(success=False, error=str(e)), 500
+
+    failed = [key for key, result in results.items() if not result["success"]]
+    if failed:
+        app.logger.warning("upload_batch: %d of %d parts failed: %s", len(failed), len(results), failed)
+    return jsonify(
+        success=not failed,
+        rows=sum(result.get("rows", 0) for result in results.values()),
+        parts=results
+    ), 200
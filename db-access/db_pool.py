@@ -0,0 +1,215 @@
+import threading
+import time
+from contextlib import contextmanager
+
+import psycopg2
+import psycopg2.extensions
+
+
+class PoolTimeoutError(Exception):
+    """Raised when no connection becomes available within the acquire timeout."""
+    def __init__(self, message="Timed out waiting for a database connection.", *args):
+        super().__init__(message, *args)
+
+
+class ConnectionPool:
+    """
+    Bounded, thread-safe pool of psycopg2 connections.
+
+    - At most max_size connections are open at any time; callers block
+      (up to acquire_timeout seconds) when all of them are checked out.
+    - Idle connections are health-checked with SELECT 1 before reuse
+      once they have been idle longer than health_check_interval.
+    - Connections older than max_lifetime are closed and replaced.
+    - Counters describing pool usage and exhaustion are exposed by stats().
+    """
+
+    def __init__(self, db_params: dict, min_size: int = 1, max_size: int = 10,
+                 max_lifetime: float = 1800.0, acquire_timeout: float = 30.0,
+                 health_check_interval: float = 30.0):
+        if max_size < 1 or min_size < 0 or min_size > max_size:
+            raise ValueError(f"Invalid pool size bounds: min_size={min_size}, max_size={max_size}")
+
+        self.db_params = db_params
+        self.min_size = min_size
+        self.max_size = max_size
+        self.max_lifetime = max_lifetime
+        self.acquire_timeout = acquire_timeout
+        self.health_check_interval = health_check_interval
+
+        self._cond = threading.Condition()
+        self._idle = []          # list of (conn, last_used) - most recently used last
+        self._created_at = {}    # id(conn) -> creation time
+        self._in_use = 0
+        self._closed = False
+
+        self._stats = {
+            "acquired": 0,
+            "waited": 0,
+            "wait_seconds_total": 0.0,
+            "timeouts": 0,
+            "created": 0,
+            "closed_expired": 0,
+            "closed_unhealthy": 0,
+            "max_in_use": 0,
+        }
+
+        for _ in range(min_size):
+            self._idle.append((self._connect(), time.monotonic()))
+
+    def _connect(self):
+        conn = psycopg2.connect(**self.db_params)
+        with self._cond:
+            self._created_at[id(conn)] = time.monotonic()
+            self._stats["created"] += 1
+        return conn
+
+    def _close(self, conn, reason=None):
+        self._created_at.pop(id(conn), None)
+        if reason:
+            self._stats[reason] += 1
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def _expired(self, conn) -> bool:
+        created = self._created_at.get(id(conn), 0.0)
+        return self.max_lifetime > 0 and time.monotonic() - created > self.max_lifetime
+
+    def _healthy(self, conn, last_used: float) -> bool:
+        if conn.closed:
+            return False
+        if time.monotonic() - last_used < self.health_check_interval:
+            return True
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1;")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def getconn(self, timeout: float = None):
+        """
+        Check out a connection, waiting up to timeout seconds (defaults to
+        acquire_timeout) for one to be returned if the pool is exhausted.
+        """
+        timeout = self.acquire_timeout if timeout is None else timeout
+        wait_start = time.monotonic()
+        deadline = wait_start + timeout
+        waited = False
+
+        while True:
+            with self._cond:
+                while True:
+                    if self._closed:
+                        raise RuntimeError("Connection pool is closed")
+                    if self._idle or self._in_use < self.max_size:
+                        break
+                    # Pool exhausted: wait for a connection to be returned
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._stats["timeouts"] += 1
+                        raise PoolTimeoutError(
+                            f"Timed out after {timeout}s waiting for a database connection "
+                            f"({self._in_use}/{self.max_size} in use)."
+                        )
+                    waited = True
+                    self._cond.wait(remaining)
+
+                # Reserve the slot; connecting and health checks happen outside the lock
+                candidate = self._idle.pop() if self._idle else None
+                self._in_use += 1
+
+            try:
+                if candidate is None:
+                    conn = self._connect()
+                else:
+                    conn, last_used = candidate
+                    if self._expired(conn):
+                        self._release_slot(conn, "closed_expired")
+                        continue
+                    if not self._healthy(conn, last_used):
+                        self._release_slot(conn, "closed_unhealthy")
+                        continue
+            except Exception:
+                with self._cond:
+                    self._in_use -= 1
+                    self._cond.notify()
+                raise
+
+            with self._cond:
+                self._stats["acquired"] += 1
+                self._stats["max_in_use"] = max(self._stats["max_in_use"], self._in_use)
+                if waited:
+                    self._stats["waited"] += 1
+                    self._stats["wait_seconds_total"] += time.monotonic() - wait_start
+            return conn
+
+    def _release_slot(self, conn, reason):
+        with self._cond:
+            self._in_use -= 1
+            self._close(conn, reason)
+            self._cond.notify()
+
+    def putconn(self, conn, discard: bool = False):
+        """
+        Return a checked-out connection. Broken, expired or discarded
+        connections are closed instead of being kept idle.
+        """
+        reason = None
+        if not (discard or conn.closed):
+            try:
+                if conn.get_transaction_status() != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                    conn.rollback()
+            except psycopg2.Error:
+                discard, reason = True, "closed_unhealthy"
+
+        with self._cond:
+            self._in_use -= 1
+            if self._closed or discard or conn.closed:
+                self._close(conn, reason)
+            elif self._expired(conn):
+                self._close(conn, "closed_expired")
+            else:
+                self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self, timeout: float = None):
+        """
+        Context manager that checks out a connection and always returns it.
+        Connections that failed with a connection-level error are discarded.
+        """
+        conn = self.getconn(timeout)
+        discard = False
+        try:
+            yield conn
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            discard = True
+            raise
+        finally:
+            self.putconn(conn, discard=discard)
+
+    def stats(self) -> dict:
+        """
+        Snapshot of pool size and usage counters.
+        """
+        with self._cond:
+            stats = dict(self._stats)
+            stats.update({
+                "in_use": self._in_use,
+                "idle": len(self._idle),
+                "min_size": self.min_size,
+                "max_size": self.max_size,
+            })
+            return stats
+
+    def closeall(self):
+        with self._cond:
+            self._closed = True
+            while self._idle:
+                conn, _ = self._idle.pop()
+                self._close(conn)
+            self._cond.notify_all()
@@ -0,0 +1,116 @@
+from psycopg2 import sql
+
+MEASUREMENTS_TABLE = "device_measurements_30"
+
+# Per-device power series, mirroring csv_pipeline's transformations:
+# - timestamps floored to the second       (remove_milliseconds)
+# - readings averaged per phase, then summed across phases,
+#   both rounded to 2 decimals            (aggregate_power)
+# Rounding is done in double precision as round(x * 100) / 100, which is how
+# pandas' .round(2) rounds floats (ties to even); ROUND(numeric, 2) would round
+# ties away from zero. As in pandas, rows without a phase are left out of the
+# groups, NULL readings are skipped by the average, and a second whose phases
+# are all NULL sums to 0.
+PER_DEVICE_POWER_CTE = """
+    WITH per_phase AS (
+        SELECT device_id,
+               date_trunc('second', "timestamp") AS ts,
+               phase,
+               ROUND(AVG(power_data)::double precision * 100) / 100 AS power_data
+        FROM {table}
+        WHERE device_id = ANY(%(device_ids)s)
+          AND "timestamp" >= %(start)s::timestamptz
+          AND "timestamp" <  %(end)s::timestamptz
+          AND phase IS NOT NULL
+        GROUP BY device_id, ts, phase
+    ),
+    per_device AS (
+        SELECT device_id,
+               ts,
+               ROUND(COALESCE(SUM(power_data), 0) * 100) / 100 AS power_data
+        FROM per_phase
+        GROUP BY device_id, ts
+    )
+"""
+
+
+class MeasurementRequestError(ValueError):
+    """Raised when a /measurements request body is malformed."""
+
+
+def parse_measurement_request(body: dict):
+    """
+    Validate a /measurements request body and return
+    (device_ids, start, end, layout), where layout is either "long" or a
+    list of (device_id_or_None, column_name) pairs for the wide layout.
+    """
+    if not isinstance(body, dict):
+        raise MeasurementRequestError("Request body must be a JSON object")
+
+    start, end = body.get("start"), body.get("end")
+    if not start or not end:
+        raise MeasurementRequestError("Both 'start' and 'end' are required")
+
+    layout = body.get("layout", "long")
+    if layout == "long":
+        device_ids = body.get("device_ids")
+        if not device_ids or not isinstance(device_ids, list):
+            raise MeasurementRequestError("'device_ids' must be a non-empty list for the long layout")
+        return [str(d) for d in device_ids], start, end, layout
+
+    if not isinstance(layout, list) or not layout:
+        raise MeasurementRequestError("'layout' must be \"long\" or a non-empty list of [device_id, column_name] pairs")
+
+    pairs = []
+    for entry in layout:
+        if not isinstance(entry, (list, tuple)) or len(entry) != 2 or not entry[1]:
+            raise MeasurementRequestError(f"Invalid layout entry: {entry!r}")
+        device_id, column_name = entry
+        pairs.append((None if device_id is None else str(device_id), str(column_name)))
+
+    names = [name for _, name in pairs]
+    if len(set(names)) != len(names) or "timestamp" in names:
+        raise MeasurementRequestError("Layout column names must be unique and must not be 'timestamp'")
+
+    device_ids = [device_id for device_id, _ in pairs if device_id is not None]
+    if not device_ids:
+        raise MeasurementRequestError("Layout must reference at least one device")
+    return device_ids, start, end, pairs
+
+
+def build_measurement_query(device_ids, start, end, layout):
+    """
+    Build the SQL (and its parameters) for a /measurements request.
+
+    - "long" layout: one row per (device_id, timestamp) with the aggregated power_data.
+    - wide layout:   one row per timestamp and one column per layout entry, in
+                     layout order; entries without a device are all-NULL columns.
+    """
+    cte = sql.SQL(PER_DEVICE_POWER_CTE).format(table=sql.Identifier(MEASUREMENTS_TABLE))
+    params = {"device_ids": list(device_ids), "start": start, "end": end}
+
+    if layout == "long":
+        query = sql.SQL("""{cte}
+            SELECT device_id, ts AS "timestamp", power_data
+            FROM per_device
+            ORDER BY ts, device_id;
+        """).format(cte=cte)
+        return query, params
+
+    columns = []
+    for i, (device_id, column_name) in enumerate(layout):
+        if device_id is None:
+            columns.append(sql.SQL("NULL::double precision AS {}").format(sql.Identifier(column_name)))
+        else:
+            key = f"device_{i}"
+            params[key] = device_id
+            columns.append(sql.SQL("MAX(power_data) FILTER (WHERE device_id = {}) AS {}").format(
+                sql.Placeholder(key), sql.Identifier(column_name)))
+
+    query = sql.SQL("""{cte}
+        SELECT ts AS "timestamp", {columns}
+        FROM per_device
+        GROUP BY ts
+        ORDER BY ts;
+    """).format(cte=cte, columns=sql.SQL(", ").join(columns))
+    return query, params
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The service's modules are imported flat, as in the image (WORKDIR /app)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
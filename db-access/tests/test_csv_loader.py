@@ -0,0 +1,190 @@
+import io
+import re
+from contextlib import contextmanager
+
+import psycopg2
+
+import csv_loader
+from csv_loader import BINARY_FORMAT, CSV_FORMAT
+
+TABLE = "device_measurements_30"
+HEADER = b"timestamp,device_id,power_data,phase\n"
+
+
+class FakeDatabase(object):
+    """
+    Just enough of a PostgreSQL session for csv_loader: temp tables and the
+    rows COPYed into them, savepoints (rolling back undoes both) and the
+    rows upserted into TABLE.
+    """
+
+    def __init__(self):
+        self.tables = {}
+        self.savepoints = {}
+        self.upserted = []
+        self.fail_upsert = False
+
+    @contextmanager
+    def connection(self):
+        yield FakeConnection(self)
+
+
+class FakeConnection(object):
+    def __init__(self, db):
+        self.db = db
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def cursor(self):
+        return FakeCursor(self.db)
+
+
+class FakeCursor(object):
+    def __init__(self, db):
+        self.db = db
+        self.rowcount = -1
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, query):
+        db = self.db
+        query = " ".join(query.split())
+        statement = re.match(r"(SAVEPOINT|ROLLBACK TO SAVEPOINT|RELEASE SAVEPOINT) (\w+);", query)
+        if statement:
+            command, name = statement.groups()
+            if command == "SAVEPOINT":
+                db.savepoints[name] = {table: list(rows) for table, rows in db.tables.items()}
+            elif command == "ROLLBACK TO SAVEPOINT":
+                db.tables = {table: list(rows) for table, rows in db.savepoints[name].items()}
+            else:
+                del db.savepoints[name]
+            return
+        created = re.match(r"CREATE TEMP TABLE IF NOT EXISTS (\w+)", query)
+        if created:
+            db.tables.setdefault(created.group(1), [])
+            return
+        upsert = re.match(rf"INSERT INTO {TABLE} .* FROM (\w+)", query)
+        if upsert:
+            if db.fail_upsert:
+                raise psycopg2.DataError("value out of range")
+            db.upserted.extend(self._table(upsert.group(1)))
+            return
+        raise AssertionError(f"Unexpected statement: {query}")
+
+    def copy_expert(self, query, stream, size=None):
+        rows = self._table(re.match(r"COPY (\w+)", query).group(1))
+        lines = [line for line in stream.read().splitlines() if line]
+        if any(line.startswith(b"bad") for line in lines):
+            raise psycopg2.DataError("invalid input syntax")
+        rows.extend(lines)
+        self.rowcount = len(lines)
+
+    def _table(self, name):
+        if name not in self.db.tables:
+            raise psycopg2.ProgrammingError(f'relation "{name}" does not exist')
+        return self.db.tables[name]
+
+
+class RecordingCursor(object):
+    """Keeps the last statement executed, whitespace collapsed."""
+
+    def execute(self, query):
+        self.query = " ".join(query.split())
+
+
+def csv_part(*rows):
+    return io.BytesIO(HEADER + b"".join(row + b"\n" for row in rows))
+
+
+def test_load_batch_loads_every_part():
+    db = FakeDatabase()
+    results = csv_loader.load_batch([
+        ("a", csv_part(b"2024-01-01T00:00:00Z,a,1.5,1", b"2024-01-01T00:00:30Z,a,2.5,1"), CSV_FORMAT),
+        ("b", csv_part(b"2024-01-01T00:00:00Z,b,3.0,1"), CSV_FORMAT),
+    ], TABLE, db)
+
+    assert results == {"a": {"success": True, "rows": 2}, "b": {"success": True, "rows": 1}}
+    assert len(db.upserted) == 3
+
+
+def test_load_batch_first_csv_part_failing_does_not_fail_the_rest():
+    # The first CSV part creates the staging table inside its savepoint: rolling
+    # it back drops the table, which the next CSV part has to create again
+    db = FakeDatabase()
+    results = csv_loader.load_batch([
+        ("bad", csv_part(b"bad row"), CSV_FORMAT),
+        ("good", csv_part(b"2024-01-01T00:00:00Z,good,1.0,1"), CSV_FORMAT),
+    ], TABLE, db)
+
+    assert results["bad"]["success"] is False
+    assert "invalid input syntax" in results["bad"]["error"]
+    assert results["good"] == {"success": True, "rows": 1}
+    assert db.upserted == [b"2024-01-01T00:00:00Z,good,1.0,1"]
+
+
+def test_load_batch_reports_bad_parts_without_affecting_the_others():
+    db = FakeDatabase()
+    results = csv_loader.load_batch([
+        ("a", csv_part(b"2024-01-01T00:00:00Z,a,1.0,1"), CSV_FORMAT),
+        ("header", io.BytesIO(b"timestamp,device_id\n2024-01-01T00:00:00Z,header\n"), CSV_FORMAT),
+        ("format", io.BytesIO(b""), "parquet"),
+        ("b", csv_part(b"bad row"), CSV_FORMAT),
+    ], TABLE, db)
+
+    assert results["a"] == {"success": True, "rows": 1}
+    assert "differs from the batch header" in results["header"]["error"]
+    assert "Unknown part format" in results["format"]["error"]
+    assert results["b"]["success"] is False
+    assert db.upserted == [b"2024-01-01T00:00:00Z,a,1.0,1"]
+
+
+def test_load_batch_failed_upsert_fails_every_staged_part():
+    db = FakeDatabase()
+    db.fail_upsert = True
+    results = csv_loader.load_batch([
+        ("a", csv_part(b"2024-01-01T00:00:00Z,a,1.0,1"), CSV_FORMAT),
+        ("b", io.BytesIO(b"PGCOPY"), BINARY_FORMAT),
+    ], TABLE, db)
+
+    assert results["a"] == {"success": False, "error": "Upsert failed: value out of range"}
+    assert results["b"] == {"success": False, "error": "Upsert failed: value out of range"}
+
+
+
+def test_staging_table_per_header_shape():
+    columns = ["timestamp", "device_id", "power_data", "phase"]
+    assert csv_loader.staging_table_name(TABLE, columns) == csv_loader.staging_table_name(TABLE, list(columns))
+    assert csv_loader.staging_table_name(TABLE, columns) != csv_loader.staging_table_name(TABLE, columns[:3])
+    assert csv_loader.staging_table_name(TABLE, columns).startswith(f"{TABLE}_staging_")
+
+
+def test_staging_table_has_only_the_uploaded_columns():
+    cur = RecordingCursor()
+    staging_table = csv_loader.create_staging_table(cur, TABLE, ["timestamp", "device_id", "power_data"])
+    assert cur.query == (
+        f"CREATE TEMP TABLE IF NOT EXISTS {staging_table} ON COMMIT DELETE ROWS AS "
+        f"SELECT timestamp, device_id, power_data FROM {TABLE} WITH NO DATA;"
+    )
+
+
+def test_load_csv_stream_stages_and_upserts():
+    db = FakeDatabase()
+    rows = csv_loader.load_csv_stream(csv_part(b"2024-01-01T00:00:00Z,a,1.0,1", b"2024-01-01T00:00:00Z,a,2.0,1"), TABLE, db)
+    assert rows == 2
+    assert len(db.upserted) == 2
+
+
+def test_upsert_averages_value_columns_per_conflict_key():
+    cur = RecordingCursor()
+    csv_loader.upsert_from_staging(cur, "staging", TABLE, ["device_id", "timestamp", "power_data", "phase"])
+    assert "SELECT timestamp, device_id, phase, AVG(power_data) AS power_data FROM staging" in cur.query
+    assert "GROUP BY timestamp, device_id, phase ORDER BY timestamp, device_id, phase" in cur.query
+    assert cur.query.endswith("ON CONFLICT (timestamp, device_id, phase) DO UPDATE SET power_data=EXCLUDED.power_data;")
@@ -0,0 +1,42 @@
+import pytest
+
+from measurements import MeasurementRequestError, build_measurement_query, parse_measurement_request
+
+START, END = "2024-01-01T00:00:00Z", "2024-01-02T00:00:00Z"
+
+
+def test_long_layout():
+    device_ids, start, end, layout = parse_measurement_request(
+        {"device_ids": ["a", 2], "start": START, "end": END})
+    assert (device_ids, start, end, layout) == (["a", "2"], START, END, "long")
+
+
+def test_wide_layout_keeps_order_and_empty_columns():
+    device_ids, _, _, layout = parse_measurement_request({
+        "start": START, "end": END,
+        "layout": [["b", "kitchen"], [None, "spare"], ["a", "oven"]],
+    })
+    assert device_ids == ["b", "a"]
+    assert layout == [("b", "kitchen"), (None, "spare"), ("a", "oven")]
+
+
+@pytest.mark.parametrize("body, message", [
+    ([], "JSON object"),
+    ({"device_ids": ["a"], "start": START}, "'start' and 'end'"),
+    ({"start": START, "end": END}, "'device_ids'"),
+    ({"device_ids": "a", "start": START, "end": END}, "'device_ids'"),
+    ({"start": START, "end": END, "layout": "wide"}, "'layout'"),
+    ({"start": START, "end": END, "layout": [["a"]]}, "Invalid layout entry"),
+    ({"start": START, "end": END, "layout": [["a", ""]]}, "Invalid layout entry"),
+    ({"start": START, "end": END, "layout": [["a", "x"], ["b", "x"]]}, "unique"),
+    ({"start": START, "end": END, "layout": [["a", "timestamp"]]}, "unique"),
+    ({"start": START, "end": END, "layout": [[None, "x"]]}, "at least one device"),
+])
+def test_invalid_requests(body, message):
+    with pytest.raises(MeasurementRequestError, match=message):
+        parse_measurement_request(body)
+
+
+def test_wide_query_parameters():
+    _, params = build_measurement_query(["b", "a"], START, END, [("b", "kitchen"), (None, "spare"), ("a", "oven")])
+    assert params == {"device_ids": ["b", "a"], "start": START, "end": END, "device_0": "b", "device_2": "a"}
@@ -0,0 +1,32 @@
+import gzip
+import io
+
+import zstandard
+
+# Content-Encoding values accepted by the upload endpoints
+SUPPORTED_ENCODINGS = ("identity", "gzip", "zstd")
+
+
+class UnsupportedEncodingError(ValueError):
+    """Raised when an upload uses a Content-Encoding the API cannot decode."""
+
+
+def decompressing_stream(stream, content_encoding):
+    """
+    Wrap a binary upload stream so reads return decompressed bytes.
+
+    Decompression is incremental: only the chunk currently being read is
+    held in memory, so compressed uploads can be piped straight into COPY.
+    The returned object supports readline() for the CSV header.
+    """
+    encoding = (content_encoding or "identity").strip().lower()
+    if encoding == "identity":
+        return stream
+    if encoding == "gzip":
+        return gzip.GzipFile(fileobj=stream, mode="rb")
+    if encoding == "zstd":
+        reader = zstandard.ZstdDecompressor().stream_reader(stream, read_across_frames=True)
+        return io.BufferedReader(reader)
+    raise UnsupportedEncodingError(
+        f"Unsupported Content-Encoding: {content_encoding} (expected one of {', '.join(SUPPORTED_ENCODINGS)})"
+    )
@@ -0,0 +1,202 @@
+"""
+Benchmark run_pipeline end to end against a local fake HERON (fake_heron.py).
+
+Usage:
+    python bench_pipeline.py --devices 50 --days 3
+    python bench_pipeline.py --fetch-engine pool --sink http \\
+        --server-args "--latency 0.3 --error-rate 502=0.02 --max-readings 20000"
+    python bench_pipeline.py --devices 50 --days 1 --tail 120 --set tail_poll_seconds=10
+
+The real pipeline runs (fetch engine, streaming decode, splitting, resume,
+retries, throttling, flattening) in a scratch working directory with its
+own pipeline_config.yaml and state/, so the real configuration, checkpoints
+and caches are never touched. The fake server is started as a subprocess
+on a free port and serves the first --devices devices of the registry
+(cloned under new ids when more are asked for than it holds).
+
+Uploads go to --sink:
+    null      discarded once flattened (measures download + flatten)
+    http      db-access at API_URL
+    database  PostgreSQL at the DB_* variables (upload_sink: database)
+
+Reports device-windows/s, rows/s (readings served by the fake server,
+including any downloaded again after a fault) and the p50/p99 time to
+process one device-window, plus the busy seconds and item count of each stage
+from the pipeline's metrics (state/metrics.json) and, once devices have
+caught up, the mean freshness of their uploads (newest reading -> row). The response cache is disabled
+unless --response-cache is given, so every reading is downloaded.
+"""
+import argparse
+import json
+import os
+import shlex
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import requests
+import yaml
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+# Devices the benchmark registry is drawn from (heron_utils is imported only
+# once HERON_DEVICE_REGISTRY points at the benchmark's own copy)
+SOURCE_REGISTRY = os.getenv("HERON_DEVICE_REGISTRY", os.path.join(BENCH_DIR, "heron_utils", "devices.json"))
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def write_registry(path: str, devices: int):
+    with open(SOURCE_REGISTRY) as f:
+        records = json.load(f)
+    selected = []
+    for i in range(devices):
+        record = dict(records[i % len(records)])
+        if i >= len(records):
+            record["deviceid"] = f"{record['deviceid']}-{i // len(records)}"
+        selected.append(record)
+    with open(path, "w") as f:
+        f.write("[\n" + ",\n".join(json.dumps(record) for record in selected) + "\n]\n")
+
+
+def start_server(port: int, registry: str, server_args: str) -> subprocess.Popen:
+    server = subprocess.Popen(
+        [sys.executable, os.path.join(BENCH_DIR, "fake_heron.py"), "--port", str(port), "--registry", registry]
+        + shlex.split(server_args),
+        cwd=BENCH_DIR, stdout=subprocess.DEVNULL,
+    )
+    for _ in range(100):
+        try:
+            requests.get(f"http://127.0.0.1:{port}/stats", timeout=1)
+            return server
+        except requests.exceptions.ConnectionError:
+            if server.poll() is not None:
+                raise RuntimeError("fake_heron.py exited during startup")
+            time.sleep(0.1)
+    server.terminate()
+    raise RuntimeError("fake_heron.py did not start")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--devices", type=int, default=50)
+    parser.add_argument("--days", type=float, default=3, help="history to catch up on")
+    parser.add_argument("--window-days", type=int, default=1, help="relative_delta")
+    parser.add_argument("--processes", type=int, default=3, help="num_processes")
+    parser.add_argument("--fetch-engine", default="async", choices=["async", "pool"])
+    parser.add_argument("--sink", default="null", choices=["null", "http", "database"])
+    parser.add_argument("--upload-format", default="binary", choices=["csv", "binary"])
+    parser.add_argument("--set", nargs="*", default=[], metavar="KEY=VALUE", help="other pipeline_config.yaml values")
+    parser.add_argument("--server-args", default="", help="extra fake_heron.py arguments")
+    parser.add_argument("--response-cache", action="store_true")
+    parser.add_argument("--workdir", help="scratch directory (default: a new temporary one)")
+    parser.add_argument("--tail", type=float, default=0, metavar="SECONDS",
+                        help="run in tail mode for SECONDS after starting, then stop it with SIGTERM")
+    args = parser.parse_args()
+
+    workdir = os.path.abspath(args.workdir or tempfile.mkdtemp(prefix="bench_pipeline_"))
+    os.makedirs(workdir, exist_ok=True)
+    registry = os.path.join(workdir, "devices.json")
+    write_registry(registry, args.devices)
+
+    start = (datetime.now(timezone.utc) - timedelta(days=args.days)).replace(tzinfo=None)
+    config = {
+        "last_updated": start.strftime("%Y-%m-%dT%H:%M:%S.%fZ"),
+        "num_processes": args.processes,
+        "relative_delta": args.window_days,
+        "fetch_engine": args.fetch_engine,
+        "upload_sink": "database" if args.sink == "database" else "http",
+        "upload_format": args.upload_format,
+    }
+    for item in args.set:
+        key, value = item.split("=", 1)
+        config[key] = yaml.safe_load(value)
+    with open(os.path.join(workdir, "pipeline_config.yaml"), "w") as f:
+        yaml.safe_dump(config, f)
+
+    port = free_port()
+    server = start_server(port, registry, args.server_args)
+    os.environ.update({
+        "HERON_SCHEME": "http",
+        "HERON_DOMAIN": f"127.0.0.1:{port}",
+        "HERON_EMAIL": os.getenv("HERON_EMAIL") or "bench",
+        "HERON_PASS": os.getenv("HERON_PASS") or "bench",
+        "HERON_DEVICE_REGISTRY": registry,
+    })
+    if not args.response_cache:
+        os.environ["HERON_RESPONSE_CACHE_MB"] = "0"
+    # The pipeline reads pipeline_config.yaml and keeps state/ in the working directory
+    os.chdir(workdir)
+
+    try:
+        import update_db_pipeline as pipeline
+        import uploading
+
+        if args.sink == "null":
+            uploading.send_device_period_body = lambda body, content_type: None
+            uploading.post_upload_batch = lambda parts: []
+
+        # Seconds from handing out each device-window to its outcome
+        task_seconds = []
+
+        class TimedWorkQueue(pipeline.WorkQueue):
+            def done(self, *args, **kwargs):
+                result = super().done(*args, **kwargs)
+                task_seconds.append(result[1])
+                return result
+
+        pipeline.WorkQueue = TimedWorkQueue
+
+        failure = None
+        t0 = time.perf_counter()
+        try:
+            if args.tail:
+                stopper = threading.Timer(args.tail, os.kill, (os.getpid(), signal.SIGTERM))
+                stopper.daemon = True
+                stopper.start()
+            pipeline.run_pipeline(tail=bool(args.tail))
+        except RuntimeError as e:
+            failure = e
+        elapsed = time.perf_counter() - t0
+        stats = requests.get(f"http://127.0.0.1:{port}/stats").json()
+    finally:
+        server.terminate()
+        server.wait()
+
+    readings = stats.get("readings", 0)
+    faults = {key: value for key, value in sorted(stats.items()) if key.startswith("status_") or key == "truncated"}
+    print(f"\n{args.devices} devices x {args.days:g} days, {args.fetch_engine} engine, {args.sink} sink, "
+          f"{len(task_seconds)} device-windows in {elapsed:.1f}s (state in {workdir})")
+    print(f"  device-windows/s: {len(task_seconds) / max(elapsed, 1e-9):>12,.1f}")
+    print(f"  rows/s:           {readings / max(elapsed, 1e-9):>12,.0f} ({readings:,} readings)")
+    if task_seconds:
+        p50, p99 = np.percentile(task_seconds, [50, 99])
+        print(f"  device-window latency: p50 {p50:.2f}s, p99 {p99:.2f}s")
+    print(f"  HERON requests:   {stats.get('requests', 0):,} ({stats.get('signins', 0)} sign-ins, faults {faults or 'none'})")
+    with open(os.path.join(workdir, "state", "metrics.json")) as f:
+        metrics = json.load(f)
+    histograms = metrics["histograms"]
+    stages = [(stage, histograms.get(f'dedalus_stage_seconds{{stage="{stage}"}}')) for stage in ("fetch", "decode", "flatten", "upload")]
+    print("  stage seconds:    " + ", ".join(f"{stage} {h['sum']:.1f}s/{h['count']}" for stage, h in stages if h))
+    freshness = histograms.get("dedalus_freshness_seconds")
+    if freshness:
+        violations = metrics["counters"].get("dedalus_freshness_violations_total", 0)
+        print(f"  freshness:        mean {freshness['sum'] / freshness['count']:.1f}s over {freshness['count']} caught-up uploads"
+              + (f", {violations:g} over the target" if args.tail else ""))
+    if failure:
+        print(f"  FAILED: {failure}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
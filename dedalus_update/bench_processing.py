@@ -0,0 +1,121 @@
+"""
+Benchmark the payload flatteners in processing.py on a synthetic HERON payload.
+
+Usage:
+    python bench_processing.py --days 10 --repeat 3
+    python bench_processing.py --days 1 --flatteners csv/rowwise csv/vectorized
+
+Flatteners:
+    csv/rowwise        flatten_payload_to_csv_buffer_rowwise (one datetime parse per reading)
+    csv/vectorized     flatten_payload_to_csv_buffer (what the pipeline uses)
+    binary/rowwise     flatten_payload_to_copy_buffer_rowwise
+    binary/vectorized  flatten_payload_to_copy_buffer (what the pipeline uses)
+
+The payload mimics a 3-phase device reporting every second. Before timing,
+each vectorized flattener is checked against its row-wise counterpart
+(same rows, same instants, same values).
+"""
+import argparse
+import io
+import struct
+import time
+from datetime import datetime, timedelta, timezone
+
+import pandas as pd
+
+from processing import (
+    COPY_BINARY_HEADER,
+    flatten_payload_to_copy_buffer,
+    flatten_payload_to_copy_buffer_rowwise,
+    flatten_payload_to_csv_buffer,
+    flatten_payload_to_csv_buffer_rowwise,
+)
+
+FLATTENERS = {
+    "csv/rowwise":       flatten_payload_to_csv_buffer_rowwise,
+    "csv/vectorized":    flatten_payload_to_csv_buffer,
+    "binary/rowwise":    flatten_payload_to_copy_buffer_rowwise,
+    "binary/vectorized": flatten_payload_to_copy_buffer,
+}
+
+
+def make_payload(days: float, phases: int = 3, missing_every: int = 1000) -> dict:
+    """{phase: [{"time": ..., "value": ...}]} with one reading per second per phase."""
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    seconds = int(days * 86400)
+    payload = {}
+    for phase in range(1, phases + 1):
+        payload[str(phase)] = [
+            {
+                "time": (start + timedelta(seconds=i, milliseconds=i % 1000)).strftime("%Y-%m-%dT%H:%M:%S.%f")[:-3] + "Z",
+                "value": None if missing_every and i % missing_every == 0 else round((i * 7 % 3000) / 10, 1),
+            }
+            for i in range(seconds)
+        ]
+    return payload
+
+
+def decode_copy_binary(data: bytes):
+    """Rows (device_id, timestamp micros, power_data, phase) of a binary COPY stream."""
+    rows, pos = [], len(COPY_BINARY_HEADER)
+    while True:
+        (count,) = struct.unpack_from("!h", data, pos)
+        pos += 2
+        if count == -1:
+            return rows
+        fields = []
+        for _ in range(count):
+            (length,) = struct.unpack_from("!i", data, pos)
+            pos += 4
+            fields.append(None if length == -1 else data[pos:pos + length])
+            pos += max(length, 0)
+        device_id, ts, value, phase = fields
+        rows.append((
+            device_id.decode(),
+            struct.unpack("!q", ts)[0],
+            None if value is None else struct.unpack("!d", value)[0],
+            None if phase is None else struct.unpack("!i", phase)[0],
+        ))
+
+
+def csv_rows(buffer: io.StringIO) -> pd.DataFrame:
+    frame = pd.read_csv(io.StringIO(buffer.getvalue()), dtype={"device_id": str})
+    frame["timestamp"] = pd.to_datetime(frame["timestamp"], utc=True, format="ISO8601")
+    return frame.sort_values(["device_id", "timestamp"]).reset_index(drop=True)
+
+
+def verify(payload: dict):
+    pd.testing.assert_frame_equal(
+        csv_rows(flatten_payload_to_csv_buffer_rowwise(payload, "bench")),
+        csv_rows(flatten_payload_to_csv_buffer(payload, "bench")),
+    )
+    rowwise = sorted(decode_copy_binary(flatten_payload_to_copy_buffer_rowwise(payload, "bench").getvalue()))
+    vectorized = sorted(decode_copy_binary(flatten_payload_to_copy_buffer(payload, "bench").getvalue()))
+    assert rowwise == vectorized, "binary COPY output differs"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--days", type=float, default=10)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--flatteners", nargs="+", default=list(FLATTENERS), choices=list(FLATTENERS))
+    args = parser.parse_args()
+
+    verify(make_payload(days=0.1))
+
+    payload = make_payload(args.days)
+    rows = sum(len(readings) for readings in payload.values())
+    print(f"payload: {args.days:g} days x {len(payload)} phases = {rows:,} readings")
+
+    for name in args.flatteners:
+        samples = []
+        for _ in range(args.repeat):
+            t0 = time.perf_counter()
+            FLATTENERS[name](payload, "bench")
+            samples.append(time.perf_counter() - t0)
+        best = min(samples)
+        print(f"{name:>18}: {rows / best:>12,.0f} rows/s (best of {len(samples)}, {best:.2f}s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Benchmark end-to-end upload throughput of the two upload sinks: flatten a
+synthetic HERON payload per device and get it into device_measurements_30.
+
+Usage:
+    python bench_sink.py --devices 20 --days 1 --workers 3
+    python bench_sink.py --sinks http/binary database/binary --compression zstd
+
+Sinks:
+    http/csv          CSV body, compressed, POSTed to db-access /upload_csv
+    http/binary       binary COPY body, compressed, POSTed to /upload_binary
+    database/csv      CSV body COPYed straight into the database (upload_sink: database)
+    database/binary   binary COPY body COPYed straight into the database
+
+The http sinks need db-access running at API_URL, the database sinks the
+DB_* variables; both must point at the same database. Rows are written
+under device ids starting with "bench-" and deleted before every run and at
+the end, so run this against a test database, not production.
+
+Each device is flattened and uploaded by one of --workers threads, as in
+the pipeline's upload stage; rows/s covers flattening, compression (http),
+transfer and the upsert.
+"""
+import argparse
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from bench_processing import make_payload
+from db_sink import DatabaseSink, MEASUREMENTS_TABLE
+from processing import compress_upload_body, flatten_payload_to_copy_buffer, flatten_payload_to_csv_buffer
+
+SINKS = ("http/csv", "http/binary", "database/csv", "database/binary")
+DEVICE_PREFIX = "bench-"
+
+
+def flatten(payload: dict, device_id: str, fmt: str):
+    """(body, content_type) of a device payload, as create_device_period_upload_body builds it."""
+    if fmt == "binary":
+        return flatten_payload_to_copy_buffer(payload, device_id).getvalue(), "application/octet-stream"
+    return flatten_payload_to_csv_buffer(payload, device_id).getvalue().encode("utf-8"), "text/csv"
+
+
+def upload_http(body: bytes, content_type: str, compression: str):
+    payload = compress_upload_body(body, compression)
+    headers = {"Content-Type": content_type}
+    if payload is not body:
+        headers["Content-Encoding"] = compression
+    endpoint = "upload_binary" if content_type == "application/octet-stream" else "upload_csv"
+    requests.post(f"{os.getenv('API_URL')}/{endpoint}", data=payload, headers=headers).raise_for_status()
+
+
+def delete_bench_rows(sink: DatabaseSink):
+    with sink.connection() as conn:
+        with conn, conn.cursor() as cur:
+            cur.execute(f"DELETE FROM {MEASUREMENTS_TABLE} WHERE device_id LIKE %s;", (f"{DEVICE_PREFIX}%",))
+
+
+def run(sink_name: str, payload: dict, devices: int, workers: int, compression: str, sink: DatabaseSink) -> float:
+    """Upload every device once through sink_name; returns the elapsed seconds."""
+    kind, fmt = sink_name.split("/")
+
+    def upload_device(d: int):
+        body, content_type = flatten(payload, f"{DEVICE_PREFIX}{d:04d}", fmt)
+        if kind == "database":
+            sink.load(body, content_type)
+        else:
+            upload_http(body, content_type, compression)
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        list(executor.map(upload_device, range(devices)))
+    return time.perf_counter() - t0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--devices", type=int, default=20)
+    parser.add_argument("--days", type=float, default=1)
+    parser.add_argument("--workers", type=int, default=3)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--compression", default="gzip", choices=["gzip", "zstd", "none"])
+    parser.add_argument("--sinks", nargs="+", default=list(SINKS), choices=list(SINKS))
+    args = parser.parse_args()
+
+    payload = make_payload(args.days)
+    rows = args.devices * sum(len(readings) for readings in payload.values())
+    print(f"payload: {args.devices} devices x {args.days:g} days x {len(payload)} phases = {rows:,} readings")
+
+    sink = DatabaseSink(pool_size=args.workers)
+    try:
+        for sink_name in args.sinks:
+            timings = {"insert": [], "upsert": []}
+            for _ in range(args.repeat):
+                delete_bench_rows(sink)
+                # First upload inserts every key, the second one hits ON CONFLICT for every key
+                for phase in ("insert", "upsert"):
+                    timings[phase].append(run(sink_name, payload, args.devices, args.workers, args.compression, sink))
+            for phase, samples in timings.items():
+                best = min(samples)
+                print(f"{sink_name:>16} {phase:>6}: {rows / best:>12,.0f} rows/s (best of {len(samples)}, {best:.2f}s)")
+    finally:
+        delete_bench_rows(sink)
+        sink.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+import os
+import sqlite3
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+from heron_utils.settings import TIME_FORMAT
+
+# Per-device progress, kept across restarts via the state volume
+CHECKPOINTS_PATH = os.getenv("CHECKPOINTS_PATH", "state/checkpoints.db")
+
+
+def _parse_time(value: Optional[str]) -> Optional[datetime]:
+    return datetime.strptime(value, TIME_FORMAT).replace(tzinfo=timezone.utc) if value else None
+
+
+def _format_time(value: Optional[datetime]) -> Optional[str]:
+    return value.strftime(TIME_FORMAT) if value else None
+
+
+class CheckpointStore(object):
+    """
+    SQLite ledger of per-device watermarks: the end of the last window whose
+    data was fully uploaded for that device. Each device advances on its own,
+    so a failing device never forces the others to re-download a window, and
+    a restart resumes every device exactly where it stopped.
+
+    It also keeps each device's activity for the WindowScheduler: the end
+    of its last window with data, how many requests in a row came back
+    empty, and when a dormant device is polled again.
+
+    Only the main pipeline process writes to the store.
+    """
+
+    def __init__(self, path: str = CHECKPOINTS_PATH):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL;")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS device_watermarks (
+                device_id  TEXT PRIMARY KEY,
+                watermark  TEXT NOT NULL,
+                updated_at TEXT NOT NULL
+            );
+        """)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS device_activity (
+                device_id    TEXT PRIMARY KEY,
+                last_data_at TEXT,
+                empty_streak INTEGER NOT NULL DEFAULT 0,
+                next_poll_at TEXT
+            );
+        """)
+        self.conn.commit()
+
+    def watermarks(self) -> Dict[str, datetime]:
+        rows = self.conn.execute("SELECT device_id, watermark FROM device_watermarks;")
+        return {device_id: _parse_time(watermark) for device_id, watermark in rows}
+
+    def advance(self, device_id: str, watermark: datetime):
+        """Record that device_id is complete up to watermark (never moves a watermark backwards)."""
+        # TIME_FORMAT strings sort chronologically, so MAX() keeps the later watermark
+        self.conn.execute("""
+            INSERT INTO device_watermarks (device_id, watermark, updated_at)
+            VALUES (?, ?, ?)
+            ON CONFLICT (device_id) DO UPDATE SET
+                watermark = MAX(watermark, excluded.watermark),
+                updated_at = excluded.updated_at;
+        """, (device_id, watermark.strftime(TIME_FORMAT), datetime.now(timezone.utc).strftime(TIME_FORMAT)))
+        self.conn.commit()
+
+    def activity(self) -> Dict[str, dict]:
+        rows = self.conn.execute("SELECT device_id, last_data_at, empty_streak, next_poll_at FROM device_activity;")
+        return {
+            device_id: {
+                "last_data_at": _parse_time(last_data_at),
+                "empty_streak": empty_streak,
+                "next_poll_at": _parse_time(next_poll_at),
+            }
+            for device_id, last_data_at, empty_streak, next_poll_at in rows
+        }
+
+    def record_activity(self, device_id: str, last_data_at: Optional[datetime], empty_streak: int, next_poll_at: Optional[datetime]):
+        self.conn.execute("""
+            INSERT OR REPLACE INTO device_activity (device_id, last_data_at, empty_streak, next_poll_at)
+            VALUES (?, ?, ?, ?);
+        """, (device_id, _format_time(last_data_at), empty_streak, _format_time(next_poll_at)))
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,155 @@
+import io
+import os
+import threading
+import time
+from typing import Dict, List, Tuple
+
+import psycopg2
+from tenacity import (
+    retry,
+    stop_after_attempt,
+    wait_chain,
+    wait_fixed,
+    retry_if_exception_type,
+)
+
+from logger_config import logger, loguru_before_sleep
+from metrics import METRICS
+# The staging/upsert SQL and the connection pool of db-access (vendored)
+from vendor import csv_loader
+from vendor.csv_loader import BINARY_FORMAT, CSV_FORMAT
+from vendor.db_pool import ConnectionPool
+
+# Same settings as db-access, so both services can share one .env
+DB_PARAMS = {
+    "host":     os.getenv('DB_HOST', 'localhost'),
+    "port":     int(os.getenv('DB_PORT', '5432')),
+    "database": os.getenv('DB_NAME', 'test_db'),
+    "user":     os.getenv('DB_USER', 'user'),
+    "password": os.getenv('DB_PASSWORD', 'password'),
+}
+# Connections kept open per process by the database sink; more concurrent loads wait for one
+DB_SINK_POOL_SIZE = int(os.getenv('DB_SINK_POOL_SIZE', '4'))
+# Seconds a load waits for a free connection before failing
+DB_SINK_ACQUIRE_TIMEOUT = float(os.getenv('DB_SINK_ACQUIRE_TIMEOUT', '600'))
+MEASUREMENTS_TABLE = "device_measurements_30"
+
+# Content type of a flattened body -> csv_loader part format
+CONTENT_FORMATS = {
+    "text/csv": CSV_FORMAT,
+    "application/octet-stream": BINARY_FORMAT,
+}
+
+
+class DatabaseSink(object):
+    """
+    Loads flattened device payloads straight into MEASUREMENTS_TABLE, without
+    the HTTP hop through db-access.
+
+    Bodies are loaded by db-access' own csv_loader functions (vendored), with this sink
+    as their pool: COPY into a per-session temp staging table, then
+    deduplicate (averaging power_data per timestamp/device_id/phase) and
+    upsert in one statement, so the two sinks can be swapped and mixed freely.
+
+    Connections come from a small db-access ConnectionPool per process (loads
+    beyond pool_size wait for a free connection): multiprocessing workers
+    inherit the instance built at import time and open their own.
+    """
+
+    def __init__(self, db_params: dict = None, table_name: str = MEASUREMENTS_TABLE, pool_size: int = DB_SINK_POOL_SIZE):
+        self.db_params = db_params or DB_PARAMS
+        self.table_name = table_name
+        self.pool_size = pool_size
+        self._pool = None
+        self._pool_pid = None
+        self._lock = threading.Lock()
+
+    @property
+    def pool(self) -> ConnectionPool:
+        with self._lock:
+            if self._pool is None or self._pool_pid != os.getpid():
+                self._pool = ConnectionPool(self.db_params, min_size=0, max_size=self.pool_size,
+                                            acquire_timeout=DB_SINK_ACQUIRE_TIMEOUT)
+                self._pool_pid = os.getpid()
+            return self._pool
+
+    def connection(self):
+        """Check out a pooled connection (a context manager, as ConnectionPool.connection)."""
+        return self.pool.connection()
+
+    def close(self):
+        with self._lock:
+            if self._pool is not None and self._pool_pid == os.getpid():
+                self._pool.closeall()
+            self._pool = None
+
+    def load(self, body: bytes, content_type: str) -> int:
+        """Load one CSV or binary COPY body in its own transaction; returns the rows copied."""
+        fmt = CONTENT_FORMATS.get(content_type)
+        if fmt == BINARY_FORMAT:
+            return csv_loader.load_binary_stream(io.BytesIO(body), self.table_name, self)
+        if fmt == CSV_FORMAT:
+            return csv_loader.load_csv_stream(io.BytesIO(body), self.table_name, self)
+        raise ValueError(f"Unsupported body content type: {content_type}")
+
+    def load_batch(self, parts: List[Tuple[str, bytes, str]]) -> Tuple[Dict[str, str], int]:
+        """
+        Load many (device_id, body, content_type) parts in one transaction
+        with csv_loader.load_batch: a part that fails is rolled back without
+        affecting the others. Returns ({failed device_id: error}, rows loaded).
+        """
+        results = csv_loader.load_batch(
+            ((device_id, io.BytesIO(body), CONTENT_FORMATS.get(content_type, content_type)) for device_id, body, content_type in parts),
+            self.table_name, self
+        )
+        errors = {device_id: result["error"] for device_id, result in results.items() if not result["success"]}
+        rows = sum(result["rows"] for result in results.values() if result["success"])
+        return errors, rows
+
+
+# Sink of UPLOAD_SINK "database"; db_sink is only imported with that setting
+DB_SINK = DatabaseSink()
+
+@retry(
+    retry=retry_if_exception_type((psycopg2.OperationalError, psycopg2.InterfaceError)),
+    wait=wait_chain(wait_fixed(60), wait_fixed(180), wait_fixed(300)),
+    stop=stop_after_attempt(4),
+    before_sleep=loguru_before_sleep
+)
+def load_device_period_body(body: bytes, content_type: str):
+    """
+    Load an already-flattened body straight into the database (UPLOAD_SINK
+    "database") and log a size/throughput report for the load.
+    """
+    t0 = time.perf_counter()
+    rows = DB_SINK.load(body, content_type)
+    load_seconds = time.perf_counter() - t0
+    METRICS.inc("dedalus_bytes_total", len(body), kind="sent")
+    logger.info(
+        f"Loaded {rows} rows ({len(body)} bytes {content_type}) into {MEASUREMENTS_TABLE} "
+        f"in {load_seconds:.2f}s ({rows / max(load_seconds, 1e-9):,.0f} rows/s)"
+    )
+
+@retry(
+    retry=retry_if_exception_type((psycopg2.OperationalError, psycopg2.InterfaceError)),
+    wait=wait_chain(wait_fixed(60), wait_fixed(180), wait_fixed(300)),
+    stop=stop_after_attempt(4),
+    before_sleep=loguru_before_sleep
+)
+def load_upload_batch(parts: List[Tuple[str, bytes, str]]) -> List[str]:
+    """
+    Load many device payloads straight into the database in one transaction
+    (UPLOAD_SINK "database"). Returns the device ids whose part failed.
+    """
+    raw_bytes = sum(len(body) for _, body, _ in parts)
+    t0 = time.perf_counter()
+    errors, rows = DB_SINK.load_batch(parts)
+    load_seconds = time.perf_counter() - t0
+    METRICS.inc("dedalus_bytes_total", raw_bytes, kind="sent")
+    for device_id, error in errors.items():
+        logger.error(f"✗ Batch load of device {device_id} failed: {error}")
+    logger.info(
+        f"Loaded batch of {len(parts)} devices ({rows} rows, {raw_bytes} bytes) into {MEASUREMENTS_TABLE} "
+        f"in {load_seconds:.2f}s ({rows / max(load_seconds, 1e-9):,.0f} rows/s), {len(errors)} failed"
+    )
+    return list(errors)
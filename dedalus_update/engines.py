@@ -0,0 +1,274 @@
+import asyncio
+import multiprocessing
+import queue
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Callable, Optional, Tuple
+
+from fetching import async_fetch_device_period_data, fetch_device_period_data
+from heron_manager import TIME_FORMAT
+from heron_utils.async_heron_api import AsyncHeronApi
+from logger_config import logger
+from metrics import METRICS
+from pipeline_config_manager import read_config_value
+from processing import latest_reading_time
+from scheduler import WorkQueue
+from uploading import UPLOAD_BATCH_SIZE, create_device_period_upload_body, flatten_device_period_data, record_device_window_size, upload_body_with_result, upload_batch_with_results, upload_device_period_data
+
+# Maximum number of devices downloaded at once by the async fetch engine
+MAX_IN_FLIGHT = int(read_config_value("max_in_flight", 100))
+# Async engine stages: processes flattening payloads, threads uploading them (default: num_processes)
+FLATTEN_WORKERS = read_config_value("flatten_workers")
+UPLOAD_WORKERS = read_config_value("upload_workers")
+# Capacity of each queue between the fetch, flatten and upload stages
+STAGE_QUEUE_SIZE = int(read_config_value("stage_queue_size", 16))
+
+def process_device_period(device_id: str, window_start: datetime, window_end: datetime) -> Optional[datetime]:
+    """
+    Download and upload one (device, window); returns the time of its
+    newest reading, or None if there was no data.
+    """
+    try:
+        data = fetch_device_period_data(device_id, window_start, window_end)
+        if not data:
+            return None
+        upload_device_period_data(device_id, data, window_start, window_end)
+        return latest_reading_time(data)
+
+    except Exception as e:
+        logger.error(f"✗ {device_id} {window_start.strftime(TIME_FORMAT)} EXC: {e}")
+        raise e
+
+def process_device_task(task: Tuple[str, datetime, datetime]) -> Tuple[str, bool, Optional[datetime], None]:
+    """
+    Pool worker entry point: process one (device, window) and report
+    (device_id, success, newest reading time or None, None) instead of
+    raising, so one device's failure does not abort the others.
+    """
+    try:
+        return task[0], True, process_device_period(*task), None
+    except Exception:
+        return task[0], False, None, None
+    finally:
+        METRICS.flush()
+
+def prepare_device_period_part(task: Tuple[str, datetime, datetime]) -> Tuple[str, bool, Optional[datetime], Optional[Tuple[str, bytes, str]]]:
+    """
+    Worker side of batched uploads: download and flatten one (device, window)
+    and return (device_id, success, newest reading time, part), where part
+    is (device_id, body, content_type); both are None if there is no data.
+    """
+    device_id, window_start, window_end = task
+    try:
+        data = fetch_device_period_data(device_id, window_start, window_end)
+        if not data:
+            return device_id, True, None, None
+        body, content_type = flatten_device_period_data(device_id, data, window_start, window_end)
+        return device_id, True, latest_reading_time(data), (device_id, body, content_type)
+    except Exception as e:
+        logger.error(f"✗ {device_id} {window_start.strftime(TIME_FORMAT)} EXC: {e}")
+        return device_id, False, None, None
+    finally:
+        METRICS.flush()
+
+def run_tasks_in_pool(work: WorkQueue, num_processes: int, on_device_done: Callable[..., None], batch_size: int = UPLOAD_BATCH_SIZE):
+    """
+    Process every task of work in one multiprocessing pool kept for the
+    whole run (workers start and sign in once), with up to
+    2 * num_processes tasks submitted so no worker waits for the next one.
+    A device's next window is submitted as soon as its task is done.
+
+    With batch_size > 1 workers only download and flatten; their payloads
+    are uploaded batch_size devices at a time, or as many as there are
+    once no other task is out.
+    """
+    worker = prepare_device_period_part if batch_size > 1 else process_device_task
+    results = queue.Queue()
+    in_flight, batch, latest_readings = 0, [], {}
+    with multiprocessing.Pool(processes=num_processes) as pool:
+        while True:
+            while in_flight < 2 * num_processes:
+                task = work.pop()
+                if task is None:
+                    break
+                pool.apply_async(worker, (task,), callback=results.put,
+                                 error_callback=lambda e, device_id=task[0]: results.put((device_id, False, None, None)))
+                in_flight += 1
+            if batch and (len(batch) >= batch_size or not in_flight):
+                for device_id, success in upload_batch_with_results(batch):
+                    on_device_done(device_id, success, latest_reading=latest_readings.pop(device_id))
+                batch = []
+                continue
+            if not in_flight:
+                if work.finished:
+                    break
+                # Tail mode: nothing due yet
+                time.sleep(work.wait_seconds())
+                continue
+            try:
+                device_id, success, latest_reading, part = results.get(timeout=work.wait_seconds())
+            except queue.Empty:
+                continue
+            in_flight -= 1
+            if part is not None:
+                batch.append(part)
+                latest_readings[device_id] = latest_reading
+            else:
+                on_device_done(device_id, success, has_data=latest_reading is not None, latest_reading=latest_reading)
+
+class StageTimer(object):
+    """Accumulates the time a pipeline stage spends working on items."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.items = 0
+        self.busy_seconds = 0.0
+
+    @contextmanager
+    def measure(self):
+        # Start time is local: many coroutines of one stage measure concurrently
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.items += 1
+            self.busy_seconds += time.perf_counter() - t0
+
+    def summary(self, workers: int, elapsed: float) -> str:
+        utilization = self.busy_seconds / max(workers * elapsed, 1e-9)
+        return f"{self.name}: {self.items} items, {self.busy_seconds:.1f}s busy, {utilization:.0%} of {workers} workers"
+
+async def run_tasks_async(work: WorkQueue, num_workers: int, on_device_done: Callable[..., None], batch_size: int = UPLOAD_BATCH_SIZE):
+    """
+    Process every task of work as a three-stage pipeline so downloading,
+    flattening and uploading overlap:
+
+        fetch   (MAX_IN_FLIGHT coroutines on one event loop)
+          -> queue (STAGE_QUEUE_SIZE payloads)
+        flatten (FLATTEN_WORKERS processes, CPU-bound)
+          -> queue (STAGE_QUEUE_SIZE bodies)
+        upload  (UPLOAD_WORKERS threads to UPLOAD_SINK, grouped into
+                 /upload_batch requests or database transactions of up to
+                 batch_size bodies when batch_size > 1)
+
+    The queues are bounded, so a slow stage applies backpressure upstream:
+    memory stays bounded while the slowest stage is kept busy. The stages,
+    the HERON session and the worker pools live for the whole run; a
+    device's next window is fetched as soon as its previous one is done.
+
+    Each device's outcome is reported to on_device_done(device_id, success,
+    has_data=True) as soon as it is known; a device that fails after its
+    retries does not affect the others.
+    """
+    flatten_workers = int(FLATTEN_WORKERS or num_workers)
+    upload_workers = int(UPLOAD_WORKERS or num_workers)
+    fetch_workers = max(1, min(MAX_IN_FLIGHT, len(work)))
+
+    loop = asyncio.get_running_loop()
+    payload_queue = asyncio.Queue(maxsize=STAGE_QUEUE_SIZE)
+    body_queue = asyncio.Queue(maxsize=STAGE_QUEUE_SIZE)
+    # Set whenever a device finishes, which may queue its next window
+    work_changed = asyncio.Event()
+    latest_readings = {}
+
+    def report(device_id: str, success: bool, has_data: bool = True):
+        on_device_done(device_id, success, has_data=has_data, latest_reading=latest_readings.pop(device_id, None))
+        work_changed.set()
+
+    timers = {name: StageTimer(name) for name in ("fetch", "flatten", "upload")}
+    started = time.perf_counter()
+
+    async def fetch_stage(api: AsyncHeronApi):
+        while True:
+            task = work.pop()
+            if task is None:
+                if work.finished:
+                    # Wake the other fetchers so they see it too
+                    work_changed.set()
+                    return
+                work_changed.clear()
+                try:
+                    await asyncio.wait_for(work_changed.wait(), work.wait_seconds())
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            device_id, window_start, window_end = task
+            try:
+                with timers["fetch"].measure():
+                    data = await async_fetch_device_period_data(api, device_id, window_start, window_end)
+            except Exception as e:
+                logger.error(f"✗ {device_id} {window_start.strftime(TIME_FORMAT)} EXC: {e}")
+                report(device_id, False)
+                continue
+            if not data:
+                report(device_id, True, has_data=False)
+                continue
+            latest_readings[device_id] = latest_reading_time(data)
+            await payload_queue.put((device_id, window_start, data))
+
+    async def flatten_stage(executor: ProcessPoolExecutor):
+        while True:
+            item = await payload_queue.get()
+            if item is None:
+                return
+            device_id, window_start, data = item
+            try:
+                with timers["flatten"].measure(), METRICS.timer("dedalus_stage_seconds", stage="flatten"):
+                    logger.info(f"Processing data for device: {device_id} in window: {window_start.isoformat()}")
+                    body, content_type = await loop.run_in_executor(executor, create_device_period_upload_body, data, device_id)
+            except Exception as e:
+                logger.error(f"✗ {device_id} {window_start.strftime(TIME_FORMAT)} EXC: {e}")
+                report(device_id, False)
+                continue
+            record_device_window_size(data, body)
+            del data
+            await body_queue.put((device_id, body, content_type))
+
+    async def upload_stage(executor: ThreadPoolExecutor):
+        finished = False
+        while not finished:
+            item = await body_queue.get()
+            if item is None:
+                return
+            # Batch what is already waiting instead of holding bodies back for a full
+            # batch: their devices' next windows are not fetched until they are uploaded
+            batch = [item]
+            while len(batch) < batch_size and not body_queue.empty():
+                item = body_queue.get_nowait()
+                if item is None:
+                    finished = True
+                    break
+                batch.append(item)
+            with timers["upload"].measure():
+                if batch_size > 1:
+                    results = await loop.run_in_executor(executor, upload_batch_with_results, batch)
+                else:
+                    results = await loop.run_in_executor(executor, upload_body_with_result, *batch[0])
+            for result in results:
+                report(*result)
+
+    with ProcessPoolExecutor(max_workers=flatten_workers) as flatten_executor, \
+            ThreadPoolExecutor(max_workers=upload_workers) as upload_executor:
+        async with AsyncHeronApi(max_connections=MAX_IN_FLIGHT) as api:
+            flatteners = [asyncio.ensure_future(flatten_stage(flatten_executor)) for _ in range(flatten_workers)]
+            uploaders = [asyncio.ensure_future(upload_stage(upload_executor)) for _ in range(upload_workers)]
+
+            # The fetchers return once every device is done; then each stage drains
+            # and tells the next one (one sentinel per worker) that no more items will come
+            await asyncio.gather(*(fetch_stage(api) for _ in range(fetch_workers)))
+            for _ in flatteners:
+                await payload_queue.put(None)
+            await asyncio.gather(*flatteners)
+            for _ in uploaders:
+                await body_queue.put(None)
+            await asyncio.gather(*uploaders)
+
+    elapsed = time.perf_counter() - started
+    logger.info(
+        f"Pipeline finished in {elapsed:.1f}s; "
+        f"{timers['fetch'].summary(fetch_workers, elapsed)}; "
+        f"{timers['flatten'].summary(flatten_workers, elapsed)}; "
+        f"{timers['upload'].summary(upload_workers, elapsed)}"
+    )
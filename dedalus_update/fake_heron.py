@@ -0,0 +1,245 @@
+"""
+Local stand-in for the HERON API, to run and benchmark dedalus_update
+without the live service.
+
+Usage:
+    python fake_heron.py --port 8080 --interval 10 --latency 0.2 --error-rate 502=0.01
+    HERON_SCHEME=http HERON_DOMAIN=localhost:8080 HERON_EMAIL=x HERON_PASS=x python update_db_pipeline.py
+
+Endpoints (same paths and response shapes as HERON):
+    POST /api/v1/user/signin        {"token": ...}, valid for --token-ttl seconds
+    GET  /api/v1/devices            the records of the device registry
+    GET  /api/v1/devices/{id}       one record
+    GET  /api/v1/devices/{id}/data  {"power": {phase: [{"time": ..., "value": ...}, ...]}}
+                                    for time_from <= time < time_to (nanoseconds)
+    GET  /stats                     counters of requests, readings served and injected faults
+
+Every device of the registry (HERON_DEVICE_REGISTRY) gets a synthetic power
+series, one reading per --interval seconds from its registration on: three
+phases for 3-phase meters, one otherwise. Meters follow a daily load curve,
+plugs switch an appliance on and off. Series are deterministic per device
+and time, so repeated or resumed requests return the same readings.
+
+Faults:
+    --latency / --jitter   seconds before the response headers
+    --error-rate S=P       answer status S (401, 429, 502, 503 or 504) with probability P
+    --truncate-rate P      cut a data response off at a random point with probability P
+    --max-readings N       cut off every data response after N readings, like HERON
+                           does with oversized responses
+    --offline-fraction F   fraction of devices whose responses are always empty
+"""
+import argparse
+import asyncio
+import json
+import math
+import random
+import time
+import uuid
+import zlib
+from collections import Counter
+
+import numpy as np
+from aiohttp import web
+
+from heron_utils.device_registry import DEVICE_REGISTRY_PATH
+
+# Readings generated and written per chunk of a streamed response
+CHUNK_READINGS = 5000
+FAULT_STATUSES = (401, 429, 502, 503, 504)
+
+
+class SyntheticSeries(object):
+    """Deterministic power readings of one device."""
+
+    def __init__(self, record: dict, interval: float):
+        self.seed = zlib.crc32(record["deviceid"].encode("utf-8"))
+        self.phases = ["1", "2", "3"] if "3-phase" in (record.get("device_type_text") or "") else ["1"]
+        self.is_meter = "EM" in (record.get("device_type_text") or "")
+        self.interval_ms = max(1, int(interval * 1000))
+        # Devices do not report on whole seconds
+        self.offset_ms = self.seed % self.interval_ms
+        rng = np.random.default_rng(self.seed)
+        self.base = rng.uniform(50, 400) if self.is_meter else rng.uniform(0.3, 2)
+        self.peak = rng.uniform(500, 3000)
+        self.cycle_seconds = rng.uniform(600, 7200)
+
+    def times_ms(self, time_from_ns: int, time_to_ns: int, not_before_ms: int) -> np.ndarray:
+        start_ms = max(-(-time_from_ns // 1000000), not_before_ms)
+        first = -(-(start_ms - self.offset_ms) // self.interval_ms)
+        last = -(-(-(-time_to_ns // 1000000) - self.offset_ms) // self.interval_ms)
+        return np.arange(first, max(first, last), dtype=np.int64) * self.interval_ms + self.offset_ms
+
+    def values(self, times_ms: np.ndarray, phase_index: int) -> np.ndarray:
+        seconds = times_ms / 1000.0
+        if self.is_meter:
+            # Daily curve peaking in the evening, phases unevenly loaded
+            daily = 0.5 * (1 + np.sin(2 * math.pi * (seconds / 86400 - 0.45)))
+            values = (self.base + self.peak * daily ** 2) / (1 + phase_index * 0.3)
+        else:
+            # An appliance on for a third of each cycle
+            on = (seconds + self.seed) % self.cycle_seconds < self.cycle_seconds / 3
+            values = np.where(on, self.peak / 3, self.base)
+        # +-5% noise hashed from the reading's time, so it does not depend on the requested range
+        noise = (times_ms.astype(np.uint64) * np.uint64(2654435761) + np.uint64(self.seed + phase_index)) % np.uint64(1000)
+        return np.round(values * (0.95 + noise / 10000.0), 1)
+
+
+def encode_readings(times_ms: np.ndarray, values: np.ndarray) -> str:
+    stamps = np.datetime_as_string(times_ms.astype("datetime64[ms]"), unit="ms")
+    return ",".join(f'{{"time":"{t}Z","value":{v}}}' for t, v in zip(stamps.tolist(), values.tolist()))
+
+
+class FakeHeron(object):
+
+    def __init__(self, args):
+        self.args = args
+        with open(args.registry) as f:
+            self.records = {record["deviceid"]: record for record in json.load(f)}
+        self.series = {device_id: SyntheticSeries(record, args.interval) for device_id, record in self.records.items()}
+        offline_rng = random.Random(args.seed)
+        self.offline = {device_id for device_id in sorted(self.records) if offline_rng.random() < args.offline_fraction}
+        self.error_rates = args.error_rate
+        self.rng = random.Random(args.seed)
+        self.tokens = {}
+        self.stats = Counter()
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post("/api/v1/user/signin", self.signin)
+        app.router.add_get("/api/v1/devices", self.devices)
+        app.router.add_get("/api/v1/devices/{device_id}", self.device)
+        app.router.add_get("/api/v1/devices/{device_id}/data", self.device_data)
+        app.router.add_get("/stats", self.get_stats)
+        return app
+
+    async def _respond_after_latency(self):
+        latency = self.args.latency + self.rng.uniform(-self.args.jitter, self.args.jitter)
+        if latency > 0:
+            await asyncio.sleep(latency)
+
+    def _fault(self, request: web.Request):
+        """The status of an injected or authentication failure of request, or None."""
+        token = request.headers.get("Authorization", "").replace("Bearer ", "")
+        expires_at = self.tokens.get(token)
+        if expires_at is None or expires_at < time.time():
+            return 401
+        for status, rate in self.error_rates.items():
+            if self.rng.random() < rate:
+                if status == 401:
+                    del self.tokens[token]
+                return status
+        return None
+
+    async def signin(self, request: web.Request):
+        self.stats["signins"] += 1
+        body = await request.json()
+        if not body.get("email") or not body.get("password"):
+            return web.json_response({"error": "Invalid credentials"}, status=400)
+        token = uuid.uuid4().hex
+        self.tokens[token] = time.time() + self.args.token_ttl
+        return web.json_response({"token": token})
+
+    async def devices(self, request: web.Request):
+        self.stats["requests"] += 1
+        status = self._fault(request)
+        if status:
+            self.stats[f"status_{status}"] += 1
+            return web.json_response({"error": "fault"}, status=status)
+        return web.json_response(list(self.records.values()))
+
+    async def device(self, request: web.Request):
+        self.stats["requests"] += 1
+        record = self.records.get(request.match_info["device_id"])
+        if record is None:
+            return web.json_response({"error": "Device not found"}, status=404)
+        return web.json_response(record)
+
+    async def device_data(self, request: web.Request):
+        self.stats["requests"] += 1
+        await self._respond_after_latency()
+        status = self._fault(request)
+        if status:
+            self.stats[f"status_{status}"] += 1
+            headers = {"Retry-After": "1"} if status in (429, 503) else None
+            return web.json_response({"error": "fault"}, status=status, headers=headers)
+
+        device_id = request.match_info["device_id"]
+        if device_id not in self.records:
+            return web.json_response({"error": "Device not found"})
+        try:
+            time_from, time_to = int(request.query["time_from"]), int(request.query["time_to"])
+        except (KeyError, ValueError):
+            return web.json_response({"error": "time_from and time_to are required"}, status=400)
+        if request.query.get("measurement", "power") != "power" or device_id in self.offline:
+            return web.json_response({"power": {}})
+
+        series = self.series[device_id]
+        registered_at = self.records[device_id]["registeredat"]
+        not_before_ms = int(np.datetime64(registered_at.rstrip("Z"), "ms").astype(np.int64))
+        times = series.times_ms(time_from, time_to, not_before_ms)
+
+        # Readings left before the body is cut off (None: complete response)
+        budget = None
+        total = len(times) * len(series.phases)
+        if self.args.max_readings and total > self.args.max_readings:
+            budget = self.args.max_readings
+        if total and self.rng.random() < self.args.truncate_rate:
+            budget = min(budget or total, self.rng.randrange(total))
+
+        response = web.StreamResponse(headers={"Content-Type": "application/json"})
+        await response.prepare(request)
+        await response.write(b'{"power":{')
+        served = 0
+        for phase_index, phase in enumerate(series.phases):
+            await response.write(f'{"," if phase_index else ""}"{phase}":['.encode("utf-8"))
+            for start in range(0, len(times), CHUNK_READINGS):
+                chunk = times[start:start + CHUNK_READINGS]
+                if budget is not None and served + len(chunk) > budget:
+                    # Cut the body off in the middle of a reading
+                    body = encode_readings(chunk[:budget - served + 1], series.values(chunk, phase_index)[:budget - served + 1])
+                    await response.write((("," if start else "") + body[:-12]).encode("utf-8"))
+                    self.stats["readings"] += budget - served
+                    self.stats["truncated"] += 1
+                    return response
+                body = encode_readings(chunk, series.values(chunk, phase_index))
+                await response.write((("," if start else "") + body).encode("utf-8"))
+                served += len(chunk)
+            await response.write(b"]")
+        await response.write(b"}}")
+        self.stats["readings"] += served
+        await response.write_eof()
+        return response
+
+    async def get_stats(self, request: web.Request):
+        return web.json_response(dict(self.stats))
+
+
+def parse_error_rate(value: str):
+    status, rate = value.split("=")
+    if int(status) not in FAULT_STATUSES:
+        raise argparse.ArgumentTypeError(f"status must be one of {FAULT_STATUSES}")
+    return int(status), float(rate)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--registry", default=DEVICE_REGISTRY_PATH)
+    parser.add_argument("--interval", type=float, default=10, help="seconds between readings")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds before the response headers")
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=parse_error_rate, action="append", default=[], metavar="STATUS=RATE")
+    parser.add_argument("--truncate-rate", type=float, default=0.0)
+    parser.add_argument("--max-readings", type=int, default=0, help="0: no limit")
+    parser.add_argument("--offline-fraction", type=float, default=0.0)
+    parser.add_argument("--token-ttl", type=float, default=3600)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+    args.error_rate = dict(args.error_rate)
+    return args
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    web.run_app(FakeHeron(args).app(), host=args.host, port=args.port)
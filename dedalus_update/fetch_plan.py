@@ -0,0 +1,102 @@
+from datetime import datetime, timedelta, timezone
+from json import JSONDecodeError
+from typing import NamedTuple, Optional, Tuple
+
+from heron_utils.stream_decode import TruncatedResponseError
+from processing import _parse_reading_time
+
+# What to do about a sub-window whose response could not be decoded
+RETRY = "retry"                    # nothing usable received: request the same sub-window again
+RESUME_READING = "resume_reading"  # cut off mid-phase: keep what was received, request the rest after the last reading
+RESUME_PHASE = "resume_phase"      # cut off between phases: keep the finished phases, request the others again
+SPLIT = "split"                    # bisect the sub-window
+GIVE_UP = "give_up"                # fail the sub-window (already at the smallest span)
+
+
+class SubwindowRequest(NamedTuple):
+    """
+    One HERON request of a device: [window_start, window_end), leaving out
+    skip_phases. retries counts the earlier attempts at this same request,
+    hops the resumes that led to it.
+    """
+    window_start: datetime
+    window_end: datetime
+    skip_phases: frozenset = frozenset()
+    retries: int = 0
+    hops: int = 0
+
+
+class SubwindowPlan(NamedTuple):
+    """
+    How to follow up a failed request: the readings to keep from it
+    (received, a {phase: readings} payload or None) and the requests that
+    fetch the rest, merged in order after received. too_large tells whether
+    the failure says the request was too large for HERON.
+    """
+    action: str
+    received: Optional[dict] = None
+    requests: Tuple[SubwindowRequest, ...] = ()
+    too_large: bool = False
+
+
+def resume_point(e: JSONDecodeError, window_start: datetime, window_end: datetime) -> Optional[datetime]:
+    """
+    Time to resume a truncated response from: just after the last complete
+    reading of the phase in progress, if decoding got past the start of the
+    window.
+    """
+    if not isinstance(e, TruncatedResponseError) or e.current_phase is None or not e.last_time:
+        return None
+    try:
+        resume_from = _parse_reading_time(e.last_time)
+    except ValueError:
+        return None
+    if resume_from.tzinfo is None:
+        resume_from = resume_from.replace(tzinfo=timezone.utc)
+    # Readings up to last_time were received; the resumed requests start after it
+    resume_from += timedelta(microseconds=1)
+    return resume_from if window_start < resume_from < window_end else None
+
+
+def plan_failed_subwindow(e: JSONDecodeError, request: SubwindowRequest, min_span: timedelta,
+                          max_retries: int = 2, max_hops: int = 8) -> SubwindowPlan:
+    """
+    Decide how to follow up request after its response failed to decode
+    with e. Pure: the sync and async fetch engines both carry out the plan.
+
+    A body cut off by a dropped connection and one cut off because it was
+    too large look the same, so a failure only counts as too large once
+    the cheaper explanations are used up:
+
+    - A streamed body cut off mid-phase is resumed: the readings received
+      are kept, the rest of the phase in progress and the phases not
+      received yet are requested from the last complete reading on, and
+      the phases not received yet also for the part before it. A body cut
+      off between phases keeps the finished phases and requests the others
+      again. At most max_hops resumes are chained.
+    - A failure before any usable reading is retried as is, up to
+      max_retries times.
+    - Otherwise the request is too large and is bisected; below
+      2 * min_span it is given up on, so no data is silently dropped.
+    """
+    window_start, window_end, skip_phases = request.window_start, request.window_end, request.skip_phases
+    resume_from = resume_point(e, window_start, window_end)
+    completed = skip_phases | frozenset(getattr(e, "completed_phases", ()))
+    if resume_from is not None and request.hops < max_hops:
+        return SubwindowPlan(RESUME_READING, e.received, (
+            SubwindowRequest(window_start, resume_from, completed | {e.current_phase}, hops=request.hops + 1),
+            SubwindowRequest(resume_from, window_end, completed, hops=request.hops + 1),
+        ))
+    if completed != skip_phases and request.hops < max_hops:
+        return SubwindowPlan(RESUME_PHASE, e.received, (
+            SubwindowRequest(window_start, window_end, completed, hops=request.hops + 1),
+        ))
+    if resume_from is None and completed == skip_phases and request.retries < max_retries:
+        return SubwindowPlan(RETRY, None, (request._replace(retries=request.retries + 1),))
+    if window_end - window_start < 2 * min_span:
+        return SubwindowPlan(GIVE_UP, too_large=True)
+    middle = window_start + (window_end - window_start) / 2
+    return SubwindowPlan(SPLIT, None, (
+        SubwindowRequest(window_start, middle, skip_phases),
+        SubwindowRequest(middle, window_end, skip_phases),
+    ), too_large=True)
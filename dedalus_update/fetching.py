@@ -0,0 +1,268 @@
+import asyncio
+from datetime import datetime, timedelta
+from json import JSONDecodeError
+from typing import List, Optional, Tuple
+
+import aiohttp
+import requests
+from tenacity import (
+    retry,
+    stop_after_attempt,
+    wait_chain,
+    wait_fixed,
+    retry_if_exception_type,
+    retry_if_not_exception_type,
+)
+
+from fetch_plan import GIVE_UP, RESUME_PHASE, RESUME_READING, RETRY, SubwindowPlan, SubwindowRequest, plan_failed_subwindow
+from heron_manager import TIME_FORMAT, get_heron_device_data, async_get_heron_device_data, get_nano_time_from_time_string, get_heron_device_data_stream, async_get_heron_device_data_stream
+from heron_utils.async_heron_api import AsyncHeronApi
+from heron_utils.stream_decode import PowerStreamDecoder, TruncatedResponseError
+from logger_config import logger, loguru_before_sleep
+from metrics import METRICS
+from pipeline_config_manager import read_config_value
+from processing import PhaseReadings, concat_phase_readings
+from window_sizing import WindowSizeStore, count_readings, split_window
+
+# Oversized responses are bisected down to sub-windows of this many minutes
+MIN_SPLIT_MINUTES = int(read_config_value("min_split_minutes", 60))
+# Decode HERON responses incrementally into compact arrays and resume truncated bodies
+STREAM_DECODE = bool(read_config_value("stream_decode", True))
+# A response that fails before any usable reading is requested again this many times before it counts as too large
+TRUNCATED_RETRIES = int(read_config_value("truncated_retries", 2))
+# Resumes chained from one request before its response counts as too large
+MAX_RESUME_HOPS = int(read_config_value("max_resume_hops", 8))
+
+# Learned per-device request sizes, persisted in state/
+WINDOW_SIZES = WindowSizeStore(min_span=timedelta(minutes=MIN_SPLIT_MINUTES))
+
+@retry(
+    # requests' JSONDecodeError is also a RequestException, but an oversized
+    # response fails the same way every time: plan_failed_subwindow retries it
+    # at once or bisects it instead of waiting it out
+    retry=retry_if_exception_type((requests.exceptions.RequestException)) & retry_if_not_exception_type(JSONDecodeError),
+    wait=wait_chain(wait_fixed(60), wait_fixed(180), wait_fixed(300)),
+    stop=stop_after_attempt(4),
+    before_sleep=loguru_before_sleep
+)
+def get_device_period_data(device_id:str,window_start:datetime,window_end:datetime)->dict:
+    start_time=window_start.strftime(TIME_FORMAT)
+    end_time=window_end.strftime(TIME_FORMAT)
+    start_time_ns=get_nano_time_from_time_string(start_time)
+    end_time_ns=get_nano_time_from_time_string(end_time)
+    METRICS.inc("dedalus_heron_requests_total")
+    return get_heron_device_data(device_id,start_time_ns,end_time_ns)
+
+@retry(
+    retry=retry_if_exception_type((aiohttp.ClientError, asyncio.TimeoutError)),
+    wait=wait_chain(wait_fixed(60), wait_fixed(180), wait_fixed(300)),
+    stop=stop_after_attempt(4),
+    before_sleep=loguru_before_sleep
+)
+async def async_get_device_period_data(api: AsyncHeronApi, device_id: str, window_start: datetime, window_end: datetime) -> dict:
+    start_time=window_start.strftime(TIME_FORMAT)
+    end_time=window_end.strftime(TIME_FORMAT)
+    start_time_ns=get_nano_time_from_time_string(start_time)
+    end_time_ns=get_nano_time_from_time_string(end_time)
+    METRICS.inc("dedalus_heron_requests_total")
+    return await async_get_heron_device_data(api, device_id, start_time_ns, end_time_ns)
+
+def _window_nanos(window_start: datetime, window_end: datetime) -> Tuple[int, int]:
+    return (get_nano_time_from_time_string(window_start.strftime(TIME_FORMAT)),
+            get_nano_time_from_time_string(window_end.strftime(TIME_FORMAT)))
+
+class StreamCollector(object):
+    """
+    Accumulates streamed (phase, readings) batches as PhaseReadings, leaving
+    out skip_phases (phases already received by an earlier, truncated request).
+    """
+
+    def __init__(self, skip_phases: frozenset):
+        self.skip_phases = skip_phases
+        self.decoder = PowerStreamDecoder()
+        self.chunks = {}
+
+    def add(self, phase, readings):
+        if phase not in self.skip_phases:
+            self.chunks.setdefault(phase, []).append(PhaseReadings.from_readings(readings))
+
+    def payload(self) -> dict:
+        return {phase: concat_phase_readings(chunks) for phase, chunks in self.chunks.items()}
+
+    def result(self, device_id: str) -> Optional[dict]:
+        if self.decoder.error:
+            logger.warning(f"API error: {self.decoder.error}")
+        payload = self.payload()
+        if not payload and not self.skip_phases:
+            logger.warning(f"No power found for {device_id}")
+        return payload or None
+
+    def record_metrics(self):
+        """Count the response just streamed: its bytes and the time spent decoding them."""
+        METRICS.inc("dedalus_heron_requests_total")
+        METRICS.inc("dedalus_bytes_total", self.decoder.bytes_read, kind="download")
+        METRICS.observe("dedalus_stage_seconds", self.decoder.decode_seconds, stage="decode")
+
+    def truncated(self, e: TruncatedResponseError) -> TruncatedResponseError:
+        # The caller keeps what was received before the body ended
+        e.received = self.payload()
+        return e
+
+@retry(
+    retry=retry_if_exception_type((requests.exceptions.RequestException)) & retry_if_not_exception_type(JSONDecodeError),
+    wait=wait_chain(wait_fixed(60), wait_fixed(180), wait_fixed(300)),
+    stop=stop_after_attempt(4),
+    before_sleep=loguru_before_sleep
+)
+def get_device_period_data_streamed(device_id: str, window_start: datetime, window_end: datetime, skip_phases: frozenset = frozenset()) -> dict:
+    """
+    get_device_period_data decoding the response while it downloads. A
+    truncated body raises TruncatedResponseError with the readings received
+    so far in its received attribute.
+    """
+    start_time_ns, end_time_ns = _window_nanos(window_start, window_end)
+    collector = StreamCollector(skip_phases)
+    try:
+        for phase, readings in get_heron_device_data_stream(device_id, start_time_ns, end_time_ns, collector.decoder):
+            collector.add(phase, readings)
+    except TruncatedResponseError as e:
+        raise collector.truncated(e)
+    finally:
+        collector.record_metrics()
+    return collector.result(device_id)
+
+@retry(
+    retry=retry_if_exception_type((aiohttp.ClientError, asyncio.TimeoutError)),
+    wait=wait_chain(wait_fixed(60), wait_fixed(180), wait_fixed(300)),
+    stop=stop_after_attempt(4),
+    before_sleep=loguru_before_sleep
+)
+async def async_get_device_period_data_streamed(api: AsyncHeronApi, device_id: str, window_start: datetime, window_end: datetime, skip_phases: frozenset = frozenset()) -> dict:
+    start_time_ns, end_time_ns = _window_nanos(window_start, window_end)
+    collector = StreamCollector(skip_phases)
+    try:
+        async for phase, readings in async_get_heron_device_data_stream(api, device_id, start_time_ns, end_time_ns, collector.decoder):
+            collector.add(phase, readings)
+    except TruncatedResponseError as e:
+        raise collector.truncated(e)
+    finally:
+        collector.record_metrics()
+    return collector.result(device_id)
+
+def without_phases(data: dict, skip_phases: frozenset) -> dict:
+    if not data or not skip_phases:
+        return data
+    return {phase: readings for phase, readings in data.items() if phase not in skip_phases}
+
+def merge_device_period_parts(parts: List[dict]) -> dict:
+    """
+    Merge the payloads of consecutive sub-windows ({phase: readings}) into
+    one payload. Readings may be lists of dicts or PhaseReadings.
+    """
+    if len(parts) == 1:
+        return parts[0]
+    chunks = {}
+    for part in parts:
+        if not part:
+            continue
+        for phase, readings in part.items():
+            chunks.setdefault(phase, []).append(readings)
+    return {phase: concat_phase_readings(phase_chunks) for phase, phase_chunks in chunks.items()}
+
+def record_failed_subwindow(device_id: str, request: SubwindowRequest, plan: SubwindowPlan, e: JSONDecodeError):
+    """
+    Log and count a failed request before plan is carried out. Only
+    failures the plan puts down to size shrink the device's learned
+    request size; a connection cut at random says nothing about it.
+    """
+    window_start, window_end = request.window_start, request.window_end
+    window = f"{window_start.isoformat()} → {window_end.isoformat()}"
+    if plan.too_large:
+        WINDOW_SIZES.record_failure(device_id, window_end - window_start)
+    if plan.action == RETRY:
+        logger.warning(f"Response failed before any reading for device: {device_id} in window: {window} ({e}). Retrying ({plan.requests[0].retries}/{TRUNCATED_RETRIES})...")
+        METRICS.inc("dedalus_retries_total", operation="truncated_response")
+    elif plan.action == RESUME_READING:
+        logger.warning(f"Response truncated for device: {device_id} in window: {window} during phase {e.current_phase}. Resuming from {plan.requests[1].window_start.isoformat()}...")
+        METRICS.inc("dedalus_resumes_total", point="reading")
+    elif plan.action == RESUME_PHASE:
+        logger.warning(f"Response truncated for device: {device_id} in window: {window} after phases {e.completed_phases}. Requesting the remaining phases...")
+        METRICS.inc("dedalus_resumes_total", point="phase")
+    elif plan.action == GIVE_UP:
+        logger.error(f"Response still too large for device: {device_id} in window: {window}, not splitting below {MIN_SPLIT_MINUTES} minutes")
+    else:
+        logger.warning(f"Fetch failed with exception: {e}. Data might be too large for device: {device_id} in window: {window}. Bisecting...")
+        METRICS.inc("dedalus_splits_total")
+
+def fetch_device_subwindow(device_id: str, request: SubwindowRequest):
+    """
+    Download one sub-window (leaving out its skip_phases). A response that
+    cannot be decoded is followed up as plan_failed_subwindow decides:
+    retried, resumed, bisected or, below MIN_SPLIT_MINUTES, raised.
+    """
+    window_start, window_end, skip_phases = request.window_start, request.window_end, request.skip_phases
+    try:
+        if STREAM_DECODE:
+            data = get_device_period_data_streamed(device_id, window_start, window_end, skip_phases)
+        else:
+            data = without_phases(get_device_period_data(device_id, window_start, window_end), skip_phases)
+    except JSONDecodeError as e:
+        plan = plan_failed_subwindow(e, request, WINDOW_SIZES.min_span, TRUNCATED_RETRIES, MAX_RESUME_HOPS)
+        record_failed_subwindow(device_id, request, plan, e)
+        if plan.action == GIVE_UP:
+            raise e
+        return merge_device_period_parts([plan.received] + [fetch_device_subwindow(device_id, part) for part in plan.requests])
+    WINDOW_SIZES.record_success(device_id, window_end - window_start, count_readings(data))
+    return data
+
+def fetch_device_period_data(device_id: str, window_start: datetime, window_end: datetime):
+    logger.info(f"Downloading data for device: {device_id} in window: {window_start.isoformat()} → {window_end.isoformat()}")
+
+    # Devices known to return oversized payloads are requested in learned-size chunks up front
+    subwindows = split_window(window_start, window_end, WINDOW_SIZES.preferred_span(device_id))
+    with METRICS.timer("dedalus_stage_seconds", stage="fetch"):
+        data = merge_device_period_parts([
+            fetch_device_subwindow(device_id, SubwindowRequest(part_start, part_end)) for part_start, part_end in subwindows
+        ])
+
+    if not data:
+        logger.warning(f"No data found for device: {device_id} in window: {window_start.isoformat()} → {window_end.isoformat()}")
+    return data
+
+async def async_fetch_device_subwindow(api: AsyncHeronApi, device_id: str, request: SubwindowRequest):
+    """
+    fetch_device_subwindow for the async fetch engine; resumed and bisected parts are downloaded concurrently.
+    """
+    window_start, window_end, skip_phases = request.window_start, request.window_end, request.skip_phases
+    try:
+        if STREAM_DECODE:
+            data = await async_get_device_period_data_streamed(api, device_id, window_start, window_end, skip_phases)
+        else:
+            data = without_phases(await async_get_device_period_data(api, device_id, window_start, window_end), skip_phases)
+    except JSONDecodeError as e:
+        plan = plan_failed_subwindow(e, request, WINDOW_SIZES.min_span, TRUNCATED_RETRIES, MAX_RESUME_HOPS)
+        record_failed_subwindow(device_id, request, plan, e)
+        if plan.action == GIVE_UP:
+            raise e
+        return merge_device_period_parts([plan.received] + await asyncio.gather(
+            *(async_fetch_device_subwindow(api, device_id, part) for part in plan.requests)
+        ))
+    WINDOW_SIZES.record_success(device_id, window_end - window_start, count_readings(data))
+    return data
+
+async def async_fetch_device_period_data(api: AsyncHeronApi, device_id: str, window_start: datetime, window_end: datetime):
+    """
+    fetch_device_period_data for the async fetch engine: same retries,
+    learned chunking and bisection, with sub-windows downloaded concurrently.
+    """
+    logger.info(f"Downloading data for device: {device_id} in window: {window_start.isoformat()} → {window_end.isoformat()}")
+
+    subwindows = split_window(window_start, window_end, WINDOW_SIZES.preferred_span(device_id))
+    with METRICS.timer("dedalus_stage_seconds", stage="fetch"):
+        data = merge_device_period_parts(await asyncio.gather(
+            *(async_fetch_device_subwindow(api, device_id, SubwindowRequest(part_start, part_end)) for part_start, part_end in subwindows)
+        ))
+
+    if not data:
+        logger.warning(f"No data found for device: {device_id} in window: {window_start.isoformat()} → {window_end.isoformat()}")
+    return data
@@ -1,18 +1,39 @@
 from heron_utils.query_heron import _get_device_measurement, _init_heron_api
-from heron_utils.settings import HISTORY
+from heron_utils.async_heron_api import AsyncHeronApi
+from heron_utils.stream_decode import PowerStreamDecoder
+from heron_utils.device_registry import DEVICE_REGISTRY
+from heron_utils.settings import TIME_FORMAT
 from logger_config import logger
-from datetime import datetime, timezone
+from datetime import datetime
 from typing import List, Tuple
 
 heron_api = _init_heron_api()
 
-TIME_FORMAT="%Y-%m-%dT%H:%M:%S.%fZ"
-
 def get_nano_time_from_time_string(time:str)->str:
     time = datetime.strptime(time, TIME_FORMAT)
     time_ns = int(time.timestamp() * 1e9)
     return time_ns
 
+def extract_device_power(resp_dict: dict, device_id: str, start_time: str, end_time: str) -> dict:
+    if not resp_dict:
+        logger.warning("API returned None (no response)")
+        return None
+
+    if "power" in resp_dict:
+        power=resp_dict.get("power")
+        if power:
+            return power
+        else:
+            logger.warning(f"No power found for {device_id} between {start_time} and {end_time}")
+            return None
+
+    if "error" in resp_dict:
+        logger.warning(f"API error: {resp_dict['error']}")
+        return None
+
+    logger.warning("No power or error key in response.")
+    return None
+
 def get_heron_device_data(device_id: str, start_time: str, end_time: str) -> dict:
     try:
         resp_dict = _get_device_measurement(
@@ -21,33 +42,55 @@ def get_heron_device_data(device_id: str, start_time: str, end_time: str) -> dic
             time_from_nano=start_time,
             time_to_nano=end_time
         )
+        return extract_device_power(resp_dict, device_id, start_time, end_time)
 
-        if not resp_dict:
-            logger.warning("API returned None (no response)")
-            return None
-
-        if "power" in resp_dict:
-            power=resp_dict.get("power")
-            if power:
-                return power
-            else:
-                logger.warning(f"No power found for {device_id} between {start_time} and {end_time}")
-                return None
-
-        if "error" in resp_dict:
-            logger.warning(f"API error: {resp_dict['error']}")
-            return None
+    except Exception as e:
+        logger.error(f"Unexpected failure in get_heron_device_data: {str(e)}")
+        raise e
 
-        logger.warning("No power or error key in response.")
-        return None
+async def async_get_heron_device_data(api: AsyncHeronApi, device_id: str, start_time: str, end_time: str) -> dict:
+    """
+    get_heron_device_data for the async fetch engine, using a shared AsyncHeronApi session.
+    """
+    try:
+        resp_dict = await api._device_data(
+            device_id=device_id,
+            time_from=start_time,
+            time_to=end_time,
+            measurement='power'  # Fetch only 'power' measurements
+        )
+        return extract_device_power(resp_dict, device_id, start_time, end_time)
 
     except Exception as e:
-        logger.error(f"Unexpected failure in get_heron_device_data: {str(e)}")
+        logger.error(f"Unexpected failure in async_get_heron_device_data: {str(e)}")
         raise e
 
+def get_heron_device_data_stream(device_id: str, start_time: str, end_time: str, decoder: PowerStreamDecoder = None):
+    """
+    Stream the power readings of a device as (phase, readings) batches while
+    the response downloads. The response's "error" value, if any, is left in
+    decoder.error.
+    """
+    return heron_api._device_data_stream(
+        device_id=device_id,
+        measurement='power',
+        time_from=start_time,
+        time_to=end_time,
+        decoder=decoder
+    )
+
+def async_get_heron_device_data_stream(api: AsyncHeronApi, device_id: str, start_time: str, end_time: str, decoder: PowerStreamDecoder = None):
+    """
+    get_heron_device_data_stream for the async fetch engine (an async generator).
+    """
+    return api._device_data_stream(
+        device_id=device_id,
+        measurement='power',
+        time_from=start_time,
+        time_to=end_time,
+        decoder=decoder
+    )
+
 
 def get_device_info() -> List[Tuple[str, datetime]]:
-    return [
-        (device["deviceid"], datetime.strptime(device["registeredat"], TIME_FORMAT).replace(tzinfo=timezone.utc))
-        for device in HISTORY
-    ]
+    return DEVICE_REGISTRY.registrations()
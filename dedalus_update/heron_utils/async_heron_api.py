@@ -0,0 +1,190 @@
+import asyncio
+import json
+import time
+from contextlib import asynccontextmanager
+
+import aiohttp
+
+from heron_utils.heron_api import HeronApi
+from heron_utils.response_cache import AsyncTeeReader, ResponseCache, finish_response
+from heron_utils.stream_decode import PowerStreamDecoder, aiter_power_batches, iter_power_batches
+from heron_utils.throttle import ConcurrencyGovernor, RateLimiter, OVERLOAD_STATUSES
+from heron_utils.token_cache import TokenCache
+
+
+class AsyncHeronApi(object):
+    """
+    asyncio counterpart of HeronApi for the download stage: one aiohttp
+    session (keep-alive connection pool) shared by many concurrent requests.
+    Requests take tokens from the RateLimiter shared with the other
+    processes, and a ConcurrencyGovernor keeps between 1 and max_connections
+    of them in flight depending on HERON's latency and 429/5xx responses.
+
+    Use as an async context manager:
+
+        async with AsyncHeronApi(max_connections=100) as api:
+            data = await api._device_data(device_id, "power", time_from, time_to)
+    """
+    HERON_DOMAIN = HeronApi.HERON_DOMAIN
+    HERON_EMAIL = HeronApi.HERON_EMAIL
+    HERON_PASS = HeronApi.HERON_PASS
+    HERON_SCHEME = HeronApi.HERON_SCHEME
+
+    def __init__(self, max_connections: int = 100, read_timeout: float = 300, token_cache: TokenCache = None,
+                 rate_limiter: RateLimiter = None, response_cache: ResponseCache = None):
+        if not all([self.HERON_DOMAIN, self.HERON_EMAIL, self.HERON_PASS]):
+            raise RuntimeError(
+                "AsyncHeronApi: Missing one of HERON_DOMAIN, HERON_EMAIL, HERON_PASS"
+            )
+        self.max_connections = max_connections
+        self.read_timeout = read_timeout
+        self.session = None
+        self.token = None
+        self.token_cache = token_cache or TokenCache()
+        self.rate_limiter = rate_limiter or RateLimiter()
+        self.response_cache = response_cache or ResponseCache()
+        self.governor = ConcurrencyGovernor(max_connections)
+        self._token_lock = asyncio.Lock()
+
+    async def __aenter__(self):
+        self.session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=self.max_connections),
+            # No total timeout (large windows take long to download), but a stalled read fails
+            timeout=aiohttp.ClientTimeout(total=None, sock_read=self.read_timeout),
+        )
+        self.token = await self._get_token()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.session.close()
+
+    async def _get_token(self):
+        # Reuse the token shared with the other pipeline processes while it is valid;
+        # signs in under the TokenCache lock, so only one process does at a time
+        return await self.token_cache.async_get_or_sign_in(self._sign_in)
+
+    async def _sign_in(self):
+        signin_url = f"{self.HERON_SCHEME}://{self.HERON_DOMAIN}/api/v1/user/signin"
+        data = {
+            "email": self.HERON_EMAIL,
+            "password": self.HERON_PASS
+        }
+        async with self.session.post(signin_url, json=data) as response:
+            if response.status == 200:
+                return (await response.json())['token']
+            return None
+
+    async def _refresh_token(self, stale_token):
+        # Many requests can hit 401 at once; only the first one signs in again
+        async with self._token_lock:
+            if self.token == stale_token:
+                self.token_cache.invalidate(stale_token)
+                self.token = await self._get_token()
+
+    def _headers(self):
+        return {
+            'Content-Type': 'application/json',
+            'Authorization': f'Bearer {self.token}'
+        }
+
+    async def _reserve(self):
+        # The RateLimiter state is a flock'd file shared with the other processes:
+        # read and written in an executor thread, off the event loop
+        loop = asyncio.get_running_loop()
+        await asyncio.sleep(await loop.run_in_executor(None, self.rate_limiter.reserve))
+
+    async def _record(self, status, started, retry_after=None):
+        self.governor.record(time.monotonic() - started, status is None or status in OVERLOAD_STATUSES)
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self.rate_limiter.record, status, retry_after)
+
+    @asynccontextmanager
+    async def _get(self, url, params):
+        """
+        Throttled GET yielding the response: refreshes the token once on 401
+        and retries 429/5xx (HeronApi.HERON_OVERLOAD_RETRIES times) behind the
+        rate limiter, then raises aiohttp.ClientResponseError.
+        """
+        refreshed, retries = False, 0
+        async with self.governor.slot():
+            while True:
+                await self._reserve()
+                token = self.token
+                started = time.monotonic()
+                try:
+                    response = await self.session.get(url, headers=self._headers(), params=params)
+                except (aiohttp.ClientError, asyncio.TimeoutError):
+                    await self._record(None, started)
+                    raise
+                await self._record(response.status, started, response.headers.get('Retry-After'))
+
+                if response.status == 401 and not refreshed:  # Unauthorized status code
+                    response.release()
+                    refreshed = True
+                    await self._refresh_token(token)
+                    continue
+                if response.status in OVERLOAD_STATUSES:
+                    response.release()
+                    if retries == HeronApi.HERON_OVERLOAD_RETRIES:
+                        response.raise_for_status()
+                    retries += 1
+                    continue
+                try:
+                    yield response
+                finally:
+                    response.release()
+                return
+
+    # Get Device Measurements
+    async def _device_data(self, device_id, measurement, time_from, time_to):
+        """
+        Same contract as HeronApi._device_data: the decoded JSON on 200,
+        None on any other status, one token refresh on 401. A body that is
+        not valid JSON (e.g. truncated on large windows) raises
+        json.JSONDecodeError.
+        """
+        cached = self.response_cache.open(device_id, measurement, time_from, time_to)
+        if cached is not None:
+            with cached:
+                return json.load(cached)
+
+        url = f"{self.HERON_SCHEME}://{self.HERON_DOMAIN}/api/v1/devices/{device_id}/data"
+        params = {'time_from': time_from, 'time_to': time_to, 'measurement': measurement}
+
+        async with self._get(url, params) as response:
+            if response.status != 200:
+                return None
+            body = await response.read()
+        data = json.loads(body)
+        if isinstance(data, dict) and 'error' not in data:
+            self.response_cache.store(device_id, measurement, time_from, time_to, body)
+        return data
+
+    # Get Device Measurements, decoded while the body downloads
+    async def _device_data_stream(self, device_id, measurement, time_from, time_to, decoder=None):
+        """
+        Async generator with the same contract as HeronApi._device_data_stream.
+        """
+        cached = self.response_cache.open(device_id, measurement, time_from, time_to)
+        if cached is not None:
+            # Local file: decoded synchronously
+            with cached:
+                for batch in iter_power_batches(cached, decoder):
+                    yield batch
+            return
+
+        url = f"{self.HERON_SCHEME}://{self.HERON_DOMAIN}/api/v1/devices/{device_id}/data"
+        params = {'time_from': time_from, 'time_to': time_to, 'measurement': measurement}
+
+        async with self._get(url, params) as response:
+            if response.status == 200:
+                read_errors = (aiohttp.ClientPayloadError, asyncio.TimeoutError)
+                decoder = decoder or PowerStreamDecoder()
+                writer = self.response_cache.writer(device_id, measurement, time_from, time_to)
+                try:
+                    async for batch in aiter_power_batches(AsyncTeeReader(response.content, writer), decoder, read_errors=read_errors):
+                        yield batch
+                except BaseException:
+                    finish_response(writer, complete=False)
+                    raise
+                finish_response(writer, complete=decoder.error is None)
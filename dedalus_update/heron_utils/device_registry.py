@@ -0,0 +1,94 @@
+import json
+import os
+from datetime import datetime, timezone
+from typing import List, NamedTuple, Optional, Tuple
+
+# HERON device list (one JSON object per line, in the fields of /api/v1/devices)
+DEVICE_REGISTRY_PATH = os.getenv(
+    "HERON_DEVICE_REGISTRY", os.path.join(os.path.dirname(os.path.abspath(__file__)), "devices.json")
+)
+REGISTERED_AT_FORMAT = "%Y-%m-%dT%H:%M:%S.%fZ"
+
+
+class Device(NamedTuple):
+    device_id: str
+    device_type: int
+    device_type_text: str
+    device_name: str
+    home_id: str
+    registered_at: datetime  # UTC
+    measurements: Tuple[str, ...]
+
+    @classmethod
+    def from_record(cls, record: dict) -> "Device":
+        return cls(
+            device_id=record["deviceid"],
+            device_type=record.get("device_type"),
+            device_type_text=record.get("device_type_text"),
+            device_name=record.get("device_name"),
+            home_id=record.get("home_id"),
+            registered_at=datetime.strptime(record["registeredat"], REGISTERED_AT_FORMAT).replace(tzinfo=timezone.utc),
+            measurements=tuple(record.get("measurements") or ()),
+        )
+
+
+class DeviceRegistry(object):
+    """
+    The HERON devices known to the pipeline, read from a JSON file on first
+    use and indexed by device id, home id and device type. Registration
+    times are parsed once at load, so lookups are dict accesses.
+    """
+
+    def __init__(self, path: str = DEVICE_REGISTRY_PATH):
+        self.path = path
+        self._devices = None
+        self._by_id = None
+        self._by_home = None
+        self._by_type = None
+
+    def _load(self):
+        with open(self.path) as f:
+            devices = [Device.from_record(record) for record in json.load(f)]
+        by_id, by_home, by_type = {}, {}, {}
+        for device in devices:
+            by_id[device.device_id] = device
+            by_home.setdefault(device.home_id, []).append(device)
+            by_type.setdefault(device.device_type, []).append(device)
+        self._devices, self._by_id, self._by_home, self._by_type = devices, by_id, by_home, by_type
+
+    @property
+    def devices(self) -> List[Device]:
+        if self._devices is None:
+            self._load()
+        return self._devices
+
+    def __iter__(self):
+        return iter(self.devices)
+
+    def __len__(self) -> int:
+        return len(self.devices)
+
+    def __contains__(self, device_id: str) -> bool:
+        return self.get(device_id) is not None
+
+    def get(self, device_id: str) -> Optional[Device]:
+        if self._by_id is None:
+            self._load()
+        return self._by_id.get(device_id)
+
+    def by_home(self, home_id: str) -> List[Device]:
+        if self._by_home is None:
+            self._load()
+        return list(self._by_home.get(str(home_id), ()))
+
+    def by_type(self, device_type: int) -> List[Device]:
+        if self._by_type is None:
+            self._load()
+        return list(self._by_type.get(device_type, ()))
+
+    def registrations(self) -> List[Tuple[str, datetime]]:
+        """(device_id, registered_at) of every device, in file order."""
+        return [(device.device_id, device.registered_at) for device in self.devices]
+
+
+DEVICE_REGISTRY = DeviceRegistry()
@@ -1,30 +1,59 @@
 import requests
+import json
 import os
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import HTTPError as Urllib3HTTPError
+from heron_utils.response_cache import ResponseCache, TeeReader, finish_response
+from heron_utils.stream_decode import PowerStreamDecoder, iter_power_batches
+from heron_utils.throttle import RateLimiter, OVERLOAD_STATUSES
+from heron_utils.token_cache import TokenCache
 
 class HeronApi(object):
     # HERON API SETTINGS
     HERON_DOMAIN = os.getenv("HERON_DOMAIN")
     HERON_EMAIL =  os.getenv("HERON_EMAIL")
     HERON_PASS = os.getenv("HERON_PASS")
+    HERON_SCHEME = os.getenv("HERON_SCHEME", "https")  # "http" for a local stand-in (fake_heron.py)
     HERON_START_DATE = 1623828783  # 2021-06-21T07:32:56.409Z
     HERON_NANO_MUL = 1000000000  # In nanoseconds
     HERON_DATA_API_STEP = 86400 * 30  # 30 days
+    HERON_POOL_MAXSIZE = 10  # Keep-alive connections per process
+    HERON_OVERLOAD_RETRIES = 2  # Throttled retries of a 429/5xx before raising
 
-    def __init__(self):
-        # Obtain token during initialization
+    def __init__(self, token_cache: TokenCache = None, rate_limiter: RateLimiter = None, response_cache: ResponseCache = None):
+        self._session = None
+        self._session_pid = None
+        self.token_cache = token_cache or TokenCache()
+        self.rate_limiter = rate_limiter or RateLimiter()
+        self.response_cache = response_cache or ResponseCache()
+        # Obtain token during initialization (from the shared cache when still valid)
         self.token = self._get_token()
         if not all([self.HERON_DOMAIN, self.HERON_EMAIL, self.HERON_PASS]):
                 raise RuntimeError(
                     "HeronApi: Missing one of HERON_DOMAIN, HERON_EMAIL, HERON_PASS"
                 )
 
+    @property
+    def session(self):
+        # Keep-alive connection pool, created per process: the instance built at
+        # import time is inherited by forked pool workers, which must not share sockets
+        if self._session is None or self._session_pid != os.getpid():
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.HERON_POOL_MAXSIZE)
+            session.mount(f"{self.HERON_SCHEME}://", adapter)
+            self._session, self._session_pid = session, os.getpid()
+        return self._session
+
     def _get_token(self):
-        signin_url = f"https://{self.HERON_DOMAIN}/api/v1/user/signin"
+        return self.token_cache.get_or_sign_in(self._sign_in)
+
+    def _sign_in(self):
+        signin_url = f"{self.HERON_SCHEME}://{self.HERON_DOMAIN}/api/v1/user/signin"
         data = {
             "email": self.HERON_EMAIL,
             "password": self.HERON_PASS
         }
-        response = requests.post(signin_url, json=data)
+        response = self.session.post(signin_url, json=data)
         if response.status_code == 200:
             token = response.json()['token']
         else:
@@ -32,22 +61,42 @@ class HeronApi(object):
         return token
     
     def _refresh_token(self):
-        # Implement token refreshing logic here
+        # Drop the rejected token from the shared cache (unless another process
+        # already replaced it) and take the current one, signing in if needed
+        self.token_cache.invalidate(self.token)
         self.token = self._get_token()
 
-    def _make_request(self, method, url, **kwargs):
+    def _send(self, method, url, **kwargs):
+        # Every request takes a token from the bucket shared by all workers
+        self.rate_limiter.acquire()
         headers = {
             'Content-Type': 'application/json',
             'Authorization': f'Bearer {self.token}'
         }
-        response = method(url, headers=headers, **kwargs)
+        try:
+            response = method(url, headers=headers, **kwargs)
+        except requests.exceptions.RequestException:
+            self.rate_limiter.record(None)
+            raise
+        self.rate_limiter.record(response.status_code, response.headers.get('Retry-After'))
+        return response
+
+    def _make_request(self, method, url, **kwargs):
+        response = self._send(method, url, **kwargs)
         if response.status_code == 401:  # Unauthorized status code
+            response.close()
             self._refresh_token()  # Refresh token
-            headers['Authorization'] = f'Bearer {self.token}'  # Update authorization header
-            response = method(url, headers=headers, **kwargs)
-        elif response.status_code in [502, 504]:  # Bad Gateway or Gateway Timeout
-            response = method(url, headers=headers, **kwargs)  # Retry the request
-        return response  
+            response = self._send(method, url, **kwargs)
+        retries = 0
+        while response.status_code in OVERLOAD_STATUSES:  # Too Many Requests, Bad Gateway, Unavailable, Gateway Timeout
+            # Closed first: a streamed response would otherwise keep its pooled connection
+            response.close()
+            if retries == self.HERON_OVERLOAD_RETRIES:
+                response.raise_for_status()  # Left to the caller's (slower) retry policy
+            retries += 1
+            # The rate limiter has slowed down and holds requests back until the gateway recovers
+            response = self._send(method, url, **kwargs)
+        return response
 
     # Get Devices
     def _devices(self):
@@ -55,8 +104,8 @@ class HeronApi(object):
             'Content-Type': 'application/json',
             'Authorization': f'Bearer {self.token}'
         }
-        response = requests.get(
-            url=f"https://{self.HERON_DOMAIN}/api/v1/devices",
+        response = self.session.get(
+            url=f"{self.HERON_SCHEME}://{self.HERON_DOMAIN}/api/v1/devices",
             headers=headers
         )
         # print("Devices response:")
@@ -69,8 +118,8 @@ class HeronApi(object):
             'Content-Type': 'application/json',
             'Authorization': f'Bearer {self.token}'
         }
-        response = requests.get(
-            url=f"https://{self.HERON_DOMAIN}/api/v1/devices/{device_id}",
+        response = self.session.get(
+            url=f"{self.HERON_SCHEME}://{self.HERON_DOMAIN}/api/v1/devices/{device_id}",
             headers=headers
         )
         # print("Device params response:")
@@ -79,29 +128,58 @@ class HeronApi(object):
     
     # Get Device Measurements
     def _device_data(self, device_id, measurement, time_from, time_to):
-        headers = {
-            'Content-Type': 'application/json',
-            'Authorization': f'Bearer {self.token}'
-        }
-        response = requests.get(
-            url=f"https://{self.HERON_DOMAIN}/api/v1/devices/{device_id}/data",
-            headers=headers,
+        # Served from the local response cache when this exact range was downloaded before
+        cached = self.response_cache.open(device_id, measurement, time_from, time_to)
+        if cached is not None:
+            with cached:
+                return json.load(cached)
+        # Throttled; refreshes the token once on 401, raises HTTPError if HERON stays overloaded
+        response = self._make_request(
+            self.session.get,
+            url=f"{self.HERON_SCHEME}://{self.HERON_DOMAIN}/api/v1/devices/{device_id}/data",
             params={'time_from': time_from, 'time_to': time_to, 'measurement': measurement}
         )
         # print("Device data response:")
         # print(response.content)
-        if response.status_code == 401:  # Unauthorized status code
-            # Token expired or invalid, refresh token and retry the request
-            self._refresh_token()  # Refresh token
-            headers['Authorization'] = f'Bearer {self.token}'  # Update authorization header
-            response = requests.get(
-                url=f"https://{self.HERON_DOMAIN}/api/v1/devices/{device_id}/data",
-                headers=headers,
-                params={'time_from': time_from, 'time_to': time_to, 'measurement': measurement}
-            )
-            # print("Retried Device data response:")
-            # print(response.content)
         if response.status_code == 200:
-            return response.json()  # Return the JSON data
+            data = response.json()  # Return the JSON data
+            if isinstance(data, dict) and 'error' not in data:
+                self.response_cache.store(device_id, measurement, time_from, time_to, response.content)
+            return data
         else:
-            return None  # Return None if the response is not successful
\ No newline at end of file
+            return None  # Return None if the response is not successful
+
+    # Get Device Measurements, decoded while the body downloads
+    def _device_data_stream(self, device_id, measurement, time_from, time_to, decoder=None):
+        """
+        Streaming variant of _device_data: yields (phase, readings) batches
+        as the response arrives instead of decoding the whole body at once,
+        so peak memory does not grow with the window. Yields nothing if the
+        response is not successful (HTTPError if HERON stays overloaded). A body that ends early (or a connection
+        that drops mid-body) raises TruncatedResponseError after the readings
+        received so far have been yielded. Complete responses are copied
+        into the response cache while they are decoded.
+        """
+        cached = self.response_cache.open(device_id, measurement, time_from, time_to)
+        if cached is not None:
+            with cached:
+                yield from iter_power_batches(cached, decoder)
+            return
+
+        response = self._make_request(
+            self.session.get,
+            url=f"{self.HERON_SCHEME}://{self.HERON_DOMAIN}/api/v1/devices/{device_id}/data",
+            params={'time_from': time_from, 'time_to': time_to, 'measurement': measurement},
+            stream=True
+        )
+        with response:
+            if response.status_code == 200:
+                response.raw.decode_content = True
+                decoder = decoder or PowerStreamDecoder()
+                writer = self.response_cache.writer(device_id, measurement, time_from, time_to)
+                try:
+                    yield from iter_power_batches(TeeReader(response.raw, writer), decoder, read_errors=(Urllib3HTTPError,))
+                except BaseException:
+                    finish_response(writer, complete=False)
+                    raise
+                finish_response(writer, complete=decoder.error is None)
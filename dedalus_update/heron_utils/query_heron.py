@@ -1,6 +1,5 @@
 from datetime import datetime, timedelta
-import time
-from heron_utils.settings import HISTORY
+from heron_utils.device_registry import DEVICE_REGISTRY
 from heron_utils.heron_api import HeronApi
 
 CHUNK_SIZE_DAYS = 31
@@ -23,16 +22,13 @@ def _get_device_measurement(heron_api_instance, device_id, time_from_nano, time_
     return device_response
 
 def heron_device_history(device_id_to_fetch):
-    list_of_devices = HISTORY
     heron_api_instance = _init_heron_api()
     result_data = {}
 
-    for device in list_of_devices:
-        if device['deviceid'] != device_id_to_fetch:
-            continue  # Skip devices not matching the specified device_id
-
-        device_id = device['deviceid']
-        device_start_time = datetime.strptime(device['registeredat'], "%Y-%m-%dT%H:%M:%S.%fZ")
+    device = DEVICE_REGISTRY.get(device_id_to_fetch)
+    if device is not None:
+        device_id = device.device_id
+        device_start_time = device.registered_at.replace(tzinfo=None)
 
         # Initialize result data for the device if not present
         if device_id not in result_data:
@@ -69,9 +65,7 @@ def heron_device_history(device_id_to_fetch):
 
             # Save data to PostgreSQL for this chunk
             # _save_to_postgres({device_id: result_data[device_id]})
-
-            # Small delay to prevent overwhelming the server with requests
-            time.sleep(1)
+            # No delay needed: HeronApi throttles requests through its shared rate limiter
 
     return result_data
 
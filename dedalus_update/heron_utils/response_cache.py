@@ -0,0 +1,245 @@
+import hashlib
+import os
+import sqlite3
+import time
+import uuid
+from typing import List, Optional, Tuple
+
+import zstandard
+
+# Raw HERON responses, kept across restarts via the state volume
+RESPONSE_CACHE_PATH = os.getenv("HERON_RESPONSE_CACHE", "state/response_cache")
+# Size limit of the cached (compressed) bodies; 0 disables the cache
+RESPONSE_CACHE_MAX_MB = float(os.getenv("HERON_RESPONSE_CACHE_MB", "2048"))
+# Responses for ranges ending less than this long before the request are not
+# cached: HERON may still receive readings for them
+RESPONSE_CACHE_SETTLE_SECONDS = int(os.getenv("HERON_RESPONSE_CACHE_SETTLE", "3600"))
+NANO_MUL = 1000000000
+
+
+class CacheMissError(LookupError):
+    """Raised when a response needed for replay is not in the cache."""
+
+
+class ResponseCache(object):
+    """
+    Content-addressed on-disk cache of raw HERON device data responses.
+
+    - blobs/<aa>/<sha256>.zst: zstd-compressed response bodies, named by the
+      sha256 of the body, so identical responses (e.g. the empty answers of
+      inactive devices) are stored once
+    - index.db: SQLite index mapping (device, measurement, time_from, time_to)
+      to a blob, and each blob's size and last use
+
+    Only complete, error-free 200 responses are stored. When the blobs
+    outgrow max_bytes the least recently used ones are evicted. Safe to use
+    from several processes: blobs are written to a temporary file and
+    renamed, and the index is a WAL-mode SQLite database.
+    """
+
+    def __init__(self, path: str = RESPONSE_CACHE_PATH, max_bytes: float = RESPONSE_CACHE_MAX_MB * 2**20,
+                 settle_seconds: int = RESPONSE_CACHE_SETTLE_SECONDS):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.settle_seconds = settle_seconds
+        self._conn = None
+        self._conn_pid = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        # One connection per process: pool workers inherit the instance built at import time
+        if self._conn is None or self._conn_pid != os.getpid():
+            os.makedirs(os.path.join(self.path, "blobs"), exist_ok=True)
+            conn = sqlite3.connect(os.path.join(self.path, "index.db"), timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL;")
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS responses (
+                    device_id   TEXT NOT NULL,
+                    measurement TEXT NOT NULL,
+                    time_from   INTEGER NOT NULL,
+                    time_to     INTEGER NOT NULL,
+                    digest      TEXT NOT NULL,
+                    PRIMARY KEY (device_id, measurement, time_from, time_to)
+                );
+                CREATE INDEX IF NOT EXISTS responses_digest ON responses (digest);
+                CREATE TABLE IF NOT EXISTS blobs (
+                    digest    TEXT PRIMARY KEY,
+                    size      INTEGER NOT NULL,
+                    last_used REAL NOT NULL
+                );
+            """)
+            self._conn, self._conn_pid = conn, os.getpid()
+        return self._conn
+
+    def _blob_path(self, digest: str) -> str:
+        return os.path.join(self.path, "blobs", digest[:2], f"{digest}.zst")
+
+    def open(self, device_id: str, measurement: str, time_from: int, time_to: int):
+        """Decompressed binary stream of a cached response body, or None."""
+        if not self.enabled:
+            return None
+        key = (device_id, measurement, int(time_from), int(time_to))
+        row = self.conn.execute(
+            "SELECT digest FROM responses WHERE device_id = ? AND measurement = ? AND time_from = ? AND time_to = ?;", key
+        ).fetchone()
+        if row is None:
+            return None
+        try:
+            f = open(self._blob_path(row[0]), "rb")
+        except FileNotFoundError:
+            # Evicted by another process after the lookup
+            with self.conn:
+                self.conn.execute("DELETE FROM responses WHERE digest = ?;", row)
+            return None
+        with self.conn:
+            self.conn.execute("UPDATE blobs SET last_used = ? WHERE digest = ?;", (time.time(), row[0]))
+        return zstandard.ZstdDecompressor().stream_reader(f)
+
+    def writer(self, device_id: str, measurement: str, time_from: int, time_to: int):
+        """
+        A CachedResponseWriter for a response about to be downloaded, or None
+        if it should not be cached (cache disabled, or range not settled yet).
+        """
+        if not self.enabled or int(time_to) > (time.time() - self.settle_seconds) * NANO_MUL:
+            return None
+        return CachedResponseWriter(self, (device_id, measurement, int(time_from), int(time_to)))
+
+    def store(self, device_id: str, measurement: str, time_from: int, time_to: int, body: bytes):
+        writer = self.writer(device_id, measurement, time_from, time_to)
+        if writer is not None:
+            writer.write(body)
+            writer.commit()
+
+    def _add(self, key: Tuple[str, str, int, int], digest: str, tmp_path: str):
+        path = self._blob_path(digest)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        size = os.path.getsize(tmp_path)
+        os.replace(tmp_path, path)
+        with self.conn:
+            self.conn.execute(
+                "INSERT INTO blobs (digest, size, last_used) VALUES (?, ?, ?) "
+                "ON CONFLICT (digest) DO UPDATE SET last_used = excluded.last_used;",
+                (digest, size, time.time())
+            )
+            self.conn.execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?);", key + (digest,))
+        self.evict()
+
+    def evict(self):
+        """Delete least recently used blobs until the cache fits in max_bytes."""
+        (total,) = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM blobs;").fetchone()
+        if total <= self.max_bytes:
+            return
+        evicted = []
+        for digest, size in self.conn.execute("SELECT digest, size FROM blobs ORDER BY last_used;").fetchall():
+            if total <= self.max_bytes:
+                break
+            evicted.append(digest)
+            total -= size
+        with self.conn:
+            self.conn.executemany("DELETE FROM responses WHERE digest = ?;", [(d,) for d in evicted])
+            self.conn.executemany("DELETE FROM blobs WHERE digest = ?;", [(d,) for d in evicted])
+        for digest in evicted:
+            try:
+                os.remove(self._blob_path(digest))
+            except FileNotFoundError:
+                pass
+
+    def device_ids(self, measurement: str, time_from: int, time_to: int) -> List[str]:
+        """Devices with cached responses inside [time_from, time_to)."""
+        rows = self.conn.execute(
+            "SELECT DISTINCT device_id FROM responses WHERE measurement = ? AND time_from >= ? AND time_to <= ? ORDER BY device_id;",
+            (measurement, int(time_from), int(time_to))
+        )
+        return [device_id for (device_id,) in rows]
+
+    def ranges(self, device_id: str, measurement: str, time_from: int, time_to: int) -> List[Tuple[int, int]]:
+        """
+        Non-overlapping cached ranges of a device inside [time_from, time_to),
+        in time order. Where cached ranges overlap (e.g. fetched with
+        different window sizes), the one starting first (then the longest) wins.
+        """
+        rows = self.conn.execute(
+            "SELECT time_from, time_to FROM responses WHERE device_id = ? AND measurement = ? AND time_from >= ? AND time_to <= ? "
+            "ORDER BY time_from, time_to DESC;",
+            (device_id, measurement, int(time_from), int(time_to))
+        )
+        ranges = []
+        for start, end in rows:
+            if not ranges or start >= ranges[-1][1]:
+                ranges.append((start, end))
+        return ranges
+
+
+class CachedResponseWriter(object):
+    """
+    Receives a response body while it downloads (write) and adds it to the
+    cache once it is known to be complete (commit), or drops it (discard).
+    """
+
+    def __init__(self, cache: ResponseCache, key: Tuple[str, str, int, int]):
+        self.cache = cache
+        self.key = key
+        self.digest = hashlib.sha256()
+        os.makedirs(cache.path, exist_ok=True)
+        self.tmp_path = os.path.join(cache.path, f"tmp.{os.getpid()}.{uuid.uuid4().hex}")
+        self._file = open(self.tmp_path, "wb")
+        self._writer = zstandard.ZstdCompressor().stream_writer(self._file, closefd=False)
+
+    def write(self, data: bytes):
+        self.digest.update(data)
+        self._writer.write(data)
+
+    def commit(self):
+        self._writer.close()
+        self._file.close()
+        self.cache._add(self.key, self.digest.hexdigest(), self.tmp_path)
+
+    def discard(self):
+        self._writer.close()
+        self._file.close()
+        try:
+            os.remove(self.tmp_path)
+        except FileNotFoundError:
+            pass
+
+
+def finish_response(writer: Optional[CachedResponseWriter], complete: bool):
+    """Commit (complete) or discard the cached copy of a response, if it was being cached."""
+    if writer is None:
+        return
+    if complete:
+        writer.commit()
+    else:
+        writer.discard()
+
+
+class TeeReader(object):
+    """File-like wrapper that copies everything read from fileobj into writer."""
+
+    def __init__(self, fileobj, writer: Optional[CachedResponseWriter]):
+        self.fileobj = fileobj
+        self.writer = writer
+
+    def read(self, n=-1):
+        data = self.fileobj.read(n)
+        if self.writer is not None:
+            self.writer.write(data)
+        return data
+
+
+class AsyncTeeReader(object):
+    """TeeReader for an asyncio stream with an async read(n)."""
+
+    def __init__(self, stream, writer: Optional[CachedResponseWriter]):
+        self.stream = stream
+        self.writer = writer
+
+    async def read(self, n=-1):
+        data = await self.stream.read(n)
+        if self.writer is not None:
+            self.writer.write(data)
+        return data
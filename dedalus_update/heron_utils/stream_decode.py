@@ -0,0 +1,165 @@
+import json
+import time
+
+import ijson
+
+# Readings per batch yielded by the streaming decoder
+STREAM_BATCH_SIZE = 20000
+
+
+class TruncatedResponseError(json.JSONDecodeError):
+    """
+    Raised when a streamed device data response ends before the JSON is
+    complete. Records how far decoding got so the caller can resume:
+
+    - completed_phases: phases whose reading arrays were fully received
+    - current_phase:    phase being received when the body ended (or None)
+    - last_time:        time of the last complete reading of current_phase (or None)
+
+    It is a JSONDecodeError, so callers that cannot resume treat it like an
+    oversized response that failed to decode.
+    """
+
+    def __init__(self, msg, completed_phases, current_phase, last_time):
+        super().__init__(msg, "", 0)
+        self.completed_phases = completed_phases
+        self.current_phase = current_phase
+        self.last_time = last_time
+
+
+class PowerStreamDecoder(object):
+    """
+    Turns the ijson events of a /devices/{id}/data response
+    ({"power": {phase: [{"time": ..., "value": ...}, ...]}} or {"error": ...})
+    into (phase, readings) batches of at most batch_size readings, so a
+    response is never held in memory as a whole.
+
+    Also counts the body bytes read, the seconds spent waiting for them and
+    the seconds spent decoding (the rest of the time the body was consumed).
+    """
+
+    def __init__(self, batch_size: int = STREAM_BATCH_SIZE):
+        self.batch_size = batch_size
+        self.error = None
+        self.completed_phases = []
+        self.phase = None
+        self.last_time = None
+        self._item_prefix = None
+        self._batch = []
+        self._reading = None
+        self._key = None
+        self.bytes_read = 0
+        self.read_seconds = 0.0
+        self.decode_seconds = 0.0
+
+    def feed(self, prefix, event, value):
+        """Consume one ijson event; returns a (phase, readings) batch when one is ready, else None."""
+        if self._reading is not None:
+            if prefix == self._item_prefix:
+                if event == "map_key":
+                    self._key = value
+                elif event == "end_map":
+                    self._batch.append(self._reading)
+                    self.last_time = self._reading.get("time")
+                    self._reading = None
+                    if len(self._batch) >= self.batch_size:
+                        return self.flush()
+            elif self._key is not None and prefix == f"{self._item_prefix}.{self._key}":
+                self._reading[self._key] = value
+            return None
+
+        if prefix == self._item_prefix and event == "start_map":
+            self._reading = {}
+        elif prefix == "power" and event == "map_key":
+            self.phase, self.last_time = value, None
+            self._item_prefix = f"power.{value}.item"
+        elif prefix == f"power.{self.phase}" and event == "end_array":
+            batch = self.flush()
+            self.completed_phases.append(self.phase)
+            self.phase, self._item_prefix = None, None
+            return batch
+        elif prefix == "error" and event in ("string", "number"):
+            self.error = value
+        return None
+
+    def flush(self):
+        batch, self._batch = self._batch, []
+        return (self.phase, batch) if batch else None
+
+    def truncated(self, cause) -> TruncatedResponseError:
+        return TruncatedResponseError(
+            f"Response ended before the JSON was complete: {cause}",
+            list(self.completed_phases), self.phase, self.last_time
+        )
+
+
+class _CountingReader(object):
+    """File-like wrapper adding the bytes and seconds of every read to a decoder's counters."""
+
+    def __init__(self, fileobj, decoder: PowerStreamDecoder):
+        self.fileobj = fileobj
+        self.decoder = decoder
+
+    def read(self, n=-1):
+        t0 = time.perf_counter()
+        data = self.fileobj.read(n)
+        self.decoder.read_seconds += time.perf_counter() - t0
+        self.decoder.bytes_read += len(data)
+        return data
+
+
+class _AsyncCountingReader(_CountingReader):
+
+    async def read(self, n=-1):
+        t0 = time.perf_counter()
+        data = await self.fileobj.read(n)
+        self.decoder.read_seconds += time.perf_counter() - t0
+        self.decoder.bytes_read += len(data)
+        return data
+
+
+def iter_power_batches(fileobj, decoder: PowerStreamDecoder = None, read_errors=()):
+    """
+    Stream (phase, readings) batches out of a binary file-like response body.
+    Raises TruncatedResponseError if the body ends early, stops being valid
+    JSON, or its read fails with one of read_errors (e.g. the connection
+    dropped). Pass a decoder to read its error attribute (the response's
+    "error" value, if any) afterwards.
+    """
+    decoder = decoder or PowerStreamDecoder()
+    started, read_before = time.perf_counter(), decoder.read_seconds
+    try:
+        for prefix, event, value in ijson.parse(_CountingReader(fileobj, decoder), use_float=True):
+            batch = decoder.feed(prefix, event, value)
+            if batch:
+                yield batch
+    except (ijson.JSONError, *read_errors) as e:
+        # Readings decoded so far are kept: the caller resumes after last_time
+        batch = decoder.flush()
+        if batch:
+            yield batch
+        raise decoder.truncated(e)
+    finally:
+        decoder.decode_seconds += time.perf_counter() - started - (decoder.read_seconds - read_before)
+
+
+async def aiter_power_batches(stream, decoder: PowerStreamDecoder = None, read_errors=()):
+    """
+    iter_power_batches for an asyncio stream with an async read(n)
+    (e.g. aiohttp's response.content).
+    """
+    decoder = decoder or PowerStreamDecoder()
+    started, read_before = time.perf_counter(), decoder.read_seconds
+    try:
+        async for prefix, event, value in ijson.parse_async(_AsyncCountingReader(stream, decoder), use_float=True):
+            batch = decoder.feed(prefix, event, value)
+            if batch:
+                yield batch
+    except (ijson.JSONError, *read_errors) as e:
+        # Readings decoded so far are kept: the caller resumes after last_time
+        batch = decoder.flush()
+        if batch:
+            yield batch
+        raise decoder.truncated(e)
+    finally:
+        decoder.decode_seconds += time.perf_counter() - started - (decoder.read_seconds - read_before)
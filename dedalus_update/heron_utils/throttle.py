@@ -0,0 +1,159 @@
+import asyncio
+import fcntl
+import json
+import os
+import time
+from contextlib import asynccontextmanager, contextmanager
+
+# Token bucket shared by every process of the pipeline
+RATE_STATE_PATH = os.getenv("HERON_RATE_STATE", "state/heron_rate.json")
+# Upper / lower bound of the shared request rate (requests per second)
+HERON_MAX_RATE = float(os.getenv("HERON_MAX_RATE", "20"))
+HERON_MIN_RATE = float(os.getenv("HERON_MIN_RATE", "0.5"))
+# Requests that may be sent back to back after an idle period
+HERON_BURST = float(os.getenv("HERON_BURST", "10"))
+# Statuses that mean the HERON gateway is overloaded
+OVERLOAD_STATUSES = (429, 502, 503, 504)
+# AIMD: additive increase per successful response, multiplicative decrease on overload
+RATE_INCREASE = 0.05
+RATE_DECREASE = 0.5
+CONCURRENCY_DECREASE = 0.7
+# Decreases closer together than this count as one (a burst of errors is one overload signal)
+DECREASE_COOLDOWN = 2.0
+# Recent latency above this multiple of the long-term latency counts as overload
+LATENCY_TOLERANCE = 2.0
+# Weights of the newest sample in the recent / long-term latency moving averages
+SHORT_SMOOTHING = 0.2
+LONG_SMOOTHING = 0.02
+# Responses observed before latency is used as a signal
+LATENCY_WARMUP = 20
+
+
+def retry_after_seconds(value) -> float:
+    """Seconds from a Retry-After header (only the delta-seconds form), or 0."""
+    try:
+        return max(float(value), 0.0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+class RateLimiter(object):
+    """
+    Token bucket of HERON requests, shared across processes through a small
+    JSON file (read-modify-write under an flock, like TokenCache).
+
+    The refill rate adapts AIMD-style: every successful response adds
+    RATE_INCREASE requests/s up to max_rate; a 429/5xx or connection error
+    multiplies it by RATE_DECREASE (at most once per DECREASE_COOLDOWN) down
+    to min_rate, and holds every worker back for the response's Retry-After.
+
+    Requests reserve a token and wait out the deficit, so waiting workers are
+    served in order instead of polling.
+    """
+
+    def __init__(self, path: str = RATE_STATE_PATH, max_rate: float = HERON_MAX_RATE,
+                 min_rate: float = HERON_MIN_RATE, burst: float = HERON_BURST):
+        self.path = path
+        self.lock_path = f"{path}.lock"
+        self.max_rate = max_rate
+        self.min_rate = min_rate
+        self.burst = burst
+
+    @contextmanager
+    def _state(self):
+        os.makedirs(os.path.dirname(self.lock_path) or ".", exist_ok=True)
+        with open(self.lock_path, "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                try:
+                    with open(self.path) as f:
+                        state = json.load(f)
+                except (FileNotFoundError, ValueError):
+                    state = {"rate": self.max_rate, "tokens": self.burst, "updated": time.time(),
+                             "blocked_until": 0.0, "decreased_at": 0.0}
+                yield state
+                tmp_path = f"{self.path}.{os.getpid()}.tmp"
+                with open(tmp_path, "w") as f:
+                    json.dump(state, f)
+                os.replace(tmp_path, self.path)
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def reserve(self) -> float:
+        """Take one token; returns the seconds to wait before sending the request."""
+        now = time.time()
+        with self._state() as state:
+            rate = min(max(state["rate"], self.min_rate), self.max_rate)
+            tokens = min(self.burst, state["tokens"] + (now - state["updated"]) * rate) - 1
+            state.update(rate=rate, tokens=tokens, updated=now)
+            # Requests held back by an overload are spaced out again once it ends
+            return max(state["blocked_until"] - now, 0.0) + max(-tokens / rate, 0.0)
+
+    def acquire(self):
+        time.sleep(self.reserve())
+
+    def record(self, status, retry_after=None):
+        """Feed back a response status (None for a connection error)."""
+        now = time.time()
+        with self._state() as state:
+            if status is None or status in OVERLOAD_STATUSES:
+                if now - state["decreased_at"] >= DECREASE_COOLDOWN:
+                    state["rate"] = max(self.min_rate, state["rate"] * RATE_DECREASE)
+                    state["decreased_at"] = now
+                pause = retry_after_seconds(retry_after) or 1 / state["rate"]
+                state["blocked_until"] = max(state["blocked_until"], now + pause)
+            elif state["rate"] < self.max_rate:
+                state["rate"] = min(self.max_rate, state["rate"] + RATE_INCREASE)
+
+
+class ConcurrencyGovernor(object):
+    """
+    AIMD limit on the number of HERON requests in flight from one event loop.
+
+    The limit grows by about one request per round trip while the recent
+    latency (time to headers) stays within LATENCY_TOLERANCE of the
+    long-term latency, and shrinks by CONCURRENCY_DECREASE when it rises
+    above it or the gateway answers 429/5xx. Comparing two moving averages
+    rather than a fixed baseline keeps requests for large windows, which
+    are slow on any load, from reading as overload. It starts at a quarter
+    of max_limit.
+    """
+
+    def __init__(self, max_limit: int, min_limit: int = 1):
+        self.max_limit = max(max_limit, min_limit)
+        self.min_limit = min_limit
+        self.limit = float(max(min_limit, max_limit // 4))
+        self.in_flight = 0
+        self.samples = 0
+        self.short_latency = None
+        self.long_latency = None
+        self.decreased_at = 0.0
+        self._cond = asyncio.Condition()
+
+    @asynccontextmanager
+    async def slot(self):
+        async with self._cond:
+            await self._cond.wait_for(lambda: self.in_flight < int(self.limit))
+            self.in_flight += 1
+        try:
+            yield
+        finally:
+            async with self._cond:
+                self.in_flight -= 1
+                self._cond.notify_all()
+
+    def record(self, latency: float, overloaded: bool):
+        if not overloaded:
+            self.samples += 1
+            if self.samples == 1:
+                self.short_latency = self.long_latency = latency
+            self.short_latency += SHORT_SMOOTHING * (latency - self.short_latency)
+            self.long_latency += LONG_SMOOTHING * (latency - self.long_latency)
+            overloaded = self.samples > LATENCY_WARMUP and self.short_latency > LATENCY_TOLERANCE * self.long_latency
+        if overloaded:
+            now = time.monotonic()
+            if now - self.decreased_at >= DECREASE_COOLDOWN:
+                self.limit = max(self.min_limit, self.limit * CONCURRENCY_DECREASE)
+                self.decreased_at = now
+        else:
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
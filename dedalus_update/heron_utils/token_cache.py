@@ -0,0 +1,129 @@
+import asyncio
+import base64
+import fcntl
+import json
+import os
+import time
+from contextlib import asynccontextmanager, contextmanager
+
+# Shared by every process of the pipeline (and kept across restarts via the state volume)
+TOKEN_CACHE_PATH = os.getenv("HERON_TOKEN_CACHE", "state/heron_token.json")
+# Lifetime assumed for tokens that carry no JWT "exp" claim
+TOKEN_DEFAULT_TTL = int(os.getenv("HERON_TOKEN_TTL", "3600"))
+# Tokens this close to expiring are treated as expired
+TOKEN_EXPIRY_MARGIN = 60
+# Seconds between attempts of a coroutine to take the sign-in lock
+TOKEN_LOCK_POLL = 0.05
+
+
+def token_expires_at(token: str) -> float:
+    """
+    Expiry (epoch seconds) of a token: the "exp" claim if it is a JWT,
+    otherwise TOKEN_DEFAULT_TTL from now.
+    """
+    try:
+        payload = token.split(".")[1]
+        claims = json.loads(base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4)))
+        return float(claims["exp"])
+    except (IndexError, ValueError, KeyError, TypeError):
+        return time.time() + TOKEN_DEFAULT_TTL
+
+
+class TokenCache(object):
+    """
+    File-backed cache of the HERON sign-in token, shared across processes.
+
+    Readers never block. Sign-ins happen under an exclusive flock on a
+    sibling lock file, so when many workers start (or hit a 401) at once
+    only the first one signs in and the others pick up its token.
+    """
+
+    def __init__(self, path: str = TOKEN_CACHE_PATH):
+        self.path = path
+        self.lock_path = f"{path}.lock"
+
+    def get(self):
+        """Return the cached token if it is still valid, else None."""
+        try:
+            with open(self.path) as f:
+                entry = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+        if entry.get("expires_at", 0) - TOKEN_EXPIRY_MARGIN <= time.time():
+            return None
+        return entry.get("token")
+
+    def store(self, token: str):
+        entry = {"token": token, "expires_at": token_expires_at(token)}
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w") as f:
+            json.dump(entry, f)
+        os.replace(tmp_path, self.path)
+
+    def invalidate(self, stale_token: str):
+        """Drop the cached token, unless another process already replaced stale_token."""
+        try:
+            with open(self.path) as f:
+                if json.load(f).get("token") != stale_token:
+                    return
+            os.remove(self.path)
+        except (FileNotFoundError, ValueError):
+            pass
+
+    @contextmanager
+    def lock(self):
+        os.makedirs(os.path.dirname(self.lock_path) or ".", exist_ok=True)
+        with open(self.lock_path, "a") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    @asynccontextmanager
+    async def async_lock(self):
+        """lock() for coroutines: polls the flock instead of blocking the event loop."""
+        os.makedirs(os.path.dirname(self.lock_path) or ".", exist_ok=True)
+        with open(self.lock_path, "a") as f:
+            while True:
+                try:
+                    fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    break
+                except BlockingIOError:
+                    await asyncio.sleep(TOKEN_LOCK_POLL)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def get_or_sign_in(self, sign_in):
+        """
+        Return a valid cached token, or call sign_in() (once across all
+        processes) and cache its result. Failed sign-ins (None) are not cached.
+        """
+        token = self.get()
+        if token:
+            return token
+        with self.lock():
+            token = self.get()
+            if token:
+                return token
+            token = sign_in()
+            if token:
+                self.store(token)
+            return token
+
+    async def async_get_or_sign_in(self, sign_in):
+        """get_or_sign_in for a coroutine function sign_in."""
+        token = self.get()
+        if token:
+            return token
+        async with self.async_lock():
+            token = self.get()
+            if token:
+                return token
+            token = await sign_in()
+            if token:
+                self.store(token)
+            return token
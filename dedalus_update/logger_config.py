@@ -1,8 +1,14 @@
 from loguru import logger
+from tenacity import RetryCallState
 from datetime import datetime
 import os
 import sys
 
+from metrics import METRICS
+
+# Level of the file and stdout sinks; DEBUG also builds and logs the CSV preview of every body
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+
 # Create the logs directory inside state
 os.makedirs("state/logs", exist_ok=True)
 
@@ -10,10 +16,28 @@ os.makedirs("state/logs", exist_ok=True)
 timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
 log_file_path = f"state/logs/{timestamp}.log"
 
+# Drop loguru's default DEBUG stderr sink, so DEBUG messages (and their lazy arguments) are skipped below LOG_LEVEL
+logger.remove()
+
 # Add file sink with rotation and retention if desired
-logger.add(log_file_path, rotation="5 MB", retention="7 days", level="INFO")
+logger.add(log_file_path, rotation="5 MB", retention="7 days", level=LOG_LEVEL)
 
 # Also log to stdout (for docker logs)
-logger.add(sys.stdout, level="INFO")
+logger.add(sys.stdout, level=LOG_LEVEL)
+
+logger.info(f"Logging to {log_file_path}")
+
+def loguru_before_sleep(retry_state: RetryCallState) -> None:
+    """
+    Callback that logs (via Loguru) before each sleep occurs in a retry cycle.
+    """
+    attempt_number = retry_state.attempt_number
+    wait_time = retry_state.next_action.sleep
+    exception = retry_state.outcome.exception()
+    METRICS.inc("dedalus_retries_total", operation=retry_state.fn.__name__ if retry_state.fn else "unknown")
 
-logger.info(f"Logging to {log_file_path}")
\ No newline at end of file
+    logger.warning(
+        f"Retrying (attempt {attempt_number}). "
+        f"Waiting {wait_time} seconds. "
+        f"Reason: {exception}"
+    )
@@ -0,0 +1,221 @@
+import fcntl
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Tuple
+
+# Metrics of the current run, merged from every pipeline process
+METRICS_PATH = os.getenv("METRICS_PATH", "state/metrics.json")
+
+# Upper bounds of histogram buckets (+Inf is implied)
+SECONDS_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+ROWS_BUCKETS = (100, 1000, 10000, 100000, 1000000, 10000000)
+BYTES_BUCKETS = (1e4, 1e5, 1e6, 1e7, 1e8, 1e9)
+FRESHNESS_BUCKETS = (10, 30, 60, 120, 300, 600, 1800, 3600, 6 * 3600, 24 * 3600)
+# Longest a busy process keeps its deltas to itself (flush_if_due)
+FLUSH_SECONDS = 5.0
+
+METRIC_HELP = {
+    "dedalus_stage_seconds": "Seconds per device-window in each stage (fetch, flatten, upload; upload per batch when batched) and per HERON response decoding (decode, part of fetch)",
+    "dedalus_device_window_seconds": "Seconds from handing out a device-window to its outcome",
+    "dedalus_device_window_rows": "Readings per device-window",
+    "dedalus_device_window_bytes": "Flattened upload body bytes per device-window",
+    "dedalus_device_windows_total": "Device-windows processed, by outcome",
+    "dedalus_rows_total": "Readings flattened into upload bodies",
+    "dedalus_bytes_total": "Bytes downloaded from HERON, flattened and sent to the upload sink",
+    "dedalus_heron_requests_total": "HERON device data requests (sub-windows, resumes and retries included)",
+    "dedalus_retries_total": "Retries after a failed attempt, by operation",
+    "dedalus_splits_total": "Responses bisected because they could not be decoded",
+    "dedalus_resumes_total": "Truncated responses resumed",
+    "dedalus_freshness_seconds": "Tail mode: seconds from a caught-up device's newest reading to its row being uploaded",
+    "dedalus_freshness_target_seconds": "Freshness the tail mode is configured to keep",
+    "dedalus_freshness_violations_total": "Uploads of caught-up devices staler than the freshness target",
+    "dedalus_low_watermark_seconds": "Unix time every device is complete up to (last_updated)",
+}
+
+
+def _series(name: str, labels: Dict[str, str]) -> str:
+    if not labels:
+        return name
+    return name + "{" + ",".join(f'{key}="{value}"' for key, value in sorted(labels.items())) + "}"
+
+
+def _split_series(series: str) -> Tuple[str, str]:
+    """('name', 'labels') of 'name{labels}'."""
+    if "{" not in series:
+        return series, ""
+    name, labels = series.split("{", 1)
+    return name, labels[:-1]
+
+
+class Metrics(object):
+    """
+    Counters, gauges and histograms of the pipeline, shared across processes.
+
+    Every process records into memory and merges its pending deltas into a
+    JSON file on flush() (read-modify-write under an flock, like TokenCache),
+    so pool workers and the main process add up to one set of metrics. The
+    file is the periodic JSON dump; render() formats it as Prometheus text
+    and serve() exposes that over HTTP from the main process.
+    """
+
+    def __init__(self, path: str = METRICS_PATH):
+        self.path = path
+        self.lock_path = f"{path}.lock"
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._histograms = {}
+        self._gauges = {}
+        self._flushed_at = time.monotonic()
+
+    def inc(self, name: str, value: float = 1, **labels):
+        series = _series(name, labels)
+        with self._lock:
+            self._counters[series] = self._counters.get(series, 0) + value
+
+    def set(self, name: str, value: float, **labels):
+        series = _series(name, labels)
+        with self._lock:
+            self._gauges[series] = value
+
+    def observe(self, name: str, value: float, buckets: Tuple[float, ...] = SECONDS_BUCKETS, **labels):
+        series = _series(name, labels)
+        with self._lock:
+            histogram = self._histograms.get(series)
+            if histogram is None:
+                histogram = self._histograms[series] = {"le": list(buckets), "buckets": [0] * (len(buckets) + 1), "sum": 0.0, "count": 0}
+            index = next((i for i, bound in enumerate(buckets) if value <= bound), len(buckets))
+            histogram["buckets"][index] += 1
+            histogram["sum"] += value
+            histogram["count"] += 1
+
+    @contextmanager
+    def timer(self, name: str, **labels):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - t0, SECONDS_BUCKETS, **labels)
+
+    @contextmanager
+    def _state(self):
+        os.makedirs(os.path.dirname(self.lock_path) or ".", exist_ok=True)
+        with open(self.lock_path, "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                try:
+                    with open(self.path) as f:
+                        state = json.load(f)
+                except (FileNotFoundError, ValueError):
+                    state = {"counters": {}, "histograms": {}}
+                yield state
+                state["updated"] = time.time()
+                tmp_path = f"{self.path}.{os.getpid()}.tmp"
+                with open(tmp_path, "w") as f:
+                    json.dump(state, f, indent=1, sort_keys=True)
+                os.replace(tmp_path, self.path)
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def flush(self):
+        """Merge this process's pending deltas into the shared file."""
+        with self._lock:
+            counters, self._counters = self._counters, {}
+            histograms, self._histograms = self._histograms, {}
+            gauges, self._gauges = self._gauges, {}
+            self._flushed_at = time.monotonic()
+        if not counters and not histograms and not gauges:
+            return
+        with self._state() as state:
+            state.setdefault("gauges", {}).update(gauges)
+            for series, value in counters.items():
+                state["counters"][series] = state["counters"].get(series, 0) + value
+            for series, delta in histograms.items():
+                merged = state["histograms"].get(series)
+                if merged is None or merged["le"] != delta["le"]:
+                    state["histograms"][series] = delta
+                    continue
+                merged["buckets"] = [a + b for a, b in zip(merged["buckets"], delta["buckets"])]
+                merged["sum"] += delta["sum"]
+                merged["count"] += delta["count"]
+
+    def flush_if_due(self, interval: float = FLUSH_SECONDS):
+        """flush() if the last one was more than interval seconds ago."""
+        if time.monotonic() - self._flushed_at >= interval:
+            self.flush()
+
+    def reset(self):
+        """Start the metrics of a new run (drops whatever was recorded before)."""
+        with self._lock:
+            self._counters, self._histograms, self._gauges = {}, {}, {}
+        with self._state() as state:
+            state.update(counters={}, histograms={}, gauges={}, started=time.time())
+
+    def snapshot(self) -> dict:
+        self.flush()
+        with self._state() as state:
+            return json.loads(json.dumps(state))
+
+    def render(self) -> str:
+        """The merged metrics in the Prometheus text exposition format."""
+        state = self.snapshot()
+        lines, described = [], set()
+
+        def describe(name, kind):
+            if name not in described:
+                described.add(name)
+                if name in METRIC_HELP:
+                    lines.append(f"# HELP {name} {METRIC_HELP[name]}")
+                lines.append(f"# TYPE {name} {kind}")
+
+        for series, value in sorted(state["counters"].items()):
+            describe(_split_series(series)[0], "counter")
+            lines.append(f"{series} {value:.15g}")
+        for series, value in sorted(state.get("gauges", {}).items()):
+            describe(_split_series(series)[0], "gauge")
+            lines.append(f"{series} {value:.15g}")
+        for series, histogram in sorted(state["histograms"].items()):
+            name, labels = _split_series(series)
+            describe(name, "histogram")
+            prefix = f"{labels}," if labels else ""
+            cumulative = 0
+            bounds = [f"{bound:g}" for bound in histogram["le"]] + ["+Inf"]
+            for bound, count in zip(bounds, histogram["buckets"]):
+                cumulative += count
+                lines.append(f'{name}_bucket{{{prefix}le="{bound}"}} {cumulative}')
+            suffix = f"{{{labels}}}" if labels else ""
+            lines.append(f"{name}_sum{suffix} {histogram['sum']:.15g}")
+            lines.append(f"{name}_count{suffix} {histogram['count']}")
+        return "\n".join(lines) + "\n"
+
+    def serve(self, port: int) -> ThreadingHTTPServer:
+        """Serve /metrics (Prometheus text) and /metrics.json from a daemon thread."""
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path == "/metrics":
+                    body, content_type = metrics.render().encode("utf-8"), "text/plain; version=0.0.4"
+                elif self.path == "/metrics.json":
+                    body, content_type = json.dumps(metrics.snapshot()).encode("utf-8"), "application/json"
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer(("", port), Handler)
+        threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+        return server
+
+
+METRICS = Metrics()
@@ -2,7 +2,7 @@ import yaml
 from datetime import datetime, timezone
 from dateutil.relativedelta import relativedelta
 from typing import Tuple
-from heron_manager import TIME_FORMAT
+from heron_utils.settings import TIME_FORMAT
 
 last_update_file_path="pipeline_config.yaml"
 
@@ -30,6 +30,18 @@ def read_last_updated(config_path="pipeline_config.yaml"):
     except (FileNotFoundError, KeyError, ValueError):
         return datetime(2021, 6, 20)
 
+def read_config_value(key: str, default=None, config_path: str = "pipeline_config.yaml"):
+    """
+    Reads a single optional setting from the pipeline configuration,
+    returning default if the file or the key is missing.
+    """
+    try:
+        with open(config_path) as f:
+            config = yaml.safe_load(f) or {}
+    except FileNotFoundError:
+        return default
+    return config.get(key, default)
+
 def read_config_values(config_path: str = "pipeline_config.yaml") -> Tuple[datetime, int, relativedelta]:
     """
     Reads the pipeline configuration from a YAML file and returns:
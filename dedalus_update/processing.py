@@ -1,9 +1,170 @@
-from datetime import timezone, datetime
+from datetime import timezone, datetime, timedelta
 import csv
+import gzip
 import io
+import struct
+import numpy as np
 import pandas as pd
+import zstandard
+
+# PostgreSQL binary COPY framing (see the COPY docs, "Binary Format")
+COPY_BINARY_SIGNATURE = b"PGCOPY\n\xff\r\n\x00"
+COPY_BINARY_HEADER = COPY_BINARY_SIGNATURE + struct.pack("!ii", 0, 0)  # flags, header extension length
+COPY_BINARY_TRAILER = struct.pack("!h", -1)
+COPY_BINARY_NULL = struct.pack("!i", -1)
+PG_EPOCH = datetime(2000, 1, 1, tzinfo=timezone.utc)
+PG_EPOCH_MICROS = (PG_EPOCH - datetime(1970, 1, 1, tzinfo=timezone.utc)) // timedelta(microseconds=1)
+
+def _readings_map(payload, root_field=None):
+    # pick the dict that holds the phase → readings map
+    return payload.get(root_field) if root_field and isinstance(payload.get(root_field), dict) else payload
+
+def _parse_phase(phase_str):
+    # determine integer phase, or None
+    try:
+        return int(phase_str)
+    except (ValueError, TypeError):
+        return None
+
+def _parse_reading_time(raw_ts):
+    try:
+        # parse ISO8601 (with trailing 'Z' → UTC)
+        return datetime.fromisoformat(raw_ts.replace("Z", "+00:00"))
+    except ValueError:
+        # fallback: treat as naive UTC
+        return datetime.fromisoformat(raw_ts).replace(tzinfo=timezone.utc)
+
+def _phase_device_id(device_id_prefix, phase):
+    return f"{device_id_prefix}-{phase}" if phase is not None else device_id_prefix
+
+def _phase_times(readings):
+    """
+    Parse the readings' ISO8601 times in one vectorized call and return
+    microseconds since the Unix epoch (int64). Offsets are converted to UTC,
+    naive times are taken as UTC (like _parse_reading_time).
+    """
+    raw_times = [r.get("time", "") for r in readings]
+    utc_times = [t[:-1] for t in raw_times if t.endswith("Z")]
+    if len(utc_times) == len(raw_times):
+        # HERON sends UTC ("...Z"): numpy's own ISO parser is much faster than pandas'
+        times = np.array(utc_times, dtype="datetime64[us]")
+    else:
+        times = pd.to_datetime(raw_times, utc=True, format="ISO8601").values.astype("datetime64[us]")
+    if np.isnat(times).any():
+        raise ValueError("Reading without a valid time")
+    return times.astype(np.int64)
+
+def _phase_values(readings):
+    """Readings' values as float64, with missing values ("" or None) as NaN."""
+    values = [r.get("value") for r in readings]
+    try:
+        return np.array(values, dtype=np.float64)
+    except (ValueError, TypeError):
+        return np.array([np.nan if v in (None, "") else float(v) for v in values], dtype=np.float64)
+
+class PhaseReadings(object):
+    """
+    Compact readings of one phase: times as int64 microseconds since the
+    Unix epoch and values as float64 (NaN when missing). The streaming
+    decoder stores responses this way instead of as lists of dicts (16 bytes
+    per reading), and the flatteners accept it wherever they accept a list.
+    """
+    __slots__ = ("micros", "values")
+
+    def __init__(self, micros, values):
+        self.micros = micros
+        self.values = values
+
+    def __len__(self):
+        return len(self.micros)
+
+    def __getstate__(self):
+        return self.micros, self.values
+
+    def __setstate__(self, state):
+        self.micros, self.values = state
+
+    @classmethod
+    def from_readings(cls, readings):
+        return cls(_phase_times(readings), _phase_values(readings))
+
+def concat_phase_readings(chunks):
+    """
+    Concatenate consecutive chunks of one phase's readings (lists of dicts
+    and/or PhaseReadings). Lists stay lists unless mixed with PhaseReadings.
+    """
+    chunks = [c for c in chunks if isinstance(c, (list, PhaseReadings))]
+    if all(isinstance(c, list) for c in chunks):
+        return [r for c in chunks for r in c]
+    chunks = [c if isinstance(c, PhaseReadings) else PhaseReadings.from_readings(c) for c in chunks if len(c)]
+    if len(chunks) == 1:
+        return chunks[0]
+    return PhaseReadings(
+        np.concatenate([c.micros for c in chunks]) if chunks else np.empty(0, dtype=np.int64),
+        np.concatenate([c.values for c in chunks]) if chunks else np.empty(0, dtype=np.float64),
+    )
+
+def latest_reading_time(data):
+    """Time of the newest reading of a {phase: readings} payload, or None if it has none."""
+    latest = None
+    for readings in (data or {}).values():
+        if not isinstance(readings, (list, PhaseReadings)) or not len(readings):
+            continue
+        micros = readings.micros if isinstance(readings, PhaseReadings) else _phase_times(readings)
+        phase_latest = int(micros.max())
+        latest = phase_latest if latest is None else max(latest, phase_latest)
+    if latest is None:
+        return None
+    return datetime(1970, 1, 1, tzinfo=timezone.utc) + timedelta(microseconds=latest)
+
+def _phase_columns(readings):
+    """(micros, values) of a phase given as a list of reading dicts or PhaseReadings, or None if empty."""
+    if isinstance(readings, PhaseReadings):
+        return (readings.micros, readings.values) if len(readings) else None
+    if isinstance(readings, list) and readings:
+        return _phase_times(readings), _phase_values(readings)
+    return None
 
 def flatten_payload_to_csv_buffer(payload, device_id_prefix, root_field=None):
+    """
+    Vectorized flatten_payload_to_csv_buffer_rowwise: times and values of a
+    phase are parsed as whole arrays instead of one reading at a time.
+
+    Rows, instants and values are the same; timestamps are always written
+    in UTC as YYYY-MM-DDTHH:MM:SS.ffffffZ.
+    """
+    readings_map = _readings_map(payload, root_field)
+
+    buf = io.StringIO()
+    buf.write("device_id,timestamp,power_data,phase\n")
+
+    for phase_str, readings in readings_map.items():
+        if isinstance(readings, PhaseReadings):
+            if not len(readings):
+                continue
+            micros = readings.micros
+            values = [None if v != v else v for v in readings.values.tolist()]  # NaN → empty
+        elif isinstance(readings, list) and readings:
+            micros = _phase_times(readings)
+            values = [r.get("value", "") for r in readings]  # written as received
+        else:
+            continue
+
+        phase = _parse_phase(phase_str)
+        timestamps = np.datetime_as_string(micros.astype("datetime64[us]"), unit="us", timezone="UTC")
+
+        # device_id and phase are constant per phase
+        row_prefix = f"{_phase_device_id(device_id_prefix, phase)},"
+        row_suffix = f",{phase if phase is not None else ''}\n"
+        buf.write("".join([
+            f"{row_prefix}{ts},{'' if value is None else value}{row_suffix}"
+            for ts, value in zip(timestamps.tolist(), values)
+        ]))
+
+    buf.seek(0)
+    return buf
+
+def flatten_payload_to_csv_buffer_rowwise(payload, device_id_prefix, root_field=None):
     """
     Take the dict-of-lists payload and a device_id_prefix,
     parse timestamps into timezone-aware datetimes,
@@ -13,8 +174,7 @@ def flatten_payload_to_csv_buffer(payload, device_id_prefix, root_field=None):
     If root_field is provided and exists in payload, flatten payload[root_field];
     otherwise flatten payload directly.
     """
-    # pick the dict that holds the phase → readings map
-    readings_map = payload.get(root_field) if root_field and isinstance(payload.get(root_field), dict) else payload
+    readings_map = _readings_map(payload, root_field)
 
     buf = io.StringIO()
     writer = csv.writer(buf)
@@ -24,20 +184,10 @@ def flatten_payload_to_csv_buffer(payload, device_id_prefix, root_field=None):
         if not isinstance(readings, list):
             continue
 
-        # determine integer phase, or None
-        try:
-            phase = int(phase_str)
-        except (ValueError, TypeError):
-            phase = None
+        phase = _parse_phase(phase_str)
 
         for r in readings:
-            raw_ts = r.get("time", "")
-            try:
-                # parse ISO8601 (with trailing 'Z' → UTC)
-                dt = datetime.fromisoformat(raw_ts.replace("Z", "+00:00"))
-            except ValueError:
-                # fallback: treat as naive UTC
-                dt = datetime.fromisoformat(raw_ts).replace(tzinfo=timezone.utc)
+            dt = _parse_reading_time(r.get("time", ""))
 
             ts_iso = dt.isoformat()
 
@@ -55,6 +205,129 @@ def flatten_payload_to_csv_buffer(payload, device_id_prefix, root_field=None):
     buf.seek(0)
     return buf
 
+def _copy_tuple_dtype(device_id_len, with_value, with_phase):
+    """
+    numpy dtype of one binary COPY tuple (device_id, timestamp, power_data,
+    phase) with a fixed-length device_id. NULL fields are just a -1 length.
+    """
+    fields = [
+        ("field_count", ">i2"),
+        ("device_id_len", ">i4"), ("device_id", f"S{device_id_len}"),
+        ("timestamp_len", ">i4"), ("timestamp", ">i8"),
+        ("power_data_len", ">i4"),
+    ]
+    if with_value:
+        fields.append(("power_data", ">f8"))
+    fields.append(("phase_len", ">i4"))
+    if with_phase:
+        fields.append(("phase", ">i4"))
+    return np.dtype(fields)
+
+def _encode_copy_tuples(device_id_bytes, micros, values, phase):
+    """Encode one phase's readings as binary COPY tuples in a single bytes object."""
+    has_value = ~np.isnan(values)
+    chunks = []
+    for with_value, mask in ((True, has_value), (False, ~has_value)):
+        count = int(mask.sum())
+        if not count:
+            continue
+        tuples = np.empty(count, dtype=_copy_tuple_dtype(len(device_id_bytes), with_value, phase is not None))
+        tuples["field_count"] = 4
+        tuples["device_id_len"] = len(device_id_bytes)
+        tuples["device_id"] = device_id_bytes
+        tuples["timestamp_len"] = 8
+        tuples["timestamp"] = micros[mask] - PG_EPOCH_MICROS
+        if with_value:
+            tuples["power_data_len"] = 8
+            tuples["power_data"] = values[mask]
+        else:
+            tuples["power_data_len"] = -1
+        if phase is not None:
+            tuples["phase_len"] = 4
+            tuples["phase"] = phase
+        else:
+            tuples["phase_len"] = -1
+        chunks.append(tuples.tobytes())
+    return b"".join(chunks)
+
+def flatten_payload_to_copy_buffer(payload, device_id_prefix, root_field=None):
+    """
+    Vectorized flatten_payload_to_copy_buffer_rowwise: each phase's tuples
+    are built as one numpy structured array (big-endian fields, fixed-size
+    rows since device_id is constant per phase) and written with a single
+    tobytes(). Readings with a missing value are written after the others.
+    """
+    readings_map = _readings_map(payload, root_field)
+
+    buf = io.BytesIO()
+    buf.write(COPY_BINARY_HEADER)
+
+    for phase_str, readings in readings_map.items():
+        columns = _phase_columns(readings)
+        if columns is None:
+            continue
+
+        phase = _parse_phase(phase_str)
+        device_id_bytes = _phase_device_id(device_id_prefix, phase).encode("utf-8")
+        buf.write(_encode_copy_tuples(device_id_bytes, *columns, phase))
+
+    buf.write(COPY_BINARY_TRAILER)
+    buf.seek(0)
+    return buf
+
+def flatten_payload_to_copy_buffer_rowwise(payload, device_id_prefix, root_field=None):
+    """
+    Same flattening as flatten_payload_to_csv_buffer_rowwise, but encoded as a
+    PostgreSQL binary COPY stream in an io.BytesIO buffer. Each tuple holds
+    device_id (text), timestamp (timestamptz), power_data (float8) and
+    phase (int4), matching db-access's /upload_binary, so timestamps and
+    floats are never turned into strings. Missing values and phases are NULL.
+    """
+    readings_map = _readings_map(payload, root_field)
+
+    buf = io.BytesIO()
+    buf.write(COPY_BINARY_HEADER)
+
+    for phase_str, readings in readings_map.items():
+        if not isinstance(readings, list):
+            continue
+
+        phase = _parse_phase(phase_str)
+        device_id = f"{device_id_prefix}-{phase}" if phase is not None else device_id_prefix
+        device_id_bytes = device_id.encode("utf-8")
+
+        # field count + device_id, and phase, are the same for every reading of this phase
+        row_prefix = struct.pack("!hi", 4, len(device_id_bytes)) + device_id_bytes
+        phase_field = struct.pack("!ii", 4, phase) if phase is not None else COPY_BINARY_NULL
+
+        for r in readings:
+            dt = _parse_reading_time(r.get("time", ""))
+            if dt.tzinfo is None:
+                dt = dt.replace(tzinfo=timezone.utc)
+            micros = (dt - PG_EPOCH) // timedelta(microseconds=1)
+
+            value = r.get("value")
+            value_field = struct.pack("!id", 8, float(value)) if value not in (None, "") else COPY_BINARY_NULL
+
+            buf.write(row_prefix + struct.pack("!iq", 8, micros) + value_field + phase_field)
+
+    buf.write(COPY_BINARY_TRAILER)
+    buf.seek(0)
+    return buf
+
+def compress_upload_body(body: bytes, compression: str) -> bytes:
+    """
+    Compress an upload body for the given Content-Encoding
+    ("gzip", "zstd", or "none" to send it as is).
+    """
+    if compression == "gzip":
+        return gzip.compress(body, compresslevel=6)
+    if compression == "zstd":
+        return zstandard.ZstdCompressor(level=3).compress(body)
+    if compression in (None, "none", "identity"):
+        return body
+    raise ValueError(f"Unknown upload compression: {compression}")
+
 def preview_csv_buffer(buf, n=6):
     """
     Read the first n lines (including header) from the CSV buffer
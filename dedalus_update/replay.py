@@ -0,0 +1,96 @@
+import multiprocessing
+from datetime import datetime, timezone
+from typing import List, Optional, Tuple
+
+from fetching import StreamCollector, _window_nanos, merge_device_period_parts
+from heron_manager import TIME_FORMAT
+from heron_utils.response_cache import ResponseCache, CacheMissError
+from heron_utils.stream_decode import iter_power_batches
+from logger_config import logger
+from metrics import METRICS
+from pipeline_config_manager import read_config_values
+from uploading import upload_device_period_data
+
+# Raw HERON responses kept by the fetchers, read back by --replay
+RESPONSE_CACHE = ResponseCache()
+
+def group_replay_ranges(device_id: str, ranges: List[Tuple[int, int]], max_span_ns: int) -> List[Tuple[str, List[Tuple[int, int]]]]:
+    """
+    Group a device's cached ranges into replay tasks (device_id, ranges) of
+    contiguous ranges spanning at most max_span_ns, one upload each.
+    """
+    tasks = []
+    for time_from, time_to in ranges:
+        if tasks:
+            group = tasks[-1][1]
+            if group[-1][1] == time_from and time_to - group[0][0] <= max_span_ns:
+                group.append((time_from, time_to))
+                continue
+        tasks.append((device_id, [(time_from, time_to)]))
+    return tasks
+
+def read_cached_device_data(device_id: str, time_from: int, time_to: int) -> dict:
+    body = RESPONSE_CACHE.open(device_id, 'power', time_from, time_to)
+    if body is None:
+        raise CacheMissError(f"No cached response for device: {device_id} in range {time_from} → {time_to}")
+    collector = StreamCollector(frozenset())
+    with body:
+        for phase, readings in iter_power_batches(body, collector.decoder):
+            collector.add(phase, readings)
+    return collector.payload()
+
+def replay_device_task(task: Tuple[str, List[Tuple[int, int]]]) -> Tuple[str, bool]:
+    """
+    Pool worker entry point of --replay: flatten and upload one group of
+    cached responses of a device, reporting (device_id, success).
+    """
+    device_id, ranges = task
+    window_start = datetime.fromtimestamp(ranges[0][0] / 1e9, tz=timezone.utc)
+    window_end = datetime.fromtimestamp(ranges[-1][1] / 1e9, tz=timezone.utc)
+    try:
+        data = merge_device_period_parts([read_cached_device_data(device_id, *r) for r in ranges])
+        if data:
+            upload_device_period_data(device_id, data, window_start, window_end)
+        return device_id, True
+    except Exception as e:
+        logger.error(f"✗ {device_id} {window_start.strftime(TIME_FORMAT)} replay EXC: {e}")
+        return device_id, False
+    finally:
+        METRICS.flush()
+
+def replay_pipeline(replay_from: datetime, replay_to: datetime, device_ids: Optional[List[str]] = None):
+    """
+    Flatten and upload the cached HERON responses between replay_from and
+    replay_to again, without downloading anything: to recover uploads that
+    failed after a successful download, or to backfill after a change in
+    the flattening or the database schema. Uploads are upserts, so
+    replaying data that is already in the database is harmless.
+
+    Checkpoints and last_updated are left alone. Ranges that are not (or no
+    longer) cached are reported and skipped.
+    """
+    _, num_processes, relative_delta = read_config_values()
+    time_from, time_to = _window_nanos(replay_from, replay_to)
+    max_span_ns = int(((replay_from + relative_delta) - replay_from).total_seconds() * 1e9)
+    device_ids = device_ids or RESPONSE_CACHE.device_ids('power', time_from, time_to)
+
+    tasks = []
+    for device_id in device_ids:
+        ranges = RESPONSE_CACHE.ranges(device_id, 'power', time_from, time_to)
+        cached_ns = sum(end - start for start, end in ranges)
+        if cached_ns < time_to - time_from:
+            logger.warning(f"Only {cached_ns / (time_to - time_from):.0%} of {replay_from.isoformat()} → {replay_to.isoformat()} is cached for device: {device_id}")
+        tasks.extend(group_replay_ranges(device_id, ranges, max_span_ns))
+
+    logger.info(f"Replaying {len(tasks)} cached periods of {len(device_ids)} devices")
+    METRICS.reset()
+    failed = set()
+    with multiprocessing.Pool(processes=num_processes) as pool:
+        for device_id, success in pool.imap_unordered(replay_device_task, tasks):
+            if not success:
+                failed.add(device_id)
+
+    METRICS.flush()
+    if failed:
+        raise RuntimeError(f"{len(failed)} devices failed to replay: {', '.join(sorted(failed))}")
+    logger.success(f"Replayed {len(tasks)} cached periods of {len(device_ids)} devices")
@@ -0,0 +1,244 @@
+import heapq
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, Optional, Tuple
+
+from dateutil.relativedelta import relativedelta
+
+from checkpoints import CheckpointStore
+
+
+class WindowScheduler(object):
+    """
+    Decides how far each device is fetched per request, whether it is
+    polled at all, and in which order devices starting at the same time are
+    queued.
+
+    Devices whose requests keep coming back empty (offline meters) stop
+    costing one HERON round trip per window:
+
+    - while behind, after dormant_after empty requests in a row, each next
+      request spans twice as many windows, up to max_window_factor
+    - once caught up with the present, a device that is still empty is
+      not polled again until poll_backoff * 2^(extra empty requests) has
+      passed (at most max_poll_backoff)
+
+    The first request with data resets both. Activity is persisted in the
+    CheckpointStore, so backoff carries over between runs.
+    """
+
+    def __init__(self, checkpoints: CheckpointStore, relative_delta: relativedelta, dormant_after: int = 3,
+                 max_window_factor: int = 16, poll_backoff: timedelta = timedelta(hours=1),
+                 max_poll_backoff: timedelta = timedelta(days=7)):
+        self.checkpoints = checkpoints
+        self.relative_delta = relative_delta
+        self.dormant_after = dormant_after
+        self.max_window_factor = max_window_factor
+        self.poll_backoff = poll_backoff
+        self.max_poll_backoff = max_poll_backoff
+        self.activity = checkpoints.activity()
+
+    def empty_streak(self, device_id: str) -> int:
+        return self.activity.get(device_id, {}).get("empty_streak", 0)
+
+    def last_data_at(self, device_id: str) -> Optional[datetime]:
+        return self.activity.get(device_id, {}).get("last_data_at")
+
+    def next_poll_at(self, device_id: str) -> Optional[datetime]:
+        return self.activity.get(device_id, {}).get("next_poll_at")
+
+    def is_due(self, device_id: str, now: datetime) -> bool:
+        next_poll_at = self.next_poll_at(device_id)
+        return next_poll_at is None or next_poll_at <= now
+
+    def window_factor(self, device_id: str) -> int:
+        """Number of windows the next request of device_id spans."""
+        extra = self.empty_streak(device_id) - self.dormant_after + 1
+        if extra <= 0:
+            return 1
+        return min(2 ** extra, self.max_window_factor)
+
+    def window_end(self, device_id: str, window_start: datetime, now: datetime) -> datetime:
+        window_end = window_start + self.relative_delta
+        factor = self.window_factor(device_id)
+        if factor == 1:
+            return window_end
+        # Widened windows stop at the present instead of reaching past it
+        return max(window_end, min(window_start + self.relative_delta * factor, now))
+
+    def record(self, device_id: str, window_end: datetime, has_data: bool, now: datetime):
+        """Record the outcome of a successful request ending at window_end."""
+        if has_data:
+            streak, last_data_at, next_poll_at = 0, window_end, None
+        else:
+            streak, last_data_at, next_poll_at = self.empty_streak(device_id) + 1, self.last_data_at(device_id), None
+            if streak >= self.dormant_after and window_end >= now:
+                backoff = self.poll_backoff * 2 ** min(streak - self.dormant_after, 30)
+                next_poll_at = now + min(backoff, self.max_poll_backoff)
+        self.activity[device_id] = {"last_data_at": last_data_at, "empty_streak": streak, "next_poll_at": next_poll_at}
+        self.checkpoints.record_activity(device_id, last_data_at, streak, next_poll_at)
+
+    def order_key(self, task: Tuple[str, datetime, datetime], rate: Callable[[str], Optional[float]]) -> Tuple[bool, float]:
+        """
+        Sort key of tasks starting at the same time: devices with recent data
+        first, the largest expected downloads (learned readings/s x span)
+        among them first, so long fetches start early; dormant devices last.
+        """
+        device_id, window_start, window_end = task
+        expected = (rate(device_id) or 0) * (window_end - window_start).total_seconds()
+        return self.empty_streak(device_id) > 0, -expected
+
+
+class WorkQueue(object):
+    """
+    The (device, window) tasks of a run, across windows.
+
+    Each device has at most one task out at a time. As soon as it succeeds
+    the device's next window is queued, so devices run ahead independently
+    instead of waiting at a barrier for the slowest device of each window.
+    A device that fails is dropped for the rest of the run and stays at its
+    last checkpoint. Windows end at the present at the latest.
+
+    Tasks are handed out earliest window start first (the devices furthest
+    behind), in WindowScheduler.order_key among devices at the same start.
+
+    With a poll_interval the queue does not run dry (tail mode): a device
+    that has caught up is queued again poll_interval after the end of its
+    last window, for the readings since then, and a device that fails is
+    retried at its next poll. Polls of caught-up devices go before
+    catch-up work so live data stays fresh while others backfill. stop()
+    ends the run once the tasks out are done.
+
+    HERON can still add readings to the recent past, so with a settle
+    period a device's progress only advances to that far behind the
+    present. Polls fetch the delta since the previous one, and once per
+    settle period a poll starts from the progress instead, picking up the
+    readings added late (the upsert loads the others again idempotently).
+    """
+
+    def __init__(self, scheduler: WindowScheduler, progress: Dict[str, datetime], registered_at: Dict[str, datetime],
+                 now: datetime, rate: Callable[[str], Optional[float]], poll_interval: Optional[timedelta] = None,
+                 settle: timedelta = timedelta(0)):
+        self.scheduler = scheduler
+        self.progress = dict(progress)
+        self.registered_at = registered_at
+        self.started_at = now
+        self.rate = rate
+        self.poll_interval = poll_interval
+        self.settle = settle
+        # End of each device's last successful window (its progress may lag behind by settle),
+        # and when it last started a window from its progress
+        self.polled_until = {}
+        self.settled_at = {}
+        self.failed = set()
+        self.in_flight = {}
+        self.stopped = False
+        self._heap = []
+        # (due time, device_id) of the devices waiting for their next poll (tail mode)
+        self._waiting = []
+        for device_id in self.progress:
+            self._queue_next(device_id)
+
+    @property
+    def now(self) -> datetime:
+        # A batch run fetches up to the time it started, a tail run up to the present
+        return datetime.now(timezone.utc) if self.poll_interval else self.started_at
+
+    def _queue_next(self, device_id: str):
+        now = self.now
+        window_start = self.progress[device_id]
+        # Windows starting before the device was registered are skipped, as before
+        while self.registered_at[device_id] > window_start and window_start < now:
+            window_start += self.scheduler.relative_delta
+        self.progress[device_id] = window_start
+
+        polled_until = self.polled_until.get(device_id, window_start)
+        settled_at = self.settled_at.get(device_id)
+        if settled_at is not None and now - settled_at < self.settle:
+            # Only the delta since the last poll until the next settle pass is due
+            window_start = max(window_start, polled_until)
+        due_at = max(window_start, polled_until) + (self.poll_interval or timedelta(0))
+        next_poll_at = self.scheduler.next_poll_at(device_id)
+        if next_poll_at is not None:
+            due_at = max(due_at, next_poll_at)
+        if window_start < now and due_at <= now:
+            # Dormant devices are fetched several windows at a time
+            window_end = self.scheduler.window_end(device_id, window_start, now)
+            live = self.poll_interval is not None and window_end >= now
+            order_key = self.scheduler.order_key((device_id, window_start, window_end), self.rate)
+            heapq.heappush(self._heap, (not live, window_start, order_key, device_id))
+        elif self.poll_interval:
+            heapq.heappush(self._waiting, (due_at, device_id))
+
+    def __len__(self) -> int:
+        """Number of devices this run may still queue a task for."""
+        return len(self.progress) - len(self.failed)
+
+    @property
+    def finished(self) -> bool:
+        return not self.in_flight and (self.stopped or not (self._heap or self._waiting))
+
+    def stop(self):
+        """Hand out no more tasks: the run ends once the tasks out are done."""
+        self.stopped = True
+
+    def wait_seconds(self) -> Optional[float]:
+        """
+        How long a worker with nothing to start should wait before asking
+        again: until a task is done (None) in a batch run; in a tail run
+        until the next device is due, at most a second so stop() is noticed.
+        """
+        if not self.poll_interval:
+            return None
+        if not self._waiting:
+            return 1.0
+        return min(max((self._waiting[0][0] - self.now).total_seconds(), 0.0), 1.0)
+
+    def pop(self) -> Optional[Tuple[str, datetime, datetime]]:
+        """Next task to start, or None if no device has a window due that is not already out."""
+        if self.stopped:
+            return None
+        now = self.now
+        due = []
+        while self._waiting and self._waiting[0][0] <= now:
+            due.append(heapq.heappop(self._waiting)[1])
+        for device_id in due:
+            self._queue_next(device_id)
+        if not self._heap:
+            return None
+        _, window_start, _, device_id = heapq.heappop(self._heap)
+        task = (device_id, window_start, min(self.scheduler.window_end(device_id, window_start, now), now))
+        self.in_flight[device_id] = (task, time.perf_counter(), now)
+        return task
+
+    def done(self, device_id: str, success: bool, has_data: bool = True) -> Tuple[Tuple[str, datetime, datetime], float, bool]:
+        """
+        Record the outcome of device_id's task and queue its next window.
+        Returns the task, the seconds since it was handed out and whether
+        it reached the present (the device has caught up).
+        """
+        task, started, now = self.in_flight.pop(device_id)
+        if success:
+            _, window_start, window_end = task
+            self.polled_until[device_id] = max(window_end, self.polled_until.get(device_id, window_end))
+            if window_start <= self.progress[device_id]:
+                self.progress[device_id] = max(window_start, min(window_end, now - self.settle))
+                self.settled_at[device_id] = now
+            self.scheduler.record(device_id, window_end, has_data, now)
+            self._queue_next(device_id)
+        elif self.poll_interval:
+            heapq.heappush(self._waiting, (self.now + self.poll_interval, device_id))
+        else:
+            self.failed.add(device_id)
+        return task, time.perf_counter() - started, task[2] >= now
+
+    def low_watermark(self) -> datetime:
+        """
+        Every device is complete up to this time. Dormant devices resting
+        until their next poll are left out (they are complete up to their
+        last poll), so they do not hold it back for the whole backoff.
+        """
+        now = self.now
+        active = [progress for device_id, progress in self.progress.items()
+                  if device_id in self.in_flight or self.scheduler.is_due(device_id, now)]
+        return min(active or self.progress.values())
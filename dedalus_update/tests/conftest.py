@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The pipeline's modules are imported flat, as when running update_db_pipeline.py from this directory
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
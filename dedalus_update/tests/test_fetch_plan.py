@@ -0,0 +1,92 @@
+from datetime import datetime, timedelta, timezone
+from json import JSONDecodeError
+
+from fetch_plan import (
+    GIVE_UP,
+    RESUME_PHASE,
+    RESUME_READING,
+    RETRY,
+    SPLIT,
+    SubwindowRequest,
+    plan_failed_subwindow,
+    resume_point,
+)
+from heron_utils.stream_decode import TruncatedResponseError
+
+START = datetime(2024, 1, 1, tzinfo=timezone.utc)
+END = START + timedelta(hours=12)
+MIN_SPAN = timedelta(hours=1)
+
+
+def truncated(completed_phases=(), current_phase=None, last_time=None, received=None):
+    e = TruncatedResponseError("cut off", list(completed_phases), current_phase, last_time)
+    e.received = received
+    return e
+
+
+def test_resume_reading_after_the_last_complete_reading():
+    received = {"1": ["..."], "2": ["..."]}
+    e = truncated(["1"], "2", "2024-01-01T06:00:00Z", received)
+    plan = plan_failed_subwindow(e, SubwindowRequest(START, END), MIN_SPAN)
+
+    resume_from = START + timedelta(hours=6, microseconds=1)
+    assert plan.action == RESUME_READING
+    assert plan.received is received
+    assert plan.requests == (
+        SubwindowRequest(START, resume_from, frozenset({"1", "2"}), hops=1),
+        SubwindowRequest(resume_from, END, frozenset({"1"}), hops=1),
+    )
+    assert not plan.too_large
+
+
+def test_resume_phase_between_phases():
+    e = truncated(["1"], received={"1": ["..."]})
+    plan = plan_failed_subwindow(e, SubwindowRequest(START, END, hops=2), MIN_SPAN)
+
+    assert plan.action == RESUME_PHASE
+    assert plan.requests == (SubwindowRequest(START, END, frozenset({"1"}), hops=3),)
+    assert not plan.too_large
+
+
+def test_failure_before_any_reading_is_retried_then_split():
+    request = SubwindowRequest(START, END, frozenset({"1"}))
+    for retries in range(2):
+        plan = plan_failed_subwindow(truncated(["1"]), request, MIN_SPAN, max_retries=2)
+        assert plan.action == RETRY and not plan.too_large
+        (request,) = plan.requests
+        assert request == SubwindowRequest(START, END, frozenset({"1"}), retries=retries + 1)
+
+    plan = plan_failed_subwindow(truncated(["1"]), request, MIN_SPAN, max_retries=2)
+    middle = START + timedelta(hours=6)
+    assert plan.action == SPLIT and plan.too_large
+    assert plan.requests == (
+        SubwindowRequest(START, middle, frozenset({"1"})),
+        SubwindowRequest(middle, END, frozenset({"1"})),
+    )
+
+
+def test_undecodable_whole_body_is_retried():
+    plan = plan_failed_subwindow(JSONDecodeError("Expecting value", "", 0), SubwindowRequest(START, END), MIN_SPAN)
+    assert plan.action == RETRY
+
+
+def test_resumes_stop_after_max_hops():
+    e = truncated(["1"], "2", "2024-01-01T06:00:00Z")
+    plan = plan_failed_subwindow(e, SubwindowRequest(START, END, hops=8), MIN_SPAN, max_hops=8)
+    assert plan.action == SPLIT and plan.too_large
+
+
+def test_give_up_below_twice_the_smallest_span():
+    request = SubwindowRequest(START, START + timedelta(minutes=90), retries=2)
+    plan = plan_failed_subwindow(truncated(), request, MIN_SPAN, max_retries=2)
+    assert plan.action == GIVE_UP and plan.too_large and plan.requests == ()
+
+
+def test_resume_point_inside_the_window_only():
+    assert resume_point(truncated(["1"], "2", "2024-01-01T06:00:00Z"), START, END) == START + timedelta(hours=6, microseconds=1)
+    # Naive times are UTC
+    assert resume_point(truncated([], "1", "2024-01-01T06:00:00"), START, END) == START + timedelta(hours=6, microseconds=1)
+    assert resume_point(truncated([], "1", "2024-01-01T13:00:00Z"), START, END) is None
+    assert resume_point(truncated([], "1", "not a time"), START, END) is None
+    assert resume_point(truncated([], None, "2024-01-01T06:00:00Z"), START, END) is None
+    assert resume_point(JSONDecodeError("Expecting value", "", 0), START, END) is None
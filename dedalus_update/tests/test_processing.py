@@ -0,0 +1,58 @@
+import pandas as pd
+import pytest
+
+from bench_processing import csv_rows, decode_copy_binary, make_payload
+from processing import (
+    PhaseReadings,
+    flatten_payload_to_copy_buffer,
+    flatten_payload_to_copy_buffer_rowwise,
+    flatten_payload_to_csv_buffer,
+    flatten_payload_to_csv_buffer_rowwise,
+)
+
+PAYLOADS = {
+    "three_phases": make_payload(days=0.01, missing_every=7),
+    "offsets_and_naive_times": {"1": [
+        {"time": "2024-01-01T00:00:00.250+02:00", "value": 1.5},
+        {"time": "2024-01-01T00:00:01", "value": 2},
+        {"time": "2024-06-30T23:59:59.999999Z", "value": -3.25},
+    ]},
+    "missing_values": {"2": [
+        {"time": "2024-01-01T00:00:00Z", "value": None},
+        {"time": "2024-01-01T00:00:01Z", "value": ""},
+        {"time": "2024-01-01T00:00:02Z"},
+        {"time": "2024-01-01T00:00:03Z", "value": 0.0},
+    ]},
+    "phase_without_number": {"total": [{"time": "2024-01-01T00:00:00Z", "value": 4.0}], "1": [], "meta": {"unit": "W"}},
+}
+
+
+@pytest.mark.parametrize("name", sorted(PAYLOADS))
+def test_csv_flatteners_agree(name):
+    pd.testing.assert_frame_equal(
+        csv_rows(flatten_payload_to_csv_buffer_rowwise(PAYLOADS[name], "dev")),
+        csv_rows(flatten_payload_to_csv_buffer(PAYLOADS[name], "dev")),
+    )
+
+
+@pytest.mark.parametrize("name", sorted(PAYLOADS))
+def test_copy_flatteners_agree(name):
+    rowwise = decode_copy_binary(flatten_payload_to_copy_buffer_rowwise(PAYLOADS[name], "dev").getvalue())
+    vectorized = decode_copy_binary(flatten_payload_to_copy_buffer(PAYLOADS[name], "dev").getvalue())
+    assert sorted(rowwise, key=repr) == sorted(vectorized, key=repr)
+
+
+def test_phase_readings_flatten_like_lists():
+    payload = PAYLOADS["three_phases"]
+    compact = {phase: PhaseReadings.from_readings(readings) for phase, readings in payload.items()}
+    pd.testing.assert_frame_equal(
+        csv_rows(flatten_payload_to_csv_buffer(payload, "dev")),
+        csv_rows(flatten_payload_to_csv_buffer(compact, "dev")),
+    )
+    assert flatten_payload_to_copy_buffer(compact, "dev").getvalue() == flatten_payload_to_copy_buffer(payload, "dev").getvalue()
+
+
+def test_root_field():
+    payload = {"data": PAYLOADS["missing_values"], "device": "dev"}
+    assert (flatten_payload_to_csv_buffer(payload, "dev", root_field="data").getvalue()
+            == flatten_payload_to_csv_buffer(PAYLOADS["missing_values"], "dev").getvalue())
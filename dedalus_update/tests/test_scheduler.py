@@ -0,0 +1,279 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from dateutil.relativedelta import relativedelta
+
+from checkpoints import CheckpointStore
+from scheduler import WindowScheduler, WorkQueue
+
+T0 = datetime(2024, 1, 1, tzinfo=timezone.utc)
+DAY = relativedelta(days=1)
+
+
+@pytest.fixture
+def checkpoints(tmp_path):
+    store = CheckpointStore(str(tmp_path / "checkpoints.db"))
+    yield store
+    store.close()
+
+
+def no_rate(device_id):
+    return None
+
+
+def record_empty(scheduler, device_id, count, window_end, now):
+    for _ in range(count):
+        scheduler.record(device_id, window_end, False, now)
+
+
+def test_window_factor_grows_after_dormant_after_empty_requests(checkpoints):
+    scheduler = WindowScheduler(checkpoints, DAY, dormant_after=3, max_window_factor=8)
+    now = T0 + timedelta(days=100)
+
+    factors = []
+    for _ in range(7):
+        factors.append(scheduler.window_factor("a"))
+        scheduler.record("a", T0, False, now)
+    assert factors == [1, 1, 1, 2, 4, 8, 8]
+    assert scheduler.window_end("a", T0, now) == T0 + timedelta(days=8)
+    # Widened windows stop at the present
+    assert scheduler.window_end("a", now - timedelta(days=2), now) == now
+
+
+def test_caught_up_empty_device_backs_off_up_to_the_maximum(checkpoints):
+    scheduler = WindowScheduler(checkpoints, DAY, dormant_after=2, poll_backoff=timedelta(hours=1),
+                                max_poll_backoff=timedelta(hours=5))
+    now = T0
+
+    scheduler.record("a", now, False, now)
+    assert scheduler.next_poll_at("a") is None
+    backoffs = []
+    for _ in range(5):
+        scheduler.record("a", now, False, now)
+        backoffs.append(scheduler.next_poll_at("a") - now)
+    assert backoffs == [timedelta(hours=h) for h in (1, 2, 4, 5, 5)]
+    assert not scheduler.is_due("a", now + timedelta(hours=4))
+    assert scheduler.is_due("a", now + timedelta(hours=5))
+
+
+def test_empty_requests_while_behind_do_not_back_off(checkpoints):
+    scheduler = WindowScheduler(checkpoints, DAY, dormant_after=1)
+    record_empty(scheduler, "a", 5, T0, T0 + timedelta(days=10))
+    assert scheduler.next_poll_at("a") is None
+
+
+def test_data_resets_the_backoff(checkpoints):
+    scheduler = WindowScheduler(checkpoints, DAY, dormant_after=1)
+    record_empty(scheduler, "a", 3, T0, T0)
+    assert scheduler.window_factor("a") > 1 and scheduler.next_poll_at("a") is not None
+
+    scheduler.record("a", T0 + timedelta(hours=1), True, T0 + timedelta(hours=1))
+    assert scheduler.window_factor("a") == 1
+    assert scheduler.next_poll_at("a") is None
+    assert scheduler.last_data_at("a") == T0 + timedelta(hours=1)
+
+
+def test_activity_carries_over_between_runs(checkpoints):
+    scheduler = WindowScheduler(checkpoints, DAY, dormant_after=1)
+    record_empty(scheduler, "a", 2, T0, T0)
+
+    reloaded = WindowScheduler(checkpoints, DAY, dormant_after=1)
+    assert reloaded.empty_streak("a") == 2
+    assert reloaded.next_poll_at("a") == scheduler.next_poll_at("a")
+
+
+def test_order_key_puts_active_devices_and_large_downloads_first(checkpoints):
+    scheduler = WindowScheduler(checkpoints, DAY)
+    scheduler.record("dormant", T0, False, T0)
+    rates = {"small": 1.0, "large": 10.0, "dormant": 100.0}
+    tasks = [(device_id, T0, T0 + timedelta(days=1)) for device_id in ("dormant", "small", "unknown", "large")]
+
+    ordered = sorted(tasks, key=lambda task: scheduler.order_key(task, rates.get))
+    assert [device_id for device_id, _, _ in ordered] == ["large", "small", "unknown", "dormant"]
+
+
+def test_low_watermark_leaves_out_resting_devices(checkpoints):
+    now = T0 + timedelta(days=10)
+    scheduler = WindowScheduler(checkpoints, DAY, dormant_after=1, poll_backoff=timedelta(days=30),
+                                max_poll_backoff=timedelta(days=30))
+    # "resting" caught up at T0 and is not polled again before T0 + 30 days
+    scheduler.record("resting", T0, False, T0)
+    progress = {"active": now - timedelta(days=2), "resting": T0}
+    queue = WorkQueue(scheduler, progress, {"active": T0, "resting": T0}, now, no_rate)
+
+    assert queue.low_watermark() == now - timedelta(days=2)
+    assert queue.pop()[0] == "active"
+    assert queue.pop() is None
+
+
+def test_low_watermark_falls_back_to_resting_devices(checkpoints):
+    now = T0 + timedelta(days=10)
+    scheduler = WindowScheduler(checkpoints, DAY, dormant_after=1, poll_backoff=timedelta(days=30),
+                                max_poll_backoff=timedelta(days=30))
+    scheduler.record("a", T0, False, T0)
+    queue = WorkQueue(scheduler, {"a": T0}, {"a": T0}, now, no_rate)
+    assert queue.low_watermark() == T0
+
+
+def batch_queue(checkpoints, progress, now, registered_at=None, rate=no_rate):
+    scheduler = WindowScheduler(checkpoints, DAY)
+    registered_at = registered_at or {device_id: T0 for device_id in progress}
+    return WorkQueue(scheduler, progress, registered_at, now, rate)
+
+
+def test_queue_hands_out_the_earliest_window_start_first(checkpoints):
+    now = T0 + timedelta(days=10)
+    queue = batch_queue(checkpoints, {"a": T0 + timedelta(days=3), "b": T0, "c": T0 + timedelta(days=1)}, now)
+
+    assert [queue.pop() for _ in range(3)] == [
+        ("b", T0, T0 + timedelta(days=1)),
+        ("c", T0 + timedelta(days=1), T0 + timedelta(days=2)),
+        ("a", T0 + timedelta(days=3), T0 + timedelta(days=4)),
+    ]
+
+
+def test_devices_at_the_same_start_go_largest_download_first(checkpoints):
+    now = T0 + timedelta(days=10)
+    rates = {"small": 1.0, "large": 10.0}
+    queue = batch_queue(checkpoints, {"small": T0, "none": T0, "large": T0}, now, rate=rates.get)
+
+    assert [queue.pop()[0] for _ in range(3)] == ["large", "small", "none"]
+
+
+def test_devices_run_ahead_one_task_at_a_time(checkpoints):
+    now = T0 + timedelta(days=10)
+    queue = batch_queue(checkpoints, {"a": T0, "b": T0}, now)
+
+    first, second = queue.pop(), queue.pop()
+    assert {first[0], second[0]} == {"a", "b"}
+    assert queue.pop() is None
+
+    queue.done("a", True)
+    # "a" moves on to its next window without waiting for "b"
+    assert queue.pop() == ("a", T0 + timedelta(days=1), T0 + timedelta(days=2))
+    assert queue.pop() is None
+    assert queue.low_watermark() == T0
+
+
+def test_windows_end_at_the_start_of_the_run(checkpoints):
+    now = T0 + timedelta(hours=30)
+    queue = batch_queue(checkpoints, {"a": T0}, now)
+
+    assert queue.pop() == ("a", T0, T0 + timedelta(days=1))
+    assert not queue.done("a", True)[2]
+    assert queue.pop() == ("a", T0 + timedelta(days=1), now)
+    assert queue.done("a", True)[2]
+    assert queue.pop() is None and queue.finished
+    assert queue.low_watermark() == now
+
+
+def test_failed_device_is_dropped_for_the_run(checkpoints):
+    now = T0 + timedelta(days=10)
+    queue = batch_queue(checkpoints, {"a": T0, "b": T0}, now)
+    queue.pop(), queue.pop()
+
+    queue.done("a", False)
+    queue.done("b", True)
+    assert len(queue) == 1
+    assert queue.pop()[0] == "b"
+    queue.done("b", True)
+    # "a" stays at its last checkpoint
+    assert queue.low_watermark() == T0
+
+
+def test_windows_before_registration_are_skipped(checkpoints):
+    now = T0 + timedelta(days=10)
+    queue = batch_queue(checkpoints, {"a": T0}, now, registered_at={"a": T0 + timedelta(days=2, hours=12)})
+
+    assert queue.pop() == ("a", T0 + timedelta(days=3), T0 + timedelta(days=4))
+
+
+class Clock(object):
+
+    def __init__(self, now):
+        self.now = now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock(T0 + timedelta(days=10))
+    # Tail runs read the present through WorkQueue.now
+    monkeypatch.setattr(WorkQueue, "now", property(lambda queue: clock.now if queue.poll_interval else queue.started_at))
+    return clock
+
+
+def tail_queue(checkpoints, clock, progress, settle=timedelta(0)):
+    scheduler = WindowScheduler(checkpoints, DAY)
+    return WorkQueue(scheduler, progress, {device_id: T0 for device_id in progress}, clock.now, no_rate,
+                     poll_interval=timedelta(seconds=10), settle=settle)
+
+
+def poll(queue, clock, seconds):
+    """Move the clock on and run the task due then, if any."""
+    clock.now += timedelta(seconds=seconds)
+    task = queue.pop()
+    if task:
+        queue.done(task[0], True)
+    return task
+
+
+def test_tail_polls_the_delta_and_settles_once_per_settle_period(checkpoints, clock):
+    start = clock.now
+    queue = tail_queue(checkpoints, clock, {"a": start - timedelta(seconds=60)}, settle=timedelta(seconds=30))
+
+    assert poll(queue, clock, 0) == ("a", start - timedelta(seconds=60), start)
+    # Progress only advances to settle behind the present
+    assert queue.progress["a"] == start - timedelta(seconds=30)
+    assert queue.pop() is None
+
+    tasks = [poll(queue, clock, 10) for _ in range(4)]
+    at = [start + timedelta(seconds=s) for s in (0, 10, 20, 30, 40)]
+    assert tasks == [
+        ("a", at[0], at[1]),
+        ("a", at[1], at[2]),
+        # Once per settle period a poll starts from the progress again
+        ("a", start - timedelta(seconds=30), at[3]),
+        ("a", at[3], at[4]),
+    ]
+    assert queue.progress["a"] == start
+
+
+def test_tail_without_settle_keeps_progress_at_the_last_poll(checkpoints, clock):
+    start = clock.now
+    queue = tail_queue(checkpoints, clock, {"a": start - timedelta(seconds=60)})
+
+    poll(queue, clock, 0)
+    assert poll(queue, clock, 5) is None
+    assert poll(queue, clock, 5) == ("a", start, start + timedelta(seconds=10))
+    assert queue.progress["a"] == queue.low_watermark() == start + timedelta(seconds=10)
+
+
+def test_live_polls_go_before_catch_up_work(checkpoints, clock):
+    queue = tail_queue(checkpoints, clock, {"behind": T0, "live": clock.now - timedelta(seconds=60)})
+
+    assert queue.pop()[0] == "live"
+    assert queue.pop()[0] == "behind"
+
+
+def test_failed_poll_is_retried_at_the_next_poll(checkpoints, clock):
+    start = clock.now
+    queue = tail_queue(checkpoints, clock, {"a": start - timedelta(seconds=60)})
+    poll(queue, clock, 0)
+
+    clock.now += timedelta(seconds=10)
+    queue.done(queue.pop()[0], False)
+    assert len(queue) == 1
+    assert poll(queue, clock, 5) is None
+    assert poll(queue, clock, 5) == ("a", start, start + timedelta(seconds=20))
+
+
+def test_stopped_tail_run_finishes_once_the_tasks_out_are_done(checkpoints, clock):
+    queue = tail_queue(checkpoints, clock, {"a": clock.now - timedelta(seconds=60)})
+    task = queue.pop()
+    assert queue.wait_seconds() == 1.0
+
+    queue.stop()
+    assert not queue.finished
+    queue.done(task[0], True)
+    assert queue.finished
+    assert queue.pop() is None
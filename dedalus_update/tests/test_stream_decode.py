@@ -0,0 +1,117 @@
+import asyncio
+import io
+import json
+
+import pytest
+
+from heron_utils.stream_decode import PowerStreamDecoder, TruncatedResponseError, aiter_power_batches, iter_power_batches
+
+BODY = json.dumps({"power": {
+    "1": [{"time": f"2024-01-01T00:00:0{i}Z", "value": i} for i in range(5)],
+    "2": [{"time": f"2024-01-01T00:00:0{i}Z", "value": 10 + i} for i in range(3)],
+}}).encode()
+
+
+def readings_by_phase(batches):
+    phases = {}
+    for phase, readings in batches:
+        phases.setdefault(phase, []).extend(readings)
+    return phases
+
+
+def decode(body, decoder):
+    batches = []
+    try:
+        for batch in iter_power_batches(io.BytesIO(body), decoder):
+            batches.append(batch)
+    except TruncatedResponseError as e:
+        return batches, e
+    return batches, None
+
+
+def test_complete_body_in_batches():
+    decoder = PowerStreamDecoder(batch_size=2)
+    batches, error = decode(BODY, decoder)
+
+    assert error is None
+    assert [len(readings) for _, readings in batches] == [2, 2, 1, 2, 1]
+    assert readings_by_phase(batches) == json.loads(BODY)["power"]
+    assert decoder.completed_phases == ["1", "2"]
+    assert decoder.bytes_read == len(BODY)
+
+
+def test_body_cut_off_mid_phase_keeps_complete_readings():
+    # Cut inside the third reading of phase 2
+    cut = BODY.index(b'"2024-01-01T00:00:02Z", "value": 12')
+    batches, error = decode(BODY[:cut], PowerStreamDecoder())
+
+    assert readings_by_phase(batches) == {
+        "1": json.loads(BODY)["power"]["1"],
+        "2": json.loads(BODY)["power"]["2"][:2],
+    }
+    assert error.completed_phases == ["1"]
+    assert error.current_phase == "2"
+    assert error.last_time == "2024-01-01T00:00:01Z"
+
+
+def test_body_cut_off_between_phases():
+    cut = BODY.index(b'"2"')
+    batches, error = decode(BODY[:cut], PowerStreamDecoder())
+
+    assert list(readings_by_phase(batches)) == ["1"]
+    assert error.completed_phases == ["1"]
+    assert error.current_phase is None
+
+
+def test_body_cut_off_before_any_reading():
+    batches, error = decode(BODY[:3], PowerStreamDecoder())
+    assert batches == []
+    assert (error.completed_phases, error.current_phase, error.last_time) == ([], None, None)
+
+
+def test_error_response():
+    decoder = PowerStreamDecoder()
+    batches, error = decode(b'{"error": "device not found"}', decoder)
+    assert (batches, error, decoder.error) == ([], None, "device not found")
+
+
+def test_read_error_counts_as_truncation():
+    class DroppedConnection(object):
+        def __init__(self, body):
+            self.stream = io.BytesIO(body)
+
+        def read(self, n=-1):
+            # Small chunks, as from a socket
+            data = self.stream.read(16 if n < 0 else min(n, 16))
+            if n and not data:
+                raise ConnectionResetError("connection dropped")
+            return data
+
+    stream = DroppedConnection(BODY[:BODY.index(b'"2"')])
+    with pytest.raises(TruncatedResponseError, match="connection dropped") as raised:
+        list(iter_power_batches(stream, read_errors=(ConnectionResetError,)))
+    assert raised.value.completed_phases == ["1"]
+
+
+def test_async_decoding_matches():
+    class AsyncReader(object):
+        def __init__(self, body):
+            self.stream = io.BytesIO(body)
+
+        async def read(self, n=-1):
+            return self.stream.read(n)
+
+    async def collect(body, decoder):
+        batches = []
+        try:
+            async for batch in aiter_power_batches(AsyncReader(body), decoder):
+                batches.append(batch)
+        except TruncatedResponseError as e:
+            return batches, e
+        return batches, None
+
+    cut = BODY.index(b'"2024-01-01T00:00:02Z", "value": 12')
+    assert asyncio.run(collect(BODY, PowerStreamDecoder(batch_size=2))) == decode(BODY, PowerStreamDecoder(batch_size=2))
+    batches, error = asyncio.run(collect(BODY[:cut], PowerStreamDecoder()))
+    assert readings_by_phase(batches) == readings_by_phase(decode(BODY[:cut], PowerStreamDecoder())[0])
+    assert (error.completed_phases, error.current_phase, error.last_time) == (["1"], "2", "2024-01-01T00:00:01Z")
@@ -0,0 +1,16 @@
+import os
+
+import pytest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+VENDOR_DIR = os.path.join(HERE, os.pardir, "vendor")
+DB_ACCESS_DIR = os.path.join(HERE, os.pardir, os.pardir, "db-access")
+
+
+@pytest.mark.parametrize("name", ["csv_loader.py", "db_pool.py"])
+def test_vendored_module_matches_db_access(name):
+    original = os.path.join(DB_ACCESS_DIR, name)
+    if not os.path.exists(original):
+        pytest.skip("db-access is not next to dedalus_update")
+    with open(original, "rb") as f, open(os.path.join(VENDOR_DIR, name), "rb") as g:
+        assert g.read() == f.read(), f"vendor/{name} differs from db-access/{name}: copy it again"
@@ -0,0 +1,38 @@
+from datetime import timedelta
+
+import pytest
+
+from window_sizing import WindowSizeStore
+
+
+def ledger_lines(path):
+    with open(path) as f:
+        return f.read().splitlines()
+
+
+def test_record_success_only_persists_changes(tmp_path):
+    path = str(tmp_path / "window_sizes.jsonl")
+    store = WindowSizeStore(path)
+
+    for _ in range(5):
+        store.record_success("a", timedelta(hours=1), 360)
+    # The first rate is kept; the moving average is only updated in memory
+    assert len(ledger_lines(path)) == 1
+    assert store.rate("a") == pytest.approx(0.1)
+
+    store.record_failure("a", timedelta(hours=10))
+    store.record_success("a", timedelta(hours=1), 720)
+    assert len(ledger_lines(path)) == 2
+    assert store.rate("a") > 0.1
+
+
+def test_ceiling_raised_by_a_larger_success_is_persisted(tmp_path):
+    path = str(tmp_path / "window_sizes.jsonl")
+    store = WindowSizeStore(path)
+    store.record_success("a", timedelta(hours=1), 360)
+    store.record_failure("a", timedelta(hours=10))  # ceiling: 3600 readings
+    store.record_success("a", timedelta(hours=20), 7200)
+
+    reloaded = WindowSizeStore(path)
+    assert reloaded.entries["a"]["ceiling"] == 7200 / 0.8
+    assert reloaded.preferred_span("a") == store.preferred_span("a")
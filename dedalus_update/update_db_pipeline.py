@@ -1,150 +1,163 @@
-import pandas as pd
+import argparse
+import asyncio
 import os
-import multiprocessing as mp
+import signal
 from logger_config import logger
 from datetime import datetime, timedelta, timezone
-from dateutil.relativedelta import relativedelta
-from pipeline_config_manager import read_config_values,update_last_updated
-import multiprocessing
-import requests
-import io
-import sys
-from heron_manager import get_device_info, TIME_FORMAT, get_heron_device_data, get_nano_time_from_time_string
-from processing import flatten_payload_to_csv_buffer, preview_csv_buffer
-from json import JSONDecodeError
-from tenacity import (
-    retry,
-    stop_after_attempt,
-    wait_chain,
-    wait_fixed,
-    retry_if_exception_type,
-    RetryCallState
-)
-
-def loguru_before_sleep(retry_state: RetryCallState) -> None:
-    """
-    Callback that logs (via Loguru) before each sleep occurs in a retry cycle.
-    """
-    attempt_number = retry_state.attempt_number
-    wait_time = retry_state.next_action.sleep
-    exception = retry_state.outcome.exception()
-    
-    logger.warning(
-        f"Retrying (attempt {attempt_number}). "
-        f"Waiting {wait_time} seconds. "
-        f"Reason: {exception}"
-    )
+from pipeline_config_manager import read_config_values,update_last_updated,read_config_value
+from typing import Optional
+from heron_manager import get_device_info, TIME_FORMAT
+from checkpoints import CheckpointStore
+from engines import run_tasks_async, run_tasks_in_pool
+from fetching import WINDOW_SIZES
+from metrics import METRICS, FRESHNESS_BUCKETS
+from replay import replay_pipeline
+from scheduler import WindowScheduler, WorkQueue
+from uploading import UPLOAD_BATCH_SIZE
+
+# "async" downloads each window from one asyncio event loop, "pool" downloads in multiprocessing workers
+FETCH_ENGINE = read_config_value("fetch_engine", "async")
+
+# Empty requests in a row after which a device is treated as dormant
+DORMANT_AFTER_EMPTY_WINDOWS = int(read_config_value("dormant_after_empty_windows", 3))
+# Dormant devices: at most this many windows per request while behind, and
+# polled again after 1h, 2h, 4h... (at most this many hours) once caught up
+MAX_EMPTY_WINDOW_FACTOR = int(read_config_value("max_empty_window_factor", 16))
+MAX_DORMANT_POLL_HOURS = float(read_config_value("max_dormant_poll_hours", 168))
+# Port of the Prometheus-style /metrics endpoint served during a run (0: only the JSON dump in state/)
+METRICS_PORT = int(read_config_value("metrics_port", 0))
+# --tail: seconds between polls of a caught-up device, freshness (newest reading -> uploaded row) to keep,
+# and the devices' deltas coalesced per upload
+TAIL_POLL_SECONDS = float(read_config_value("tail_poll_seconds", 60))
+FRESHNESS_TARGET_SECONDS = float(read_config_value("freshness_target_seconds", 300))
+TAIL_UPLOAD_BATCH_SIZE = int(read_config_value("tail_upload_batch_size", 50))
+# --tail: HERON may still add readings this far in the past (as the response cache assumes, HERON_RESPONSE_CACHE_SETTLE):
+# once per this period a caught-up device is polled again from its checkpoint, which stays this far behind
+TAIL_SETTLE_SECONDS = float(read_config_value("tail_settle_seconds", 3600))
 
 def init_worker_logger():
     # You could configure sinks, level, etc. here in the child process
     logger.add(f"worker_{os.getpid()}.log")
     return logger
 
-@retry(
-    retry=retry_if_exception_type((requests.exceptions.RequestException)),
-    wait=wait_chain(wait_fixed(60), wait_fixed(180), wait_fixed(300)),
-    stop=stop_after_attempt(4),
-    before_sleep=loguru_before_sleep
-)
-def post_csv_buffer(buffer):
-    buffer.seek(0)
-    binary_buf = io.BytesIO(buffer.getvalue().encode("utf-8"))
-    query_url = f"{os.getenv('API_URL')}/upload_csv"
-    resp = requests.post(query_url, files={
-        # the tuple is: (filename, fileobj, content_type)
-        "file": ("readings.csv", buffer, "text/csv")
-        })
-    resp.raise_for_status()
-    logger.info(resp)
-    logger.info(resp.text)
-
-@retry(
-    retry=retry_if_exception_type((requests.exceptions.RequestException)),
-    wait=wait_chain(wait_fixed(60), wait_fixed(180), wait_fixed(300)),
-    stop=stop_after_attempt(4),
-    before_sleep=loguru_before_sleep
-)
-def get_device_period_data(device_id:str,window_start:datetime,window_end:datetime)->dict:
-    start_time=window_start.strftime(TIME_FORMAT)
-    end_time=window_end.strftime(TIME_FORMAT)
-    start_time_ns=get_nano_time_from_time_string(start_time)
-    end_time_ns=get_nano_time_from_time_string(end_time)
-    return get_heron_device_data(device_id,start_time_ns,end_time_ns)
-
-def create_device_period_csv_buffer(data:dict,device_id:str):
-    buffer=flatten_payload_to_csv_buffer(data,device_id)
-    logger.info(preview_csv_buffer(buffer).to_string())
-    return buffer
-
-def process_device_period(device_id: str, window_start: datetime, window_end: datetime):
-    try:
-        logger.info(f"Downloading data for device: {device_id} in window: {window_start.isoformat()} → {window_end.isoformat()}")
-        
-        try:
-            data = get_device_period_data(device_id, window_start, window_end)
-        except JSONDecodeError as e:
-            logger.warning(f"Initial fetch failed with exception: {e}. Data might be too large for device: {device_id} in window: {window_start.isoformat()} → {window_end.isoformat()}. Attempting 5-part split fallback...")
-            delta = (window_end - window_start) / 5
-            data = []
-            for i in range(5):
-                part_start = window_start + i * delta
-                part_end = window_start + (i + 1) * delta
-                try:
-                    part_data = get_device_period_data(device_id, part_start, part_end)
-                    if part_data:
-                        data.extend(part_data)
-                except Exception as split_e:
-                    logger.warning(f"Split fetch failed for part {i+1}/5: {split_e}")
-
-        if not data:
-            logger.warning(f"No data found for device: {device_id} in window: {window_start.isoformat()} → {window_end.isoformat()}")
-            return
-
-        logger.info(f"Processing data for device: {device_id} in window: {window_start.isoformat()} → {window_end.isoformat()}")
-        buffer = create_device_period_csv_buffer(data, device_id)
-
-        logger.info(f"Uploading data for device: {device_id} in window: {window_start.isoformat()} → {window_end.isoformat()}")
-        post_csv_buffer(buffer)
-
-        logger.success(f"Successfully uploaded data for device: {device_id} in window: {window_start.isoformat()} → {window_end.isoformat()}")
-
-    except Exception as e:
-        logger.error(f"✗ {device_id} {window_start.strftime(TIME_FORMAT)} EXC: {e}")
-        raise e
-
-
-def run_pipeline():
+def run_pipeline(tail: bool = False):
+    """
+    Bring every device up to date, then return. With tail, keep running
+    instead: once a device has caught up it is polled every
+    TAIL_POLL_SECONDS for the readings since its last poll (and once per
+    TAIL_SETTLE_SECONDS since its checkpoint, which stays that far behind
+    the present), with the deltas of up to TAIL_UPLOAD_BATCH_SIZE devices
+    uploaded together, until SIGTERM or SIGINT.
+    """
     last_updated, num_processes, relative_delta = read_config_values()
-    current = last_updated
     now_utc = datetime.now(timezone.utc)
 
     devices = get_device_info()
     if not devices:
         logger.error("No devices found.")
         return
-
-    while current < now_utc:
-        window_start = current
-        window_end = current + relative_delta
-
-        logger.info(f"\n Processing window: {window_start.isoformat()} → {window_end.isoformat()}")
-
-        tasks = [(device[0], window_start, window_end) for device in devices if device[1] <= window_start ]
-
-        # Parallel processing for this time window
-        with multiprocessing.Pool(processes=num_processes) as pool:
-            results = pool.starmap_async(process_device_period, tasks).get()  # raises on first error
-
-
-        # for r in results:
-        #     logger.info(r)
-
-        # Update last_updated after all devices for the window are done
-        logger.success(f"Successfully fetched data up to {window_end.isoformat()}")
-        update_last_updated(new_dt=window_end)
-
-        current = window_end
+    METRICS.reset()
+    metrics_server = METRICS.serve(METRICS_PORT) if METRICS_PORT else None
+
+    # Each device resumes from its own watermark; devices never checkpointed
+    # start from the global last_updated
+    checkpoints = CheckpointStore()
+    watermarks = checkpoints.watermarks()
+    progress = {device_id: watermarks.get(device_id, last_updated) for device_id, _ in devices}
+    scheduler = WindowScheduler(
+        checkpoints, relative_delta,
+        dormant_after=DORMANT_AFTER_EMPTY_WINDOWS,
+        max_window_factor=MAX_EMPTY_WINDOW_FACTOR,
+        max_poll_backoff=timedelta(hours=MAX_DORMANT_POLL_HOURS),
+    )
+    resting = [device_id for device_id in progress if not scheduler.is_due(device_id, now_utc)]
+    if resting:
+        logger.info(f"{len(resting)} dormant devices are not polled {'until their backoff ends' if tail else 'in this run'}")
+
+    # Devices run ahead of each other window by window; last_updated follows the slowest
+    poll_interval = timedelta(seconds=TAIL_POLL_SECONDS) if tail else None
+    settle = timedelta(seconds=TAIL_SETTLE_SECONDS) if tail else timedelta(0)
+    work = WorkQueue(scheduler, progress, dict(devices), now_utc, WINDOW_SIZES.rate, poll_interval=poll_interval, settle=settle)
+    batch_size = max(UPLOAD_BATCH_SIZE, TAIL_UPLOAD_BATCH_SIZE) if tail else UPLOAD_BATCH_SIZE
+    if tail:
+        logger.info(f"\n Tailing {len(work)} devices from {work.low_watermark().isoformat()}: polling caught-up devices every {TAIL_POLL_SECONDS:g}s (from {TAIL_SETTLE_SECONDS:g}s back once per {TAIL_SETTLE_SECONDS:g}s), freshness target {FRESHNESS_TARGET_SECONDS:g}s")
+        if TAIL_POLL_SECONDS >= FRESHNESS_TARGET_SECONDS:
+            logger.warning(f"tail_poll_seconds ({TAIL_POLL_SECONDS:g}) is not below freshness_target_seconds ({FRESHNESS_TARGET_SECONDS:g}): the target cannot be kept")
+        METRICS.set("dedalus_freshness_target_seconds", FRESHNESS_TARGET_SECONDS)
+        main_pid = os.getpid()
+
+        def stop(signum, frame):
+            if os.getpid() != main_pid:
+                # Forked workers finish their task on Ctrl-C (the main process stops
+                # handing out new ones) and exit when their pool terminates them
+                if signum == signal.SIGTERM:
+                    os._exit(128 + signum)
+                return
+            logger.info(f"Received signal {signum}: stopping once the devices in progress are done")
+            work.stop()
+
+        signal.signal(signal.SIGTERM, stop)
+        signal.signal(signal.SIGINT, stop)
+    else:
+        logger.info(f"\n Processing {len(work)} devices from {work.low_watermark().isoformat()} → {now_utc.isoformat()} in windows of {relative_delta}")
+
+    def on_device_done(device_id: str, success: bool, has_data: bool = True, latest_reading: Optional[datetime] = None):
+        nonlocal last_updated
+        polled_until = work.polled_until.get(device_id)
+        (_, window_start, window_end), seconds, caught_up = work.done(device_id, success, has_data)
+        METRICS.inc("dedalus_device_windows_total", outcome="failed" if not success else "uploaded" if has_data else "empty")
+        METRICS.observe("dedalus_device_window_seconds", seconds)
+        if not success:
+            retry = f"at its next poll in {TAIL_POLL_SECONDS:g}s" if tail else "on the next run"
+            logger.error(f"Device {device_id} failed in window {window_start.isoformat()} → {window_end.isoformat()} and will be retried {retry}")
+            return
+        # Complete up to the device's progress: window_end, or TAIL_SETTLE_SECONDS before the present
+        checkpoints.advance(device_id, work.progress[device_id])
+        if tail and caught_up and latest_reading is not None and (polled_until is None or latest_reading > polled_until):
+            # End-to-end freshness: from the newest reading to its row being uploaded. Readings
+            # polled again by a settle pass were uploaded before and do not count
+            freshness = (datetime.now(timezone.utc) - latest_reading).total_seconds()
+            METRICS.observe("dedalus_freshness_seconds", freshness, FRESHNESS_BUCKETS)
+            if freshness > FRESHNESS_TARGET_SECONDS:
+                METRICS.inc("dedalus_freshness_violations_total")
+                logger.warning(f"Device {device_id} uploaded {freshness:.0f}s after its newest reading, over the {FRESHNESS_TARGET_SECONDS:g}s target")
+        # last_updated tracks the low watermark: every device is complete up to it
+        low_watermark = work.low_watermark()
+        if low_watermark > last_updated:
+            update_last_updated(new_dt=low_watermark)
+            last_updated = low_watermark
+            METRICS.set("dedalus_low_watermark_seconds", low_watermark.timestamp())
+            if not tail:
+                logger.success(f"Successfully fetched data up to {low_watermark.isoformat()}")
+        METRICS.flush_if_due()
+
+    if FETCH_ENGINE == "async":
+        asyncio.run(run_tasks_async(work, num_processes, on_device_done, batch_size))
+    else:
+        run_tasks_in_pool(work, num_processes, on_device_done, batch_size)
+
+    checkpoints.close()
+    METRICS.flush()
+    if metrics_server:
+        metrics_server.shutdown()
+    if work.failed:
+        raise RuntimeError(f"{len(work.failed)} devices failed and stopped at their last checkpoint: {', '.join(sorted(work.failed))}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Update the Dedalus database with new HERON measurements.")
+    parser.add_argument("--replay", nargs=2, metavar=("FROM", "TO"),
+                        help="re-upload the cached HERON responses between FROM and TO (e.g. 2024-01-01T00:00:00.000Z) without downloading")
+    parser.add_argument("--devices", nargs="+", help="with --replay: only these devices")
+    parser.add_argument("--tail", action="store_true",
+                        help="keep running after catching up: poll every caught-up device every tail_poll_seconds (stop with SIGTERM)")
+    return parser.parse_args()
 
 
 if __name__ == "__main__":
-    run_pipeline()
+    args = parse_args()
+    if args.replay:
+        replay_from, replay_to = (datetime.strptime(t, TIME_FORMAT).replace(tzinfo=timezone.utc) for t in args.replay)
+        replay_pipeline(replay_from, replay_to, args.devices)
+    else:
+        run_pipeline(tail=args.tail)
@@ -0,0 +1,196 @@
+import os
+import time
+from datetime import datetime
+from typing import List, Tuple
+
+import requests
+from tenacity import (
+    retry,
+    stop_after_attempt,
+    wait_chain,
+    wait_fixed,
+    retry_if_exception_type,
+)
+
+from logger_config import logger, loguru_before_sleep
+from metrics import METRICS, BYTES_BUCKETS, ROWS_BUCKETS
+from pipeline_config_manager import read_config_value
+from processing import flatten_payload_to_csv_buffer, flatten_payload_to_copy_buffer, preview_csv_buffer, compress_upload_body
+from window_sizing import count_readings
+
+# "http" uploads through the db-access API, "database" COPYs straight into device_measurements_30
+UPLOAD_SINK = read_config_value("upload_sink", "http")
+# "csv" uploads text CSV to /upload_csv, "binary" uploads a binary COPY stream to /upload_binary
+UPLOAD_FORMAT = read_config_value("upload_format", "csv")
+# Content-Encoding used for uploads: "gzip", "zstd" or "none"
+UPLOAD_COMPRESSION = read_config_value("upload_compression", "gzip")
+# Number of device payloads sent per /upload_batch request; 1 uploads each device on its own
+UPLOAD_BATCH_SIZE = int(read_config_value("upload_batch_size", 1))
+
+if UPLOAD_SINK == "database":
+    # psycopg2 and the database connection pool are only loaded for this sink
+    from db_sink import load_device_period_body, load_upload_batch
+
+def post_upload_body(endpoint: str, body: bytes, content_type: str):
+    """
+    Compress body with UPLOAD_COMPRESSION, POST it to db-access and log a
+    size/throughput report for the upload.
+    """
+    t0 = time.perf_counter()
+    payload = compress_upload_body(body, UPLOAD_COMPRESSION)
+    compress_seconds = time.perf_counter() - t0
+
+    headers = {"Content-Type": content_type}
+    if payload is not body:
+        headers["Content-Encoding"] = UPLOAD_COMPRESSION
+
+    query_url = f"{os.getenv('API_URL')}/{endpoint}"
+    t1 = time.perf_counter()
+    resp = requests.post(query_url, data=payload, headers=headers)
+    upload_seconds = time.perf_counter() - t1
+    resp.raise_for_status()
+    METRICS.inc("dedalus_bytes_total", len(payload), kind="sent")
+
+    raw_mb = len(body) / 1e6
+    logger.info(
+        f"Uploaded {len(body)} bytes to /{endpoint} as {len(payload)} bytes "
+        f"({UPLOAD_COMPRESSION}, ratio {len(body) / max(len(payload), 1):.1f}x); "
+        f"compress {compress_seconds:.2f}s ({raw_mb / max(compress_seconds, 1e-9):.1f} MB/s), "
+        f"upload {upload_seconds:.2f}s ({raw_mb / max(upload_seconds, 1e-9):.1f} MB/s uncompressed)"
+    )
+    logger.info(resp.text)
+
+# db-access endpoint for each upload body content type
+UPLOAD_ENDPOINTS = {
+    "text/csv": "upload_csv",
+    "application/octet-stream": "upload_binary",
+}
+
+@retry(
+    retry=retry_if_exception_type((requests.exceptions.RequestException)),
+    wait=wait_chain(wait_fixed(60), wait_fixed(180), wait_fixed(300)),
+    stop=stop_after_attempt(4),
+    before_sleep=loguru_before_sleep
+)
+def post_device_period_body(body: bytes, content_type: str):
+    # Already-flattened body (create_device_period_upload_body)
+    post_upload_body(UPLOAD_ENDPOINTS[content_type], body, content_type)
+
+def send_device_period_body(body: bytes, content_type: str):
+    """Hand a flattened body to the configured UPLOAD_SINK."""
+    if UPLOAD_SINK == "database":
+        load_device_period_body(body, content_type)
+    else:
+        post_device_period_body(body, content_type)
+
+@retry(
+    retry=retry_if_exception_type((requests.exceptions.RequestException)),
+    wait=wait_chain(wait_fixed(60), wait_fixed(180), wait_fixed(300)),
+    stop=stop_after_attempt(4),
+    before_sleep=loguru_before_sleep
+)
+def post_upload_batch(parts: List[Tuple[str, bytes, str]]) -> List[str]:
+    """
+    Upload many device payloads in one /upload_batch request (one multipart
+    part per device, each compressed with UPLOAD_COMPRESSION). db-access loads
+    them in a single transaction. Returns the device ids whose part failed.
+    """
+    files = {}
+    raw_bytes = sent_bytes = 0
+    for device_id, body, content_type in parts:
+        payload = compress_upload_body(body, UPLOAD_COMPRESSION)
+        headers = {"Content-Encoding": UPLOAD_COMPRESSION} if payload is not body else {}
+        files[device_id] = (f"{device_id}.dat", payload, content_type, headers)
+        raw_bytes += len(body)
+        sent_bytes += len(payload)
+
+    query_url = f"{os.getenv('API_URL')}/upload_batch"
+    t0 = time.perf_counter()
+    resp = requests.post(query_url, files=files)
+    upload_seconds = time.perf_counter() - t0
+    resp.raise_for_status()
+    METRICS.inc("dedalus_bytes_total", sent_bytes, kind="sent")
+
+    result = resp.json()
+    failed = [device_id for device_id, part in result.get("parts", {}).items() if not part.get("success")]
+    for device_id in failed:
+        logger.error(f"✗ Batch upload of device {device_id} failed: {result['parts'][device_id].get('error')}")
+    logger.info(
+        f"Uploaded batch of {len(parts)} devices ({result.get('rows', 0)} rows): {raw_bytes} bytes as {sent_bytes} bytes "
+        f"({UPLOAD_COMPRESSION}) in {upload_seconds:.2f}s ({raw_bytes / 1e6 / max(upload_seconds, 1e-9):.1f} MB/s uncompressed), "
+        f"{len(failed)} failed"
+    )
+    return failed
+
+def create_device_period_csv_buffer(data:dict,device_id:str):
+    buffer=flatten_payload_to_csv_buffer(data,device_id)
+    logger.opt(lazy=True).debug("{}", lambda: preview_csv_buffer(buffer).to_string())
+    return buffer
+
+def create_device_period_copy_buffer(data:dict,device_id:str):
+    return flatten_payload_to_copy_buffer(data,device_id)
+
+def create_device_period_upload_body(data: dict, device_id: str) -> Tuple[bytes, str]:
+    """
+    Flatten a device payload in UPLOAD_FORMAT and return (body, content_type).
+    """
+    if UPLOAD_FORMAT == "binary":
+        return create_device_period_copy_buffer(data, device_id).getvalue(), "application/octet-stream"
+    return create_device_period_csv_buffer(data, device_id).getvalue().encode("utf-8"), "text/csv"
+
+def record_device_window_size(data: dict, body: bytes):
+    """Record the readings and flattened bytes of one device-window in METRICS."""
+    rows = count_readings(data)
+    METRICS.inc("dedalus_rows_total", rows)
+    METRICS.observe("dedalus_device_window_rows", rows, ROWS_BUCKETS)
+    METRICS.inc("dedalus_bytes_total", len(body), kind="body")
+    METRICS.observe("dedalus_device_window_bytes", len(body), BYTES_BUCKETS, kind="body")
+
+def flatten_device_period_data(device_id: str, data: dict, window_start: datetime, window_end: datetime) -> Tuple[bytes, str]:
+    """
+    Flatten one downloaded (device, window) payload in UPLOAD_FORMAT and
+    return (body, content_type).
+    """
+    logger.info(f"Processing data for device: {device_id} in window: {window_start.isoformat()} → {window_end.isoformat()}")
+    with METRICS.timer("dedalus_stage_seconds", stage="flatten"):
+        body, content_type = create_device_period_upload_body(data, device_id)
+    record_device_window_size(data, body)
+    return body, content_type
+
+def upload_device_period_data(device_id: str, data: dict, window_start: datetime, window_end: datetime):
+    """
+    Flatten one downloaded (device, window) payload in UPLOAD_FORMAT and upload it to UPLOAD_SINK.
+    """
+    body, content_type = flatten_device_period_data(device_id, data, window_start, window_end)
+
+    logger.info(f"Uploading data for device: {device_id} in window: {window_start.isoformat()} → {window_end.isoformat()}")
+    with METRICS.timer("dedalus_stage_seconds", stage="upload"):
+        send_device_period_body(body, content_type)
+
+    logger.success(f"Successfully uploaded data for device: {device_id} in window: {window_start.isoformat()} → {window_end.isoformat()}")
+
+def upload_body_with_result(device_id: str, body: bytes, content_type: str) -> List[Tuple[str, bool]]:
+    """
+    Upload one device's flattened body and return [(device_id, success)],
+    like upload_batch_with_results.
+    """
+    try:
+        with METRICS.timer("dedalus_stage_seconds", stage="upload"):
+            send_device_period_body(body, content_type)
+    except Exception as e:
+        logger.error(f"✗ {device_id} upload EXC: {e}")
+        return [(device_id, False)]
+    logger.success(f"Successfully uploaded data for device: {device_id}")
+    return [(device_id, True)]
+
+def upload_batch_with_results(batch: List[Tuple[str, bytes, str]]) -> List[Tuple[str, bool]]:
+    """
+    Upload a batch and return (device_id, success) for every device in it.
+    """
+    try:
+        with METRICS.timer("dedalus_stage_seconds", stage="upload"):
+            failed = set(load_upload_batch(batch) if UPLOAD_SINK == "database" else post_upload_batch(batch))
+    except Exception as e:
+        logger.error(f"✗ Batch upload of {len(batch)} devices failed: {e}")
+        failed = {device_id for device_id, _, _ in batch}
+    return [(device_id, device_id not in failed) for device_id, _, _ in batch]
@@ -0,0 +1,140 @@
+import json
+import os
+from datetime import datetime, timedelta
+from typing import List, Optional, Tuple
+
+from processing import PhaseReadings
+
+# Append-only ledger of learned per-device window sizes (last entry per device wins)
+WINDOW_SIZES_PATH = os.getenv("WINDOW_SIZES_PATH", "state/window_sizes.jsonl")
+# Requests are sized to this fraction of the smallest response known to have failed
+WINDOW_SIZE_HEADROOM = 0.8
+# Weight of the newest sample in the readings-per-second moving average
+RATE_SMOOTHING = 0.3
+# The ledger is rewritten on load once it holds this many lines per device
+COMPACT_FACTOR = 10
+
+
+def count_readings(data: dict) -> int:
+    """Number of readings in a {phase: [readings]} payload."""
+    if not data:
+        return 0
+    return sum(len(readings) for readings in data.values() if isinstance(readings, (list, PhaseReadings)))
+
+
+def split_window(window_start: datetime, window_end: datetime, span: Optional[timedelta]) -> List[Tuple[datetime, datetime]]:
+    """Split [window_start, window_end) into consecutive sub-windows of at most span."""
+    if span is None or span >= window_end - window_start:
+        return [(window_start, window_end)]
+    windows = []
+    start = window_start
+    while start < window_end:
+        end = min(start + span, window_end)
+        windows.append((start, end))
+        start = end
+    return windows
+
+
+class WindowSizeStore(object):
+    """
+    Learns, per device, how large a HERON request can be before the response
+    breaks (JSONDecodeError on oversized payloads).
+
+    Each device entry holds:
+    - rate:    readings per second in recent successful responses (moving average)
+    - ceiling: estimated number of readings in the smallest response that failed
+    - span:    preferred span in seconds, used until a rate is known
+
+    preferred_span() sizes requests at WINDOW_SIZE_HEADROOM * ceiling / rate,
+    so devices that once needed splitting are fetched in right-sized chunks
+    instead of paying a failed full-window request every run.
+
+    Entries are appended to a JSON-lines ledger (small O_APPEND writes, safe
+    across pool workers) and survive restarts through the state volume. A
+    success only appends a line if it changes the ceiling or gives the
+    device its first rate; later rate updates stay in memory.
+    """
+
+    def __init__(self, path: str = WINDOW_SIZES_PATH, min_span: timedelta = timedelta(hours=1)):
+        self.path = path
+        self.min_span = min_span
+        self.entries = self._load()
+        # Entries as last written to the ledger
+        self.saved = dict(self.entries)
+
+    def _load(self) -> dict:
+        entries, lines = {}, 0
+        try:
+            with open(self.path) as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                        entries[record.pop("device_id")] = record
+                        lines += 1
+                    except (ValueError, KeyError):
+                        continue  # Partially written line
+        except FileNotFoundError:
+            return entries
+        if lines > COMPACT_FACTOR * max(len(entries), 1):
+            self._compact(entries)
+        return entries
+
+    def _compact(self, entries: dict):
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            for device_id, entry in entries.items():
+                f.write(json.dumps({"device_id": device_id, **entry}) + "\n")
+        os.replace(tmp_path, self.path)
+
+    def _save(self, device_id: str, entry: dict):
+        self.entries[device_id] = entry
+        self.saved[device_id] = entry
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        line = (json.dumps({"device_id": device_id, **entry}) + "\n").encode("utf-8")
+        fd = os.open(self.path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+        try:
+            os.write(fd, line)
+        finally:
+            os.close(fd)
+
+    def rate(self, device_id: str) -> Optional[float]:
+        """Learned readings per second of device_id, if known."""
+        return self.entries.get(device_id, {}).get("rate")
+
+    def preferred_span(self, device_id: str) -> Optional[timedelta]:
+        """Learned request span for device_id, or None to fetch whole windows."""
+        entry = self.entries.get(device_id)
+        if not entry:
+            return None
+        if entry.get("ceiling") and entry.get("rate"):
+            seconds = WINDOW_SIZE_HEADROOM * entry["ceiling"] / entry["rate"]
+        elif entry.get("span"):
+            seconds = entry["span"]
+        else:
+            return None
+        return max(timedelta(seconds=seconds), self.min_span)
+
+    def record_success(self, device_id: str, span: timedelta, readings: int):
+        seconds = span.total_seconds()
+        if readings <= 0 or seconds <= 0:
+            return
+        entry = dict(self.entries.get(device_id, {}))
+        rate = readings / seconds
+        entry["rate"] = rate if not entry.get("rate") else (1 - RATE_SMOOTHING) * entry["rate"] + RATE_SMOOTHING * rate
+        if entry.get("ceiling") and readings >= entry["ceiling"]:
+            # The device got sparser (or the limit was underestimated): relax the ceiling
+            entry["ceiling"] = readings / WINDOW_SIZE_HEADROOM
+        saved = self.saved.get(device_id, {})
+        if entry.get("ceiling") != saved.get("ceiling") or not saved.get("rate"):
+            self._save(device_id, entry)
+        else:
+            self.entries[device_id] = entry
+
+    def record_failure(self, device_id: str, span: timedelta):
+        seconds = span.total_seconds()
+        entry = dict(self.entries.get(device_id, {}))
+        if entry.get("rate"):
+            ceiling = entry["rate"] * seconds
+            entry["ceiling"] = min(entry.get("ceiling") or ceiling, ceiling)
+        entry["span"] = min(entry.get("span") or seconds / 2, seconds / 2)
+        self._save(device_id, entry)